@@ -6,7 +6,7 @@ FastAPI backend for meter management and monitoring
 from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 from datetime import datetime
 import asyncio
 import json
@@ -53,12 +53,14 @@ class MeterCreate(BaseModel):
     port: int = Field(3333, description="DLMS port")
     client_id: int = Field(1, description="DLMS client ID")
     server_id: int = Field(1, description="DLMS server ID")
+    transport: Literal["hdlc", "wrapper"] = Field("hdlc", description="DLMS link layer: HDLC or IEC 62056-47 wrapper")
 
 
 class MeterUpdate(BaseModel):
     name: Optional[str] = None
     ip_address: Optional[str] = None
     port: Optional[int] = None
+    transport: Optional[Literal["hdlc", "wrapper"]] = None
     status: Optional[str] = None
     error_count: Optional[int] = None
 
@@ -84,6 +86,7 @@ class MeterResponse(BaseModel):
     name: str
     ip_address: str
     port: int
+    transport: Optional[str]
     status: str
     last_seen: Optional[datetime]
     error_count: int
@@ -247,7 +250,8 @@ async def create_new_meter(meter_data: MeterCreate, db: Session = Depends(get_db
         ip_address=meter_data.ip_address,
         port=meter_data.port,
         client_id=meter_data.client_id,
-        server_id=meter_data.server_id
+        server_id=meter_data.server_id,
+        transport=meter_data.transport
     )
     
     return meter
@@ -267,6 +271,8 @@ async def update_meter(meter_id: int, meter_data: MeterUpdate, db: Session = Dep
         meter.ip_address = meter_data.ip_address
     if meter_data.port is not None:
         meter.port = meter_data.port
+    if meter_data.transport is not None:
+        meter.transport = meter_data.transport
     if meter_data.status is not None:
         meter.status = meter_data.status
     if meter_data.error_count is not None:
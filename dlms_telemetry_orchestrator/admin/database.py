@@ -4,8 +4,8 @@ Uses SQLAlchemy with SQLite for easy deployment
 """
 
 from datetime import datetime
-from typing import Optional, List
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text
+from typing import Optional, List, Dict, Tuple
+from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship, Session
 from pathlib import Path
@@ -23,6 +23,7 @@ class Meter(Base):
     client_id = Column(Integer, default=1)
     server_id = Column(Integer, default=1)
     password = Column(String(50), default='22222222')  # DLMS password
+    transport = Column(String(10), default='hdlc')  # 'hdlc' (IEC 62056-46) or 'wrapper' (IEC 62056-47)
     
     # Status tracking
     status = Column(String(20), default='inactive')  # 'active', 'inactive', 'error', 'discovering'
@@ -178,6 +179,23 @@ class DLMSDiagnostic(Base):
         return f"<DLMSDiagnostic(meter_id={self.meter_id}, ts={self.timestamp}, category={self.category})>"
 
 
+class ScalerUnitCacheEntry(Base):
+    """Scaler/unit of a Register object, cached per meter serial and firmware"""
+    __tablename__ = 'scaler_unit_cache'
+    __table_args__ = (UniqueConstraint('meter_serial', 'obis_code', name='uq_scaler_unit_meter_obis'),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    meter_serial = Column(String(100), nullable=False, index=True)  # serial, or host:port/address
+    firmware_version = Column(String(100), nullable=True)
+    obis_code = Column(String(50), nullable=False)
+    scaler = Column(Integer, nullable=False)
+    unit_code = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ScalerUnitCacheEntry(serial='{self.meter_serial}', obis='{self.obis_code}', scaler={self.scaler}, unit={self.unit_code})>"
+
+
 class Alarm(Base):
     """Alarms and warnings for meter issues"""
     __tablename__ = 'alarms'
@@ -274,7 +292,7 @@ def get_db() -> Session:
 # Utility functions for common operations
 
 def create_meter(session: Session, name: str, ip_address: str, port: int = 3333, 
-                 client_id: int = 1, server_id: int = 1) -> Meter:
+                 client_id: int = 1, server_id: int = 1, transport: str = 'hdlc') -> Meter:
     """Create a new meter entry"""
     meter = Meter(
         name=name,
@@ -282,6 +300,7 @@ def create_meter(session: Session, name: str, ip_address: str, port: int = 3333,
         port=port,
         client_id=client_id,
         server_id=server_id,
+        transport=transport,
         status='inactive'
     )
     session.add(meter)
@@ -475,6 +494,58 @@ def record_dlms_diagnostic(session: Session, meter_id: int, category: str, messa
     return diag
 
 
+def load_scaler_units(session: Session, meter_serial: str,
+                      firmware_version: Optional[str]) -> Dict[str, Tuple[int, int]]:
+    """Return cached scalers for a meter, dropping entries from other firmware versions"""
+    entries = session.query(ScalerUnitCacheEntry).filter(ScalerUnitCacheEntry.meter_serial == meter_serial).all()
+    stale = [entry for entry in entries if entry.firmware_version != firmware_version]
+    if stale:
+        for entry in stale:
+            session.delete(entry)
+        session.commit()
+    return {entry.obis_code: (entry.scaler, entry.unit_code)
+            for entry in entries if entry.firmware_version == firmware_version}
+
+
+def save_scaler_units(session: Session, meter_serial: str, firmware_version: Optional[str],
+                      entries: Dict[str, Tuple[int, int]]) -> int:
+    """Insert or update cached scalers for a meter"""
+    existing = {
+        entry.obis_code: entry
+        for entry in session.query(ScalerUnitCacheEntry).filter(
+            ScalerUnitCacheEntry.meter_serial == meter_serial,
+            ScalerUnitCacheEntry.obis_code.in_(list(entries)),
+        )
+    }
+    for obis_code, (scaler, unit_code) in entries.items():
+        entry = existing.get(obis_code)
+        if entry is None:
+            session.add(ScalerUnitCacheEntry(meter_serial=meter_serial, firmware_version=firmware_version,
+                                             obis_code=obis_code, scaler=scaler, unit_code=unit_code))
+        else:
+            entry.firmware_version = firmware_version
+            entry.scaler = scaler
+            entry.unit_code = unit_code
+    session.commit()
+    return len(entries)
+
+
+class ScalerUnitStore:
+    """Persistent backend for dlms_reader.ScalerUnitCache"""
+
+    def __init__(self, database: Optional[Database] = None):
+        self.database = database or db
+
+    def load(self, meter_serial: str, firmware_version: Optional[str]) -> Dict[str, Tuple[int, int]]:
+        with self.database.get_session() as session:
+            return load_scaler_units(session, meter_serial, firmware_version)
+
+    def save(self, meter_serial: str, firmware_version: Optional[str],
+             entries: Dict[str, Tuple[int, int]]) -> None:
+        with self.database.get_session() as session:
+            save_scaler_units(session, meter_serial, firmware_version, entries)
+
+
 def get_recent_diagnostics(session: Session, meter_id: int, limit: int = 100):
     """Return recent DLMS diagnostics for a meter"""
     return session.query(DLMSDiagnostic).filter(DLMSDiagnostic.meter_id == meter_id).order_by(DLMSDiagnostic.timestamp.desc()).limit(limit).all()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Migration script: Add DLMS transport (HDLC / IEC 62056-47 wrapper) to meters table
+"""
+
+import sqlite3
+import sys
+
+def migrate_database(db_path: str = "data/admin.db"):
+    """Add transport field to meters table"""
+    
+    print(f"🔧 Migrating database: {db_path}")
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    # Check if column already exists
+    cursor.execute("PRAGMA table_info(meters)")
+    columns = [row[1] for row in cursor.fetchall()]
+    
+    if 'transport' in columns:
+        print("✅ Database already up to date")
+        conn.close()
+        return
+    
+    # Existing meters keep HDLC; switch them to 'wrapper' one by one once
+    # they are known to support IEC 62056-47.
+    migration = "ALTER TABLE meters ADD COLUMN transport VARCHAR(10) DEFAULT 'hdlc'"
+    print(f"📝 Applying migration:\n   1. {migration}")
+    try:
+        cursor.execute(migration)
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+        conn.rollback()
+        conn.close()
+        sys.exit(1)
+    
+    conn.commit()
+    conn.close()
+    
+    print("✅ Migration completed successfully")
+
+
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "data/admin.db"
+    migrate_database(db_path)
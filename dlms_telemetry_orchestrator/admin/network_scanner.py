@@ -186,8 +186,7 @@ class DLMSNetworkScanner:
     
     def _get_device_info(self, ip: str, port: int, timeout: float = 3.0) -> Optional[Dict[str, str]]:
         """
-        Attempt to retrieve device information via DLMS
-        This is a simplified version - full implementation would use dlms_reader
+        Attempt to retrieve device information via DLMS (serial number and firmware)
         
         Args:
             ip: IP address
@@ -201,38 +200,33 @@ class DLMSNetworkScanner:
             # Import here to avoid circular dependency
             import sys
             from pathlib import Path
-            sys.path.insert(0, str(Path(__file__).parent.parent / 'app'))
+            sys.path.insert(0, str(Path(__file__).parent.parent))
             
-            from dlms_config import DLMSConfig
             from dlms_reader import DLMSClient
             
-            # Quick connection attempt
-            config = DLMSConfig(
+            # Public client association with the reader's default credentials
+            client = DLMSClient(
                 host=ip,
                 port=port,
+                server_logical=1,
+                server_physical=1,
+                client_sap=16,
+                max_info_length=None,
+                password=b"22222222",
                 timeout=timeout,
-                client_id=1,
-                server_id=1
             )
-            
-            client = DLMSClient(config)
             client.connect()
-            
-            # Try to read common device info OBIS codes
-            # 0.0.96.1.0.255 - Device ID 1
-            # 0.0.96.1.1.255 - Device ID 2 (often serial)
-            # 0.0.96.1.2.255 - Device ID 3 (often model)
-            
-            device_info = {}
-            
             try:
-                # This is simplified - actual implementation would parse responses
-                device_info['serial'] = f"METER-{ip.split('.')[-1]}"
-                device_info['model'] = "DLMS-Unknown"
-            except:
-                pass
+                # 0.0.96.1.0.255 (serial) + active firmware identifier, one round trip
+                serial, firmware = client.identify()
+            finally:
+                client.close()
             
-            client.disconnect()
+            device_info = {}
+            if serial:
+                device_info['serial'] = serial
+            if firmware:
+                device_info['firmware'] = firmware
             return device_info if device_info else None
             
         except Exception as e:
@@ -22,7 +22,7 @@ mp.set_start_method('spawn', force=True)
 from admin.database import (
     Database, Meter, MeterMetric, Alarm,
     get_meter_by_id, get_all_meters, get_active_meters,
-    create_alarm, record_metric
+    create_alarm, record_metric, ScalerUnitStore
 )
 
 logger = logging.getLogger(__name__)
@@ -387,7 +387,10 @@ class MeterOrchestrator:
                 password="22222222",
                 interval=interval,
                 measurements=measurements,
-                verbose=True
+                verbose=True,
+                transport=getattr(meter, 'transport', None) or 'hdlc',
+                # Caché de scalers en la base de este proceso (no en el db global de data/admin.db)
+                scaler_store=ScalerUnitStore(db)
             )
             
             # Initialize MQTT client (sanitize client_id - remove spaces and special chars)
@@ -412,6 +415,9 @@ class MeterOrchestrator:
                 port=tb_port,
                 client_id=mqtt_client_id,
                 access_token=tb_token,
+                # Cola en disco por medidor (no por client_id, que cambia con el PID):
+                # lo encolado antes de un reinicio se reenvía desde el mismo directorio
+                spool_dir=os.path.join("data", "spool", f"meter_{meter_id}"),
                 reconnect_delay_max=5.0  # Faster reconnection attempts
             )
             
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the hot paths of ``dlms_reader``.
+
+Each benchmark compares the current implementation against the reference
+version it replaced and checks that both produce identical results before
+timing them, so a regression in correctness fails loudly instead of showing up
+as a suspicious speedup.
+
+Usage::
+
+    python bench_dlms_reader.py              # run every benchmark
+    python bench_dlms_reader.py crc          # run a single benchmark
+    python bench_dlms_reader.py --number 20000
+
+Only the standard library is required.
+"""
+
+from __future__ import annotations
+
+import argparse
+import socket
+import sys
+import timeit
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import dlms_reader as dr
+
+
+# ---------------------------------------------------------------------------
+# Reference implementations
+# ---------------------------------------------------------------------------
+
+
+def _crc16_hdlc_bitwise(data: bytes) -> int:
+    """Original bit-at-a-time CRC16 kept as the benchmark baseline."""
+
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ 0x8408
+            else:
+                crc >>= 1
+    return (~crc) & 0xFFFF
+
+
+def _read_frame_bytewise(sock: socket.socket) -> bytes:
+    """Original recv(1)-per-byte frame reader kept as the benchmark baseline."""
+
+    buffer = bytearray()
+    while True:
+        chunk = sock.recv(1)
+        if not chunk:
+            raise ConnectionError("Socket closed while waiting for frame")
+        byte = chunk[0]
+        if not buffer:
+            if byte != 0x7E:
+                continue
+            buffer.append(byte)
+        else:
+            buffer.append(byte)
+            if byte == 0x7E:
+                if len(buffer) == 1:
+                    buffer.clear()
+                    buffer.append(byte)
+                    continue
+                return bytes(buffer)
+
+
+@dataclass
+class _LegacyParsedFrame:
+    format_field: int
+    destination: int
+    source: int
+    control: int
+    frame_type: str
+    send_sequence: Optional[int]
+    receive_sequence: Optional[int]
+    poll_final: int
+    info: bytes
+    hcs_valid: bool
+    fcs_valid: bool
+
+
+def _parse_frame_slicing(raw: bytes) -> _LegacyParsedFrame:
+    """Original slice-and-concatenate parser kept as the benchmark baseline.
+
+    It uses the table CRC so the comparison isolates the parsing strategy.
+    """
+
+    if len(raw) < 5 or raw[0] != 0x7E or raw[-1] != 0x7E:
+        raise ValueError("Invalid HDLC frame boundary")
+    body = raw[1:-1]
+    format_field = int.from_bytes(body[:2], "big")
+    idx = 2
+    dest, consumed = dr._decode_hdlc_address(body, idx)
+    idx += consumed
+    src, consumed = dr._decode_hdlc_address(body, idx)
+    idx += consumed
+    control = body[idx]
+    idx += 1
+    payload = body[idx:]
+    fcs_bytes = payload[-2:]
+    payload = payload[:-2]
+    if payload:
+        hcs_bytes = payload[:2]
+        info = payload[2:]
+    else:
+        hcs_bytes = b""
+        info = b""
+    header = body[:idx]
+    hcs_valid = True
+    if hcs_bytes:
+        hcs_valid = dr._crc16_hdlc(header) == int.from_bytes(hcs_bytes, "little")
+    fcs_valid = dr._crc16_hdlc(header + hcs_bytes + info) == int.from_bytes(fcs_bytes, "little")
+    frame_type, ns, nr, pf = dr._determine_frame_type(control)
+    return _LegacyParsedFrame(
+        format_field, dest, src, control, frame_type, ns, nr, pf, info, hcs_valid, fcs_valid
+    )
+
+
+def _parse_data_recursive(buffer: bytes) -> Tuple[object, bytes]:
+    """Original recursive slice-per-value decoder kept as the benchmark baseline.
+
+    Reduced to the types present in the sample profile buffer.
+    """
+
+    tag = buffer[0]
+    if tag == 0x00:
+        return None, buffer[1:]
+    if tag in (0x01, 0x02):
+        count, offset = dr._decode_axdr_length(buffer, 1)
+        remaining = buffer[offset:]
+        items = []
+        for _ in range(count):
+            value, remaining = _parse_data_recursive(remaining)
+            items.append(value)
+        return items, remaining
+    if tag == 0x06:
+        return int.from_bytes(buffer[1:5], "big", signed=False), buffer[5:]
+    if tag == 0x09:
+        length = buffer[1]
+        return buffer[2 : 2 + length], buffer[2 + length :]
+    if tag == 0x12:
+        return int.from_bytes(buffer[1:3], "big", signed=False), buffer[3:]
+    raise ValueError(f"Unsupported DLMS data type 0x{tag:02X}")
+
+
+# ---------------------------------------------------------------------------
+# Sample traffic
+# ---------------------------------------------------------------------------
+
+
+def _sample_frames() -> List[bytes]:
+    """Return a representative mix of request/response frames."""
+
+    server = dr._combine_server_address(1, 1)
+    ln = dr.obis_to_bytes("1-1:32.7.0")
+    get_request = dr._build_frame(0x32, server, 1, dr._build_get_apdu(1, 3, ln, 2))
+    get_response = dr._build_frame(
+        0x30, 1, server, b"\xE6\xE7\x00\xC4\x01\x01\x00\x06\x00\x00\x08\xFA"
+    )
+    aarq = dr._build_frame(0x10, server, 1, dr._build_aarq_apdu(b"22222222"))
+    large = dr._build_frame(0x30, 1, server, b"\xE6\xE7\x00" + bytes(range(256)) * 4)
+    return [get_request, get_response, aarq, large]
+
+
+def _sample_profile_buffer(rows: int = 5000) -> bytes:
+    """Encoded load-profile buffer: array of (clock, energy, voltage) rows."""
+
+    stamp = b"\x09\x0C" + bytes.fromhex("07EA0A01040000000080000000")[:12]
+    entries = b"".join(
+        b"\x02\x03" + stamp + b"\x06" + (1000 + i).to_bytes(4, "big") + b"\x12" + (2300 + i % 7).to_bytes(2, "big")
+        for i in range(rows)
+    )
+    return b"\x01" + dr._encode_axdr_length(rows) + entries
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+
+def _time(func: Callable[[], object], number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def bench_crc(number: int) -> Tuple[float, float]:
+    """Table-driven CRC16 vs. the original bitwise loop."""
+
+    frames = _sample_frames()
+    payloads = [frame[1:-3] for frame in frames]
+    for payload in payloads:
+        if dr._crc16_hdlc(payload) != _crc16_hdlc_bitwise(payload):
+            raise AssertionError("table CRC disagrees with bitwise reference")
+
+    def baseline() -> None:
+        for payload in payloads:
+            _crc16_hdlc_bitwise(payload)
+
+    def current() -> None:
+        for payload in payloads:
+            dr._crc16_hdlc(payload)
+
+    return _time(baseline, number), _time(current, number)
+
+
+def bench_receive(number: int) -> Tuple[float, float]:
+    """Buffered recv_into() frame reader vs. the original recv(1) loop."""
+
+    frame = _sample_frames()[1]
+    batch = 20
+    burst = frame * batch
+    number = max(1, number // batch)
+    local, remote = socket.socketpair()
+    client = dr.DLMSClient("bench", 0, 1, 1, 1, None, b"bench")
+    client._sock = local
+    try:
+        remote.sendall(burst)
+        if [_read_frame_bytewise(local) for _ in range(batch)] != [frame] * batch:
+            raise AssertionError("bytewise reader returned unexpected frames")
+        remote.sendall(burst)
+        if [client._read_frame() for _ in range(batch)] != [frame] * batch:
+            raise AssertionError("buffered reader returned unexpected frames")
+
+        def baseline() -> None:
+            remote.sendall(burst)
+            for _ in range(batch):
+                _read_frame_bytewise(local)
+
+        def current() -> None:
+            remote.sendall(burst)
+            for _ in range(batch):
+                client._read_frame()
+
+        return _time(baseline, number) / batch, _time(current, number) / batch
+    finally:
+        client._sock = None
+        local.close()
+        remote.close()
+
+
+def bench_parse(number: int) -> Tuple[float, float]:
+    """In-place offset parser vs. the original slicing parser (GET payload path)."""
+
+    frames = _sample_frames()[:3]
+    for frame in frames:
+        legacy = _parse_frame_slicing(frame)
+        parsed = dr._parse_frame(frame)
+        if legacy.info != parsed.info or legacy.control != parsed.control:
+            raise AssertionError("parsers disagree")
+        if not (legacy.hcs_valid and legacy.fcs_valid and parsed.is_valid):
+            raise AssertionError("sample frame failed CRC validation")
+
+    def baseline() -> None:
+        for frame in frames:
+            _parse_frame_slicing(frame).info[7:]
+
+    def current() -> None:
+        for frame in frames:
+            bytes(dr._parse_frame(frame).info_view[7:])
+
+    return _time(baseline, number), _time(current, number)
+
+
+def bench_request(number: int) -> Tuple[float, float]:
+    """Template-rendered GET.request frames vs. encoding them from scratch."""
+
+    server = dr._combine_server_address(1, 1)
+    ln = dr.obis_to_bytes("1-1:32.7.0")
+    cache = dr.FrameTemplateCache()
+    controls = [((nr << 5) | 0x10 | (ns << 1)) for ns in range(8) for nr in range(8)]
+    template = cache.template(("get", server, 1, 3, ln, 2), server, 1, lambda: dr._build_get_apdu(0, 3, ln, 2))
+    for invoke_id, control in enumerate(controls):
+        rendered = template.render(cache, control, ((dr._GET_INVOKE_ID_OFFSET, invoke_id),))
+        if bytes(rendered) != dr._build_frame(control, server, 1, dr._build_get_apdu(invoke_id, 3, ln, 2)):
+            raise AssertionError("template frame differs from freshly built frame")
+
+    def baseline() -> None:
+        for invoke_id, control in enumerate(controls):
+            dr._build_frame(control, server, 1, dr._build_get_apdu(invoke_id, 3, ln, 2))
+
+    def current() -> None:
+        for invoke_id, control in enumerate(controls):
+            template.render(cache, control, ((dr._GET_INVOKE_ID_OFFSET, invoke_id),))
+
+    return _time(baseline, number) / len(controls), _time(current, number) / len(controls)
+
+
+def bench_decode(number: int) -> Tuple[float, float]:
+    """Iterative memoryview decoder vs. the original recursive slicing one (5000-row profile)."""
+
+    buffer = _sample_profile_buffer()
+    if dr.decode_data(buffer)[0] != _parse_data_recursive(buffer)[0]:
+        raise AssertionError("decoders disagree on the sample profile")
+    number = max(1, number // 500)
+
+    def baseline() -> None:
+        _parse_data_recursive(buffer)
+
+    def current() -> None:
+        dr.decode_data(buffer)
+
+    return _time(baseline, number), _time(current, number)
+
+
+def bench_columns(number: int) -> Tuple[float, float]:
+    """Columnar profile decoding vs. row-wise decode_data (5000-row profile)."""
+
+    buffer = _sample_profile_buffer()
+    rows = dr.decode_data(buffer)[0]
+    columns, vectorized = dr.decode_columns(buffer)
+    if not vectorized or [list(column) for column in columns[1:]] != [list(c) for c in list(zip(*rows))[1:]]:
+        raise AssertionError("columnar decoder disagrees with decode_data")
+    number = max(1, number // 500)
+
+    def baseline() -> None:
+        table = dr.decode_data(buffer)[0]
+        [row[2] * 0.1 for row in table]
+
+    def current() -> None:
+        dr._scale_column(dr.decode_columns(buffer)[0][2], -1)
+
+    return _time(baseline, number), _time(current, number)
+
+
+def bench_scale(number: int) -> Tuple[float, float]:
+    """Fixed-point ScaledValue -> float vs. the original Decimal scaling + float()."""
+
+    from decimal import Decimal, localcontext
+
+    samples = [(2297 + i, -1) for i in range(50)] + [(123456789 + i, -3) for i in range(50)]
+    for raw, scaler in samples:
+        if float(dr.ScaledValue(raw, scaler)) != float(Decimal(raw) * (Decimal(10) ** scaler)):
+            raise AssertionError("fixed-point scaling disagrees with Decimal")
+    number = max(1, number // 10)
+
+    def baseline() -> None:
+        with localcontext() as ctx:
+            ctx.prec = 12
+            [float(float(Decimal(raw) * (Decimal(10) ** scaler))) for raw, scaler in samples]
+
+    def current() -> None:
+        [float(dr.ScaledValue(raw, scaler)) for raw, scaler in samples]
+
+    return _time(baseline, number), _time(current, number)
+
+
+def bench_protocol(number: int) -> Tuple[float, float]:
+    """Register read cycle through the sans-IO core alone vs. over a socket to the same simulated meter."""
+
+    import threading
+
+    obis_codes = ["1-1:32.7.0", "1-1:31.7.0", "1-1:1.8.0"]
+    objects = {}
+    for index, obis in enumerate(obis_codes):
+        ln = dr.obis_to_bytes(obis)
+        objects[(3, ln, 2)] = b"\x12" + (2297 + index).to_bytes(2, "big")
+        objects[(3, ln, 3)] = b"\x02\x02\x0F\xFF\x16\x23"
+    number = max(1, number // 20)
+
+    local, remote = socket.socketpair()
+
+    def serve(meter: dr.MeterSimulator) -> None:
+        while True:
+            data = remote.recv(4096)
+            if not data:
+                return
+            answer = meter.receive_data(data)
+            if answer:
+                remote.sendall(answer)
+
+    server = threading.Thread(target=serve, args=(dr.MeterSimulator(objects),), daemon=True)
+    server.start()
+    sock_client = dr.DLMSClient("bench", 0, 1, 1, 1, None, b"22222222")
+    sock_client._sock = local
+    sock_client._run(sock_client._associate_flow())
+    sim_client = dr.SimulatedDLMSClient(dr.MeterSimulator(objects), 1, 1, 1, None, b"22222222")
+    sim_client.connect()
+    try:
+        expected = [float(value) for value, _unit, _raw in sock_client.read_registers(obis_codes)]
+        if [float(value) for value, _unit, _raw in sim_client.read_registers(obis_codes)] != expected:
+            raise AssertionError("simulator driver disagrees with socket driver")
+
+        def baseline() -> None:
+            sock_client.read_registers(obis_codes)
+
+        def current() -> None:
+            sim_client.read_registers(obis_codes)
+
+        return _time(baseline, number), _time(current, number)
+    finally:
+        sock_client.abort()
+        remote.close()
+        server.join(1.0)
+
+
+def bench_transport(number: int) -> Tuple[float, float]:
+    """Register read cycle over a socket: HDLC frames vs. the IEC 62056-47 wrapper."""
+
+    import threading
+
+    obis_codes = ["1-1:32.7.0", "1-1:31.7.0", "1-1:1.8.0"]
+    objects = {}
+    for index, obis in enumerate(obis_codes):
+        ln = dr.obis_to_bytes(obis)
+        objects[(3, ln, 2)] = b"\x12" + (2297 + index).to_bytes(2, "big")
+        objects[(3, ln, 3)] = b"\x02\x02\x0F\xFF\x16\x23"
+    number = max(1, number // 20)
+
+    def serve(remote: socket.socket, meter: dr.MeterSimulator) -> None:
+        while True:
+            data = remote.recv(4096)
+            if not data:
+                return
+            answer = meter.receive_data(data)
+            if answer:
+                remote.sendall(answer)
+
+    clients = []
+    remotes = []
+    for transport in (dr.TRANSPORT_HDLC, dr.TRANSPORT_WRAPPER):
+        local, remote = socket.socketpair()
+        meter = dr.MeterSimulator(objects, transport=transport)
+        threading.Thread(target=serve, args=(remote, meter), daemon=True).start()
+        client = dr.DLMSClient("bench", 0, 1, 1, 1, None, b"22222222", transport=transport)
+        client._sock = local
+        client._run(client._associate_flow())
+        clients.append(client)
+        remotes.append(remote)
+    hdlc_client, wrapper_client = clients
+    try:
+        expected = [float(value) for value, _unit, _raw in hdlc_client.read_registers(obis_codes)]
+        if [float(value) for value, _unit, _raw in wrapper_client.read_registers(obis_codes)] != expected:
+            raise AssertionError("wrapper transport disagrees with HDLC")
+
+        def baseline() -> None:
+            hdlc_client.read_registers(obis_codes)
+
+        def current() -> None:
+            wrapper_client.read_registers(obis_codes)
+
+        return _time(baseline, number), _time(current, number)
+    finally:
+        for client in clients:
+            client.abort()
+        for remote in remotes:
+            remote.close()
+
+
+BENCHMARKS: Dict[str, Callable[[int], Tuple[float, float]]] = {
+    "transport": bench_transport,
+    "protocol": bench_protocol,
+    "scale": bench_scale,
+    "columns": bench_columns,
+    "decode": bench_decode,
+    "request": bench_request,
+    "parse": bench_parse,
+    "crc": bench_crc,
+    "receive": bench_receive,
+}
+
+
+def _parse_args(argv: Optional[Iterable[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark dlms_reader hot paths")
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        help=f"Benchmarks to run: {', '.join(sorted(BENCHMARKS))} (default: all)",
+    )
+    parser.add_argument("--number", type=int, default=2000, help="Iterations per timing run")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    return args
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    args = _parse_args(argv)
+    selected = args.benchmarks or sorted(BENCHMARKS.keys())
+
+    print(f"{'benchmark':<12} {'baseline':>12} {'current':>12} {'speedup':>9}")
+    for name in selected:
+        baseline, current = BENCHMARKS[name](args.number)
+        speedup = baseline / current if current else float("inf")
+        print(
+            f"{name:<12} {baseline * 1e6:>10.2f}us {current * 1e6:>10.2f}us {speedup:>8.1f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -11,20 +11,28 @@ Scalable service that manages multiple DLMS meters concurrently
 
 import asyncio
 import argparse
+import heapq
+import itertools
+import json
 import logging
+import math
+import os
 import signal
 import sys
 import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from admin.database import Database, get_all_meters, get_meter_by_id, record_metric, create_alarm, update_meter_status, record_dlms_diagnostic, db
-from dlms_poller_production import ProductionDLMSPoller
-from tb_mqtt_client import ThingsBoardMQTTClient
+from admin.database import Database, get_all_meters, get_meter_by_id, record_metric, create_alarm, update_meter_status, record_dlms_diagnostic, db, ScalerUnitStore
+from dlms_poller_production import AsyncDLMSPoller
+from dlms_reader import MultiDropPool, DataNotificationServer, DataNotification
+from tb_mqtt_client import ThingsBoardMQTTClient, ThingsBoardGatewayClient
+from telemetry_spool import DiskQueue, SpoolForwarder
 
 # Configure logging (MEJORADO: INFO para reducir I/O)
 logging.basicConfig(
@@ -40,24 +48,551 @@ network_monitor = get_network_monitor()
 logger.info("✓ Network monitor initialized")
 
 
+# Conjugado de la razón áurea: las fases k·φ mod 1 quedan repartidas de
+# forma casi uniforme para cualquier número de medidores consecutivos.
+_GOLDEN_RATIO_CONJUGATE = 0.6180339887498949
+
+
+def phase_offset(meter_id: int) -> float:
+    """Deterministic phase in [0, 1) of a meter within its polling interval."""
+    return (meter_id * _GOLDEN_RATIO_CONJUGATE) % 1.0
+
+
+class AcquisitionSchedule:
+    """Per-measurement sampling intervals for one meter.
+
+    Each measurement is read on its own grid (multiples of its interval since
+    the epoch, shifted by the meter's phase), so slow grids line up with the
+    fast ones: a 15 min energy register comes due on the same tick as the
+    2 s voltages and is read in the same request. A measurement coming due
+    within ``merge_window`` seconds of the current tick joins that request
+    instead of costing a second round trip moments later.
+
+    *phase* (a fraction of the fastest interval, see phase_offset) spreads
+    the meters of a fleet over the interval instead of polling them all on
+    the same instant.
+    """
+    
+    def __init__(self, intervals: Dict[str, float], merge_window: Optional[float] = None, phase: float = 0.0):
+        if not intervals:
+            raise ValueError("AcquisitionSchedule needs at least one measurement")
+        self.intervals = {name: float(interval) for name, interval in intervals.items()}
+        if min(self.intervals.values()) <= 0:
+            raise ValueError("Sampling intervals must be positive")
+        # Por defecto, 10% del intervalo más rápido
+        self.merge_window = self.fastest * 0.1 if merge_window is None else merge_window
+        # Un único desplazamiento para todas las rejillas del medidor, para que sigan coincidiendo
+        self.offset = (phase % 1.0) * self.fastest
+        self._due = {name: 0.0 for name in self.intervals}  # todo vence en el primer ciclo
+    
+    def resume(self, now: float):
+        """Move slots missed while not polling (startup, reconnect) to the next phase slot.
+
+        Resuming to *now* would poll every meter coming back through the ramp
+        as soon as its connection is up; the next slot of the fastest grid
+        keeps the fleet spread from the first tick.
+        """
+        fastest = self.fastest
+        slot = self.offset + math.ceil((now - self.offset) / fastest) * fastest
+        for name, at in self._due.items():
+            if at < now:
+                self._due[name] = slot
+    
+    @property
+    def fastest(self) -> float:
+        return min(self.intervals.values())
+    
+    def next_due(self) -> float:
+        """Wall-clock time at which the next measurement falls due."""
+        return min(self._due.values())
+    
+    def delay(self, now: float) -> float:
+        """Seconds until the next measurement falls due."""
+        return max(0.0, self.next_due() - now)
+    
+    def take_due(self, now: float) -> List[str]:
+        """Return the measurements to read now, in configuration order, and book their next slot."""
+        horizon = now + self.merge_window
+        due = [name for name, at in self._due.items() if at <= horizon]
+        for name in due:
+            interval = self.intervals[name]
+            self._due[name] = self.offset + (math.floor((horizon - self.offset) / interval) + 1) * interval
+        return due
+
+
+class ConnectionRamp:
+    """Limits concurrent DLMS connection setups (TCP connect + SNRM/AARQ).
+    
+    At most ``max_concurrent`` setups run fleet-wide and at most ``per_host``
+    against one IP address, so a bridge start or a network blip turns into a
+    steady ramp instead of every meter handshaking at once. Meters sharing
+    one host:port already share one TCP connection (multi-drop); the
+    per-host cap also covers gateways exposing one port per meter.
+    """
+    
+    def __init__(self, max_concurrent: int = 8, per_host: int = 1):
+        if max_concurrent < 1 or per_host < 1:
+            raise ValueError("Connection ramp limits must be at least 1")
+        self.max_concurrent = max_concurrent
+        self.per_host = per_host
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self.setups = 0
+        self.in_progress = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+    
+    @asynccontextmanager
+    async def slot(self, host: str):
+        host_slots = self._hosts.get(host)
+        if host_slots is None:
+            host_slots = self._hosts[host] = asyncio.Semaphore(self.per_host)
+        queued = time.monotonic()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            # Primero el host: un medidor bloqueado por su gateway no retiene un cupo global
+            await host_slots.acquire()
+            try:
+                await self._slots.acquire()
+            except BaseException:
+                host_slots.release()
+                raise
+        finally:
+            self.waiting -= 1
+        waited = time.monotonic() - queued
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.setups += 1
+        self.in_progress += 1
+        try:
+            yield
+        finally:
+            self.in_progress -= 1
+            self._slots.release()
+            host_slots.release()
+    
+    def stats(self) -> Dict:
+        return {
+            'max_concurrent': self.max_concurrent,
+            'per_host': self.per_host,
+            'setups': self.setups,
+            'in_progress': self.in_progress,
+            'waiting': self.waiting,
+            'max_waiting': self.max_waiting,
+            'avg_wait_ms': (self.wait_seconds / self.setups * 1000) if self.setups else 0.0,
+            'max_wait_ms': self.max_wait_seconds * 1000,
+        }
+
+
+class DeadlineScheduler:
+    """Releases the poll jobs of every worker from one heap of deadlines.
+    
+    Workers do not sleep between cycles: a single timer, armed for the
+    earliest deadline in the heap, hands each worker its due measurements at
+    the fixed-rate slots of its AcquisitionSchedule, so the cadence does not
+    drift with cycle time. Lateness is accounted on the worker (see
+    MeterWorker.release): a tick released while the previous cycle is still
+    running is an overrun, ticks piling up behind a pending one are
+    coalesced and counted as skipped, and the time from deadline to poll
+    start is the lag.
+    """
+    
+    def __init__(self):
+        self._heap: List[Tuple[float, int, int]] = []  # (deadline, entry, meter_id)
+        self._workers: Dict[int, 'MeterWorker'] = {}
+        self._entries: Dict[int, int] = {}  # meter_id -> entrada vigente en el heap
+        self._counter = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_deadline: Optional[float] = None
+        self.releases = 0
+    
+    def add(self, worker: 'MeterWorker'):
+        # Lo perdido mientras el worker conectaba no cuenta como retraso
+        worker.schedule.resume(time.time())
+        self._workers[worker.meter_id] = worker
+        self._push(worker)
+    
+    def remove(self, worker: 'MeterWorker'):
+        """Stop releasing jobs to *worker*; its heap entry is dropped lazily."""
+        self._workers.pop(worker.meter_id, None)
+        self._entries.pop(worker.meter_id, None)
+        if not self._workers:
+            self._heap.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+    
+    def _push(self, worker: 'MeterWorker'):
+        entry = next(self._counter)
+        self._entries[worker.meter_id] = entry
+        heapq.heappush(self._heap, (worker.schedule.next_due(), entry, worker.meter_id))
+        self._arm()
+    
+    def _arm(self):
+        while self._heap and self._entries.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)  # entradas de workers retirados o reprogramados
+        if not self._heap:
+            return
+        deadline = self._heap[0][0]
+        if self._timer is not None:
+            if self._timer_deadline <= deadline:
+                return
+            self._timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timer_deadline = deadline
+        self._timer = loop.call_at(loop.time() + max(0.0, deadline - time.time()), self._fire)
+    
+    def _fire(self):
+        self._timer = None
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            deadline, entry, meter_id = heapq.heappop(self._heap)
+            if self._entries.get(meter_id) != entry:
+                continue
+            worker = self._workers[meter_id]
+            self.releases += 1
+            worker.release(deadline, now)
+            self._push(worker)
+        self._arm()
+    
+    def stats(self) -> Dict:
+        """Fleet-wide totals of the per-worker cadence counters."""
+        cadences = [worker.get_cadence_stats() for worker in self._workers.values()]
+        return {
+            'meters': len(cadences),
+            'releases': self.releases,
+            'overruns': sum(c['overruns'] for c in cadences),
+            'skipped_ticks': sum(c['skipped_ticks'] for c in cadences),
+            'max_lag_ms': max((c['max_lag_ms'] for c in cadences), default=0.0),
+            'late_meters': sum(1 for c in cadences if c['overruns'] or c['skipped_ticks']),
+        }
+
+
+class TelemetryBatcher:
+    """Buffers telemetry samples with their acquisition timestamps.
+    
+    Each sample is kept as ``{"ts": ms, "values": {...}}`` under its device
+    and published together with the others as ``{device: [sample, ...]}``
+    when the window opened by the first buffered sample expires or the
+    estimated payload would exceed ``max_bytes``, whichever comes first.
+    The window is the latency ceiling; ``window=0`` publishes every sample
+    as soon as it arrives.
+    
+    ``publish`` is a coroutine taking the batch and returning the bytes
+    sent, or None on failure; failed batches stay queued in order (up to
+    ``max_pending`` samples, newer ones are dropped) and are retried with
+    the next window.
+    """
+    
+    def __init__(self, publish: Callable[[Dict[str, List[Dict]]], Awaitable[Optional[int]]],
+                 window: float = 2.0, max_bytes: int = 32768, max_pending: int = 10000):
+        if window < 0 or max_bytes < 1:
+            raise ValueError("Batch window must be >= 0 and max bytes >= 1")
+        self.publish = publish
+        self.window = window
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        # Lote abierto y lotes cerrados pendientes de publicar: (lote, muestras, bytes estimados, apertura)
+        self._open: Dict[str, List[Dict]] = {}
+        self._open_samples = 0
+        self._open_bytes = 0
+        self._opened = 0.0
+        self._sealed: List[Tuple[Dict[str, List[Dict]], int, int, float]] = []
+        self._sealed_samples = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock = asyncio.Lock()
+        self._tasks = set()
+        self._retry_at = 0.0  # tras un fallo, solo el temporizador reintenta hasta entonces
+        self.samples = 0
+        self.flushes = 0
+        self.window_flushes = 0
+        self.size_flushes = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.samples_sent = 0
+        self.max_batch = 0
+        self.total_age = 0.0
+        self.max_age = 0.0
+    
+    @property
+    def pending(self) -> int:
+        return self._open_samples + self._sealed_samples
+    
+    def add(self, device: str, ts: int, values: Dict):
+        """Buffer one sample acquired at *ts* (ms since the epoch)."""
+        if self.pending >= self.max_pending:
+            self.dropped += 1
+            return
+        sample = {"ts": ts, "values": values}
+        size = len(json.dumps(sample, separators=(',', ':'))) + 1
+        if device not in self._open:
+            size += len(device) + 5  # "name":[...],
+        if self._open and self._open_bytes + size > self.max_bytes:
+            self._seal()
+            self._spawn('size')
+        if not self._open:
+            self._opened = time.monotonic()
+        self._open.setdefault(device, []).append(sample)
+        self._open_samples += 1
+        self._open_bytes += size
+        self.samples += 1
+        if self.window == 0:
+            self._seal()
+            self._spawn('size')
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                max(0.0, self._opened + self.window - time.monotonic()), self._spawn, 'window'
+            )
+    
+    def _seal(self):
+        """Close the open batch; it is published on the next flush."""
+        if self._open:
+            self._sealed.append((self._open, self._open_samples, self._open_bytes, self._opened))
+            self._sealed_samples += self._open_samples
+            self._open, self._open_samples, self._open_bytes = {}, 0, 0
+        if self._timer is not None and time.monotonic() >= self._retry_at:
+            self._timer.cancel()
+            self._timer = None
+    
+    def _spawn(self, reason: str):
+        if reason == 'window':
+            self._timer = None
+        elif time.monotonic() < self._retry_at:
+            return  # el temporizador de reintento ya está armado
+        task = asyncio.ensure_future(self.flush(reason))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def flush(self, reason: str = 'manual') -> bool:
+        """Publish every buffered batch in order; False if a publish failed."""
+        async with self._lock:
+            if reason != 'size':
+                self._seal()
+            while self._sealed:
+                batch, samples, estimate, opened = self._sealed[0]
+                try:
+                    size = await self.publish(batch)
+                except Exception as e:
+                    logger.error(f"❌ Telemetry batch publish error: {e}")
+                    size = None
+                if size is None:
+                    self.failed_flushes += 1
+                    retry = max(self.window, 1.0)
+                    self._retry_at = time.monotonic() + retry
+                    if self._timer is not None:
+                        self._timer.cancel()
+                    self._timer = asyncio.get_running_loop().call_later(retry, self._spawn, 'window')
+                    return False
+                self._sealed.pop(0)
+                self._sealed_samples -= samples
+                age = time.monotonic() - opened
+                self.flushes += 1
+                if reason == 'window':
+                    self.window_flushes += 1
+                elif reason == 'size':
+                    self.size_flushes += 1
+                self.samples_sent += samples
+                self.bytes_sent += size
+                self.max_batch = max(self.max_batch, samples)
+                self.total_age += age
+                self.max_age = max(self.max_age, age)
+                if size:
+                    network_monitor.record_mqtt_message(size)
+            self._retry_at = 0.0
+            return True
+    
+    async def close(self):
+        """Publish what is left and stop the window timer."""
+        await self.flush()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+    
+    def stats(self) -> Dict:
+        return {
+            'window_s': self.window,
+            'max_bytes': self.max_bytes,
+            'pending': self.pending,
+            'samples': self.samples,
+            'flushes': self.flushes,
+            'window_flushes': self.window_flushes,
+            'size_flushes': self.size_flushes,
+            'failed_flushes': self.failed_flushes,
+            'dropped': self.dropped,
+            'bytes_sent': self.bytes_sent,
+            'avg_batch': (self.samples_sent / self.flushes) if self.flushes else 0.0,
+            'max_batch': self.max_batch,
+            'avg_age_ms': (self.total_age / self.flushes * 1000) if self.flushes else 0.0,
+            'max_age_ms': self.max_age * 1000,
+        }
+
+
+class PipelineStage:
+    """One stage of a worker pipeline: a bounded queue drained by one task.
+    
+    ``put`` waits while the queue is full, so a slow stage pushes back on
+    the one feeding it; ``offer`` never waits and evicts the oldest item
+    instead, for producers that must keep their cadence. Latency is
+    measured from enqueue to the end of the handler, so it includes the
+    time spent waiting in the queue.
+    """
+    
+    def __init__(self, name: str, handler: Callable[[object], Awaitable[None]], maxsize: int = 32):
+        if maxsize < 1:
+            raise ValueError("Pipeline stage queue size must be at least 1")
+        self.name = name
+        self.handler = handler
+        self.maxsize = maxsize
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._task: Optional[asyncio.Task] = None
+        self.processed = 0
+        self.errors = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.blocked = 0  # put() que tuvieron que esperar hueco
+        self.blocked_seconds = 0.0
+    
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"stage-{self.name}")
+    
+    async def put(self, item):
+        """Enqueue *item*, waiting for room (backpressure)."""
+        if self.queue.full():
+            self.blocked += 1
+            waited = time.monotonic()
+            await self.queue.put((time.monotonic(), item))
+            self.blocked_seconds += time.monotonic() - waited
+        else:
+            self.queue.put_nowait((time.monotonic(), item))
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+    
+    def offer(self, item):
+        """Enqueue *item* without waiting; the oldest queued item is dropped if full."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+        self.queue.put_nowait((time.monotonic(), item))
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+    
+    async def _run(self):
+        while True:
+            queued, item = await self.queue.get()
+            try:
+                await self.handler(item)
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"❌ Pipeline stage {self.name} failed: {e}")
+            finally:
+                latency = time.monotonic() - queued
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+                self.queue.task_done()
+    
+    async def stop(self, timeout: float = 5.0):
+        """Let the queue drain for up to *timeout* seconds, then stop the task."""
+        if self._task is None:
+            return
+        if not self._task.done():
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️  Pipeline stage {self.name}: {self.queue.qsize()} items left after {timeout}s")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+    
+    def stats(self) -> Dict:
+        handled = self.processed + self.errors
+        return {
+            'depth': self.queue.qsize(),
+            'max_depth': self.max_depth,
+            'capacity': self.maxsize,
+            'processed': self.processed,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'blocked': self.blocked,
+            'blocked_ms': self.blocked_seconds * 1000,
+            'avg_latency_ms': (self.total_latency / handled * 1000) if handled else 0.0,
+            'max_latency_ms': self.max_latency * 1000,
+        }
+
+
 class MeterWorker:
     """Worker that handles a single DLMS meter"""
     
-    def __init__(self, meter_id: int, config: Dict):
+    def __init__(self, meter_id: int, config: Dict, link_pool: Optional[MultiDropPool] = None,
+                 scheduler: Optional[DeadlineScheduler] = None, ramp: Optional[ConnectionRamp] = None,
+                 gateway: Optional[ThingsBoardGatewayClient] = None, batcher: Optional[TelemetryBatcher] = None,
+                 scaler_store: Optional[ScalerUnitStore] = None):
         self.meter_id = meter_id
         self.meter_name = config['meter_name']
         self.config = config
+        # Pool de enlaces multi-drop: solo si otros medidores comparten host:port
+        self.link_pool = link_pool
         self.mqtt_client: Optional[ThingsBoardMQTTClient] = None  # ✅ SDK oficial ThingsBoard
-        self.poller: Optional[ProductionDLMSPoller] = None
+        # Sesión gateway compartida por el bridge; sin ella, cliente propio por token
+        self.gateway = gateway
+        self._using_raw_mqtt = False
+        # Cola en disco del modo broker local (los clientes ThingsBoard llevan la suya)
+        self.spool_forwarder: Optional[SpoolForwarder] = None
+        # Lotes por ventana: compartido en modo gateway, propio con token por medidor
+        self.batcher = batcher
+        self._own_batcher = False
+        # Pipeline: adquisición (poll/push) → transformación → publicación, con colas acotadas.
+        # La adquisición nunca espera: si transform va atrasado se descarta la lectura más antigua.
+        depth = config.get('pipeline_depth', 32)
+        self.transform_stage = PipelineStage('transform', self._transform, depth)
+        self.publish_stage = PipelineStage('publish', self._publish, depth)
+        self.acquired = 0
+        self.poller: Optional[AsyncDLMSPoller] = None
+        # Store de scalers sobre la base compartida del bridge (no un engine por poller)
+        self.scaler_store = scaler_store
         self.running = False
         self.task: Optional[asyncio.Task] = None
+        # Intervalo propio por medición (MeterConfig.sampling_interval), con
+        # una fase fija por medidor para repartir la flota dentro del intervalo
+        self.schedule = AcquisitionSchedule(
+            config.get('intervals') or {m: config.get('interval', 1.0) for m in config['measurements']},
+            phase=phase_offset(meter_id)
+        )
+        # Rampa de conexiones (compartida por el bridge)
+        self.ramp = ramp
+        # Planificador central (compartido por el bridge) que libera los ciclos
+        self.scheduler = scheduler or DeadlineScheduler()
+        self._job: Optional[Tuple[float, List[str]]] = None  # (deadline, mediciones) pendiente
+        self._job_ready = asyncio.Event()
+        self._busy = False
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.lag_samples = 0
         
         # Statistics
         self.total_cycles = 0
         self.successful_cycles = 0
         self.failed_cycles = 0
         self.total_messages_sent = 0
+        self.total_poll_seconds = 0.0
+        self.push_notifications = 0  # DataNotifications recibidas por el listener
         self.start_time = datetime.now()
+        self._reported = {}  # Contadores ya volcados a MeterMetric
         
         # Watchdog para errores HDLC (MEJORADO: threshold más tolerante)
         self.consecutive_hdlc_errors = 0
@@ -139,6 +674,18 @@ class MeterWorker:
             tb_port = self.config.get('tb_port', 1883)
             tb_token = self.config.get('tb_token', '')
             
+            if self.gateway:
+                # Gateway mode: one shared session, this meter is a device behind it
+                self.mqtt_client = self.gateway.device(self.meter_name, "DLMS Meter")
+                connected = await asyncio.to_thread(self.mqtt_client.connect)
+                self._using_raw_mqtt = False
+                self._ensure_batcher()
+                if connected:
+                    self.logger.info(f"✅ Publishing through gateway session as device '{self.meter_name}'")
+                else:
+                    self.logger.warning("⚠️ Gateway session down: device will be announced on reconnect")
+                return True
+            
             # Check if using local broker (no token) or ThingsBoard direct (with token)
             if not tb_token and tb_port == 1884:
                 # Local broker mode (Gateway architecture)
@@ -151,9 +698,25 @@ class MeterWorker:
                     protocol=mqtt.MQTTv311
                 )
                 
-                # Connect to local broker
-                connected = await asyncio.to_thread(
-                    self.mqtt_client.connect,
+                # Store-and-forward: lo publicado pasa por la cola en disco del medidor
+                self.spool_forwarder = SpoolForwarder(
+                    DiskQueue(self.config.get('spool_dir') or os.path.join('data', 'spool', f"meter_{self.meter_id}"), max_bytes=self.config.get('spool_max_bytes', 64 * 1024 * 1024)),
+                    self.mqtt_client,
+                    rate=self.config.get('drain_rate', 50.0),
+                    name=f"dlms_meter_{self.meter_id}"
+                )
+                forwarder = self.spool_forwarder
+                self.mqtt_client.on_connect = lambda client, userdata, flags, rc: forwarder.on_connect()
+                self.mqtt_client.on_disconnect = lambda client, userdata, rc: forwarder.on_disconnect()
+                self.mqtt_client.on_publish = lambda client, userdata, mid: forwarder.on_publish(mid)
+                
+                # Store flag to know we're using raw MQTT (antes de conectar: el except libera según el modo)
+                self._using_raw_mqtt = True
+                
+                # Connect to local broker: connect_async + loop_start so that a broker that is
+                # down now still gets paho's reconnect loop, whose on_connect drains the spool
+                await asyncio.to_thread(
+                    self.mqtt_client.connect_async,
                     tb_host,
                     tb_port,
                     60  # keepalive
@@ -162,9 +725,6 @@ class MeterWorker:
                 # Start loop
                 self.mqtt_client.loop_start()
                 
-                # Store flag to know we're using raw MQTT
-                self._using_raw_mqtt = True
-                
                 self.logger.info(f"✅ Connected to local broker (Gateway will forward to ThingsBoard)")
                 return True
                 
@@ -177,9 +737,16 @@ class MeterWorker:
                     host=tb_host,
                     port=tb_port,
                     token=tb_token,
-                    client_id=f"dlms_meter_{self.meter_id}"
+                    client_id=f"dlms_meter_{self.meter_id}",
+                    spool_dir=self.config.get('spool_dir'),
+                    spool_max_bytes=self.config.get('spool_max_bytes', 64 * 1024 * 1024),
+                    drain_rate=self.config.get('drain_rate', 50.0)
                 )
                 
+                # Store flag to know we're using ThingsBoard SDK; el batcher existe antes de conectar
+                self._using_raw_mqtt = False
+                self._ensure_batcher()
+                
                 # Connect with automatic reconnection
                 connected = await asyncio.to_thread(
                     self.mqtt_client.connect,
@@ -187,14 +754,12 @@ class MeterWorker:
                     keepalive=90
                 )
                 
-                # Store flag to know we're using ThingsBoard SDK
-                self._using_raw_mqtt = False
-                
                 if connected:
                     self.logger.info(f"✅ MQTT client ready for meter {self.meter_id} (Token: {tb_token[:10]}...{tb_token[-4:]})")
                     return True
                 else:
                     self.logger.error(f"❌ MQTT connection failed for meter {self.meter_id}")
+                    await self._discard_mqtt_client()
                     return False
             else:
                 self.logger.error("❌ Invalid MQTT config: no token and port != 1884")
@@ -204,7 +769,26 @@ class MeterWorker:
             self.logger.error(f"❌ Failed to setup MQTT: {e}")
             import traceback
             self.logger.error(traceback.format_exc())
+            await self._discard_mqtt_client()
             return False
+    
+    async def _discard_mqtt_client(self):
+        """Release a client whose setup failed so _start_with_retries runs _setup_mqtt again"""
+        client, self.mqtt_client = self.mqtt_client, None
+        if client is None or self.gateway:
+            return
+        try:
+            if self._using_raw_mqtt:
+                forwarder, self.spool_forwarder = self.spool_forwarder, None
+                if forwarder:
+                    # Libera la cola en disco: el reintento abre una nueva sobre el mismo directorio
+                    await asyncio.to_thread(forwarder.stop, 0)
+                    forwarder.queue.close()
+                client.loop_stop()
+            else:
+                await asyncio.to_thread(client.stop)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Error releasing MQTT client: {e}")
         
     def create_poller(self):
         """Create DLMS poller for this meter"""
@@ -216,7 +800,11 @@ class MeterWorker:
             
             self.logger.info(f"Creating poller with client_sap={client_sap}, server_id={server_id}, password={password[:2]}***")
             
-            self.poller = ProductionDLMSPoller(
+            if self.scaler_store is None:
+                # Worker suelto (sin bridge): un solo engine para todos sus pollers
+                self.scaler_store = ScalerUnitStore(Database(self.config.get('db_path', 'data/admin.db')))
+            
+            self.poller = AsyncDLMSPoller(
                 host=self.config['dlms_host'],
                 port=self.config['dlms_port'],
                 password=password,
@@ -224,17 +812,186 @@ class MeterWorker:
                 server_id=server_id,
                 measurements=self.config['measurements'],
                 interval=self.config.get('interval', 1.0),
-                verbose=False
+                verbose=False,
+                window_size=self.config.get('window_size', 1),
+                max_info_length=self.config.get('max_info_length'),
+                transport=self.config.get('transport', 'hdlc'),
+                scaler_store=self.scaler_store,
+                link=(
+                    self.link_pool.link(self.config['dlms_host'], self.config['dlms_port'])
+                    if self.link_pool else None
+                ),
+                setup_slot=(
+                    (lambda: self.ramp.slot(self.config['dlms_host']))
+                    if self.ramp else None
+                )
+            )
+            self.logger.info(
+                f"✓ Poller created for {self.config['dlms_host']}:{self.config['dlms_port']} "
+                f"(client_sap={client_sap}, transport={self.config.get('transport', 'hdlc')})"
             )
-            self.logger.info(f"✓ Poller created for {self.config['dlms_host']}:{self.config['dlms_port']} (client_sap={client_sap})")
             return True
         except Exception as e:
             self.logger.error(f"❌ Failed to create poller: {e}")
             return False
     
+    async def publish_readings(self, readings: Dict, ts: Optional[int] = None):
+        """Entrega un ciclo de lecturas (polling o push) al pipeline de publicación.
+        
+        ts: marca de tiempo en ms de la adquisición; por defecto, ahora.
+        No espera a MQTT: un broker lento no retrasa el siguiente ciclo.
+        """
+        self.acquired += 1
+        self.transform_stage.offer((ts if ts is not None else int(time.time() * 1000), readings))
+    
+    async def _transform(self, item: Tuple[int, Dict]):
+        """Etapa transform: lecturas → diccionario de telemetría numérica"""
+        ts, readings = item
+        telemetry = {}
+        for key, value in readings.items():
+            if key != 'timestamp' and value is not None:
+                try:
+                    telemetry[key] = float(value)
+                except (ValueError, TypeError) as e:
+                    self.logger.warning(f"⚠️  Error converting {key}={value}: {e}")
+                    telemetry[key] = str(value)
+        
+        self.logger.debug(f"🔍 Telemetry built: {telemetry}")
+        
+        if telemetry:
+            await self.publish_stage.put((ts, telemetry))
+        else:
+            self.logger.warning(f"⚠️  Telemetry empty, skipping MQTT publish")
+    
+    async def _publish(self, item: Tuple[int, Dict]):
+        """Etapa publish: broker local directo o TelemetryBatcher (SDK / gateway)"""
+        ts, telemetry = item
+        if not self.mqtt_client:
+            self.logger.warning(f"⚠️  MQTT not configured, skipping publish")
+            return
+        
+        if not self._using_raw_mqtt:
+            # ThingsBoard SDK / gateway mode: batched with the acquisition timestamp
+            self.batcher.add(self.meter_name, ts, telemetry)
+            self.total_messages_sent += 1  # bytes se contabilizan al publicar el lote
+            return
+        
+        # Raw MQTT mode: publish to local broker (Gateway architecture)
+        # Include device_name for Gateway mapping
+        telemetry_with_device = telemetry.copy()
+        telemetry_with_device['device_name'] = self.meter_name
+        payload = json.dumps({"ts": ts, "values": telemetry_with_device}, separators=(',', ':'))
+        # A la cola en disco; el forwarder publica con QoS=1 cuando el broker responde
+        await asyncio.to_thread(self.spool_forwarder.queue.append, "v1/devices/me/telemetry", payload)
+        self.spool_forwarder.notify()
+        self.total_messages_sent += 1
+        # Bytes reales del payload encolado (el mismo que se publica)
+        mqtt_bytes = len(payload.encode('utf-8'))
+        network_monitor.record_mqtt_message(mqtt_bytes)
+        self.logger.debug(f"📤 Queued + tracked: {mqtt_bytes} bytes MQTT")
+    
+    def _ensure_batcher(self):
+        """Lotes propios si el bridge no comparte uno (modo token por medidor)"""
+        if self.batcher is None:
+            self.batcher = TelemetryBatcher(
+                self._publish_batch,
+                window=self.config.get('batch_window', 2.0),
+                max_bytes=self.config.get('batch_max_bytes', 32768)
+            )
+            self._own_batcher = True
+    
+    async def _publish_batch(self, batch: Dict[str, List[Dict]]) -> Optional[int]:
+        """Publica un lote propio como array [{ts, values}, ...] con el token del medidor"""
+        if not self.mqtt_client:
+            return None
+        ok = await asyncio.to_thread(self.mqtt_client.publish_telemetry, batch[self.meter_name])
+        return self.mqtt_client.last_payload_bytes if ok else None
+    
+    async def handle_push(self, notification: DataNotification):
+        """Publica una DataNotification recibida por el listener push.
+        
+        Sigue el mismo camino que un ciclo de polling (contadores, watchdog y
+        publicación); la marca de tiempo es la del medidor si la incluye.
+        """
+        if not self.poller and not self.create_poller():
+            return
+        readings = self.poller.decode_notification(notification)
+        self.push_notifications += 1
+        self.total_cycles += 1
+        if not any(v is not None for v in readings.values()):
+            self.failed_cycles += 1
+            self.logger.warning(f"⚠️  Push sin valores numéricos: {notification.value!r}")
+            return
+        self.successful_cycles += 1
+        self.last_successful_read = datetime.now()
+        self.consecutive_read_failures = 0
+        ts = None
+        if notification.timestamp is not None:
+            stamp = notification.timestamp
+            if stamp.tzinfo is None:
+                stamp = stamp.astimezone()  # hora local del medidor
+            ts = int(stamp.timestamp() * 1000)
+        await self.publish_readings(readings, ts)
+    
+    def release(self, deadline: float, now: float):
+        """Called by the DeadlineScheduler when this meter's next slot is reached."""
+        due = self.schedule.take_due(now)
+        self.ticks += 1
+        # Slots that passed while the event loop was too busy to fire on time
+        self.skipped_ticks += int((now - deadline) // self.schedule.fastest)
+        if self._job is not None:
+            # The previous tick has not started yet: coalesce so slow
+            # measurements are not lost, and count the fast tick as skipped.
+            self.skipped_ticks += 1
+            pending_deadline, pending = self._job
+            self._job = (pending_deadline, pending + [m for m in due if m not in pending])
+            return
+        if self._busy:
+            self.overruns += 1
+        self._job = (deadline, due)
+        self._job_ready.set()
+    
+    async def _next_job(self) -> List[str]:
+        """Wait for the scheduler to release the next cycle; return its measurements."""
+        self._busy = False
+        await self._job_ready.wait()
+        self._job_ready.clear()
+        deadline, due = self._job
+        self._job = None
+        self._busy = True
+        lag = max(0.0, time.time() - deadline)
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.total_lag += lag
+        self.lag_samples += 1
+        return due
+    
     async def poll_and_publish(self):
         """Main polling loop for this meter with watchdog and connection lifecycle"""
-        self.logger.info(f"🚀 Starting polling loop (interval: {self.config.get('interval', 1.0)}s)")
+        self.scheduler.add(self)
+        try:
+            await self._poll_loop()
+        finally:
+            self.scheduler.remove(self)
+            self._job = None
+            self._job_ready.clear()
+    
+    @asynccontextmanager
+    async def _off_schedule(self):
+        """Leave the scheduler during restarts and back-off sleeps: not overruns nor skipped ticks"""
+        self.scheduler.remove(self)
+        self._job = None
+        self._job_ready.clear()
+        self._busy = False
+        try:
+            yield
+        finally:
+            if self.running:
+                self.scheduler.add(self)  # add() -> resume(): lo perdido no cuenta como retraso
+    
+    async def _poll_loop(self):
+        rates = ", ".join(f"{name}={interval:g}s" for name, interval in self.schedule.intervals.items())
+        self.logger.info(f"🚀 Starting polling loop ({rates})")
         
         while self.running:
             try:
@@ -250,7 +1007,8 @@ class MeterWorker:
                         pass
                     
                     # Reiniciar conexión DLMS
-                    await self._restart_dlms_connection()
+                    async with self._off_schedule():
+                        await self._restart_dlms_connection()
                     self.consecutive_hdlc_errors = 0
                     self.last_successful_read = datetime.now()
                     continue
@@ -261,7 +1019,8 @@ class MeterWorker:
                     
                     # Verificar circuit breaker antes de reconectar
                     if not self._check_circuit_breaker():
-                        await asyncio.sleep(60)  # Esperar 1 min si circuit breaker bloquea
+                        async with self._off_schedule():
+                            await asyncio.sleep(60)  # Esperar 1 min si circuit breaker bloquea
                         continue
                     
                     try:
@@ -271,7 +1030,8 @@ class MeterWorker:
                     except:
                         pass
                     
-                    await self._restart_dlms_connection()
+                    async with self._off_schedule():
+                        await self._restart_dlms_connection()
                     self.consecutive_hdlc_errors = 0
                     continue
                 
@@ -287,11 +1047,16 @@ class MeterWorker:
                             self.last_connection_time = datetime.now()  # Reset timer
                             # NO continuar, seguir usando conexión actual
                         else:
-                            await self._restart_dlms_connection()
+                            async with self._off_schedule():
+                                await self._restart_dlms_connection()
                             continue
                 
-                # Poll readings
-                readings = await asyncio.to_thread(self.poller.poll_once)
+                # Poll readings: el planificador libera las mediciones que vencen (una sola petición)
+                due = await self._next_job()
+                acquired_at = int(time.time() * 1000)  # marca de adquisición de la telemetría
+                poll_started = time.monotonic()
+                readings = await self.poller.poll(due)
+                self.total_poll_seconds += time.monotonic() - poll_started
                 
                 self.total_cycles += 1
                 
@@ -304,72 +1069,7 @@ class MeterWorker:
                     self.consecutive_hdlc_errors = 0  # Reset contador de errores HDLC
                     self.consecutive_read_failures = 0  # NUEVO: Reset contador de fallos de lectura
                     
-                    # Check MQTT connection status
-                    if hasattr(self, '_using_raw_mqtt') and self._using_raw_mqtt:
-                        # Using raw MQTT (local broker mode)
-                        mqtt_connected = self.mqtt_client and self.mqtt_client.is_connected()
-                    else:
-                        # Using ThingsBoard SDK
-                        mqtt_connected = self.mqtt_client and self.mqtt_client.is_connected()
-                    
-                    self.logger.debug(f"🔍 MQTT connected: {mqtt_connected}")
-                    
-                    # Publish to MQTT
-                    if mqtt_connected:
-                        telemetry = {}
-                        for key, value in readings.items():
-                            if key != 'timestamp' and value is not None:
-                                try:
-                                    telemetry[key] = float(value)
-                                except (ValueError, TypeError) as e:
-                                    self.logger.warning(f"⚠️  Error converting {key}={value}: {e}")
-                                    telemetry[key] = str(value)
-                        
-                        self.logger.debug(f"🔍 Telemetry built: {telemetry}")
-                        
-                        if telemetry:
-                            # Publish based on mode
-                            if hasattr(self, '_using_raw_mqtt') and self._using_raw_mqtt:
-                                # Raw MQTT mode: publish to local broker (Gateway architecture)
-                                import json
-                                
-                                # Include device_name for Gateway mapping
-                                telemetry_with_device = telemetry.copy()
-                                telemetry_with_device['device_name'] = self.meter_name
-                                
-                                payload = {
-                                    "ts": int(time.time() * 1000),
-                                    "values": telemetry_with_device
-                                }
-                                result = self.mqtt_client.publish(
-                                    "v1/devices/me/telemetry",
-                                    json.dumps(payload),
-                                    qos=1
-                                )
-                                success = result.rc == 0
-                            else:
-                                # ThingsBoard SDK mode
-                                success = await asyncio.to_thread(
-                                    self.mqtt_client.publish_telemetry,
-                                    telemetry,
-                                    wait=False  # Non-blocking publish
-                                )
-                            
-                            if success:
-                                self.total_messages_sent += 1
-                                # Track MQTT network usage
-                                mqtt_bytes = len(str(telemetry).encode('utf-8'))
-                                try:
-                                    network_monitor.record_mqtt_message(mqtt_bytes)
-                                    self.logger.info(f"📤 Published + tracked: {mqtt_bytes} bytes MQTT (total: {network_monitor.app_stats['mqtt_messages_sent']} msgs)")
-                                except Exception as e:
-                                    self.logger.warning(f"Failed to record MQTT metrics: {e}")
-                            else:
-                                self.logger.warning(f"⚠️  MQTT publish failed")
-                        else:
-                            self.logger.warning(f"⚠️  Telemetry empty, skipping MQTT publish")
-                    else:
-                        self.logger.warning(f"⚠️  MQTT not connected, skipping publish")
+                    await self.publish_readings(readings, acquired_at)
                     
                     # Log summary every 10 cycles
                     if self.total_cycles % 10 == 0:
@@ -417,7 +1117,8 @@ class MeterWorker:
                         
                         # Verificar circuit breaker antes de reconectar
                         if not self._check_circuit_breaker():
-                            await asyncio.sleep(60)  # Esperar 1 min si circuit breaker bloquea
+                            async with self._off_schedule():
+                                await asyncio.sleep(60)  # Esperar 1 min si circuit breaker bloquea
                             continue
                         
                         try:
@@ -427,13 +1128,11 @@ class MeterWorker:
                         except:
                             pass
                         
-                        await self._restart_dlms_connection()
+                        async with self._off_schedule():
+                            await self._restart_dlms_connection()
                         self.consecutive_read_failures = 0
                         continue
                 
-                # Wait for next interval
-                await asyncio.sleep(self.config.get('interval', 1.0))
-                
             except asyncio.CancelledError:
                 self.logger.info("🛑 Polling cancelled")
                 break
@@ -457,17 +1156,11 @@ class MeterWorker:
                         self.logger.info("🔄 Reset de secuencia HDLC detectado, limpiando estado...")
                         try:
                             # Forzar limpieza del poller
-                            if hasattr(self.poller, 'original_client') and self.poller.original_client:
-                                client = self.poller.original_client
-                                # C3: Reset de contadores de secuencia
-                                if hasattr(client, '_send_seq'):
-                                    client._send_seq = 0
-                                if hasattr(client, '_recv_seq'):
-                                    client._recv_seq = 0
-                                # C4: Limpiar buffer
-                                if hasattr(client, '_chunk_buffer'):
-                                    client._chunk_buffer = b''
-                                self.logger.info("✓ Secuencia HDLC reseteada")
+                            if self.poller.client:
+                                # C3/C4: Reset de contadores de secuencia (incluye tramas
+                                # pendientes de ACK) y descarte de bytes sin procesar
+                                discarded = self.poller.client.reset_link_state()
+                                self.logger.info(f"✓ Secuencia HDLC reseteada ({discarded} bytes descartados)")
                         except Exception as reset_err:
                             self.logger.warning(f"Error reseteando secuencia: {reset_err}")
                 
@@ -490,7 +1183,8 @@ class MeterWorker:
                             self.logger.warning(f"Failed to record DLMS diagnostic: {inner_db_e}")
                 except Exception:
                     pass
-                await asyncio.sleep(5)  # Wait before retry
+                async with self._off_schedule():
+                    await asyncio.sleep(5)  # Wait before retry
     
     async def _restart_dlms_connection(self):
         """Reinicia la conexión DLMS de forma limpia"""
@@ -498,9 +1192,9 @@ class MeterWorker:
         
         try:
             # Cerrar conexión existente de forma limpia
-            if self.poller and self.poller.original_client:
+            if self.poller and self.poller.client:
                 try:
-                    await asyncio.to_thread(self.poller.original_client.close)
+                    await self.poller.close()
                     self.logger.debug("✓ Conexión DLMS cerrada")
                 except Exception as e:
                     self.logger.warning(f"Error cerrando conexión: {e}")
@@ -509,7 +1203,7 @@ class MeterWorker:
                 await asyncio.sleep(2.0)
             
             # Reconectar
-            connected = await asyncio.to_thread(self.poller._connect_with_recovery)
+            connected = await self.poller.connect()
             
             if connected:
                 self.last_connection_time = datetime.now()
@@ -518,7 +1212,7 @@ class MeterWorker:
                 self.logger.error("❌ Fallo al reiniciar conexión DLMS")
                 # Intentar recrear el poller completamente
                 self.create_poller()
-                connected = await asyncio.to_thread(self.poller._connect_with_recovery)
+                connected = await self.poller.connect()
                 if connected:
                     self.last_connection_time = datetime.now()
                     self.logger.info("✅ Poller recreado y conectado")
@@ -530,6 +1224,8 @@ class MeterWorker:
     async def start(self):
         """Start the meter worker"""
         self.running = True
+        self.transform_stage.start()
+        self.publish_stage.start()
 
         async def _start_with_retries():
             """Ensure MQTT + DLMS are ready, retrying with backoff until success."""
@@ -548,10 +1244,15 @@ class MeterWorker:
                     if not self.poller:
                         if not self.create_poller():
                             raise RuntimeError("Poller creation failed")
+                    
+                    # Solo push: el medidor envía DataNotifications, no hay sesión DLMS saliente
+                    if self.config.get('push_only'):
+                        self.logger.info("📥 Push-only mode: waiting for DataNotifications")
+                        await asyncio.Event().wait()  # hasta que se cancele la tarea
 
                     # 3) DLMS connect
                     self.logger.info("🔌 Connecting to DLMS meter...")
-                    connected = await asyncio.to_thread(self.poller._connect_with_recovery)
+                    connected = await self.poller.connect()
                     if not connected:
                         raise RuntimeError("DLMS connection failed")
 
@@ -609,14 +1310,29 @@ class MeterWorker:
         
         if self.poller:
             try:
-                await asyncio.to_thread(self.poller.stop)
+                await self.poller.close()
             except Exception as e:
                 self.logger.error(f"Error stopping poller: {e}")
         
+        # Drain the pipeline, then publish what is still batched before the client goes away
+        await self.transform_stage.stop()
+        await self.publish_stage.stop()
+        if self.batcher:
+            try:
+                await (self.batcher.close() if self._own_batcher else self.batcher.flush())
+            except Exception as e:
+                self.logger.error(f"Error flushing telemetry batch: {e}")
+        
         # Disconnect MQTT client using SDK
         if self.mqtt_client:
             try:
-                await asyncio.to_thread(self.mqtt_client.stop)
+                if self._using_raw_mqtt:
+                    await asyncio.to_thread(self.spool_forwarder.stop)
+                    self.spool_forwarder.queue.close()
+                    self.mqtt_client.loop_stop()
+                    self.mqtt_client.disconnect()
+                else:
+                    await asyncio.to_thread(self.mqtt_client.stop)
                 self.logger.info("✓ MQTT client disconnected via SDK")
             except Exception as e:
                 self.logger.error(f"Error disconnecting MQTT: {e}")
@@ -652,23 +1368,115 @@ class MeterWorker:
             'failed_cycles': self.failed_cycles,
             'success_rate': success_rate,
             'messages_sent': self.total_messages_sent,
+            'push_notifications': self.push_notifications,
             'runtime_seconds': runtime,
-            'running': self.running
+            'running': self.running,
+            'cadence': self.get_cadence_stats(),
+            'batching': self.batcher.stats() if self._own_batcher else None,
+            'pipeline': self.get_pipeline_stats(),
+            'spool': self.get_spool_stats(),
+            'caches': self.poller.get_cache_stats() if self.poller else {}
+        }
+    
+    def get_spool_stats(self) -> Optional[Dict]:
+        """Cola en disco propia del medidor (None en modo gateway: la cola es de la sesión)"""
+        forwarder = self.spool_forwarder if self._using_raw_mqtt else getattr(self.mqtt_client, 'forwarder', None)
+        return forwarder.get_stats() if forwarder else None
+    
+    def get_pipeline_stats(self) -> Dict:
+        """Depth, latency and drop counters of each pipeline stage"""
+        return {
+            'acquisition': {
+                'acquired': self.acquired,
+                'avg_poll_ms': (self.total_poll_seconds / self.total_cycles * 1000) if self.total_cycles else 0.0,
+                'max_lag_ms': self.max_lag * 1000,
+            },
+            'transform': self.transform_stage.stats(),
+            'publish': self.publish_stage.stats(),
+        }
+    
+    def get_cadence_stats(self) -> Dict:
+        """Fixed-rate cadence counters kept for the DeadlineScheduler"""
+        return {
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'skipped_ticks': self.skipped_ticks,
+            'last_lag_ms': self.last_lag * 1000,
+            'avg_lag_ms': (self.total_lag / self.lag_samples * 1000) if self.lag_samples else 0.0,
+            'max_lag_ms': self.max_lag * 1000,
+        }
+    
+    def collect_interval_metrics(self) -> Dict:
+        """Counters accumulated since the previous call, in record_metric() terms"""
+        scaler_stats = self.poller.get_cache_stats()['scaler_units'] if self.poller else {}
+        current = {
+            'total_reads': self.total_cycles,
+            'successful_reads': self.successful_cycles,
+            'failed_reads': self.failed_cycles,
+            'messages_sent': self.total_messages_sent,
+            'poll_seconds': self.total_poll_seconds,
+            'cache_hits': scaler_stats.get('hits', 0),
+            'cache_misses': scaler_stats.get('misses', 0),
         }
+        delta = {key: value - self._reported.get(key, 0) for key, value in current.items()}
+        self._reported = current
+        
+        poll_seconds = delta.pop('poll_seconds')
+        delta['avg_read_time'] = poll_seconds / delta['total_reads'] if delta['total_reads'] else 0.0
+        return delta
 
 
 class MultiMeterBridge:
     """Main service that manages multiple meter workers"""
     
-    def __init__(self, db_path: str = "data/admin.db"):
+    def __init__(self, db_path: str = "data/admin.db", push_port: Optional[int] = None, push_only: bool = False,
+                 max_concurrent_setups: int = 8, max_setups_per_host: int = 1,
+                 gateway_host: str = 'localhost', gateway_port: int = 1883, gateway_token: Optional[str] = None,
+                 batch_window: float = 2.0, batch_max_bytes: int = 32768,
+                 spool_dir: str = 'data/spool', spool_max_mb: float = 64.0, drain_rate: float = 50.0):
         self.db_path = db_path
         self.db = Database(db_path)
+        # Caché persistente de scalers compartida por todos los workers
+        self.scaler_store = ScalerUnitStore(self.db)
         self.workers: Dict[int, MeterWorker] = {}
-        # ✅ Remover mqtt_client compartido - cada worker tiene el suyo
+        # Una conexión TCP por concentrador para medidores multi-drop
+        self.link_pool = MultiDropPool()
+        # Un único heap de deadlines libera los ciclos de todos los workers
+        self.scheduler = DeadlineScheduler()
+        # Establecimientos de conexión escalonados (arranque y reconexiones)
+        self.ramp = ConnectionRamp(max_concurrent_setups, max_setups_per_host)
+        self._missed_ticks_reported = 0
+        # Listener para medidores que envían DataNotifications (push)
+        self.push_port = push_port
+        self.push_only = push_only
+        self.push_server: Optional[DataNotificationServer] = None
+        # Cola en disco (store-and-forward): una por cliente MQTT, acotada en bytes
+        self.spool_dir = spool_dir
+        self.spool_max_bytes = int(spool_max_mb * 1024 * 1024)
+        self.drain_rate = drain_rate
+        # Sesión gateway de ThingsBoard compartida; sin token, cada worker usa el suyo
+        self.gateway: Optional[ThingsBoardGatewayClient] = None
+        if gateway_token:
+            self.gateway = ThingsBoardGatewayClient(
+                host=gateway_host,
+                port=gateway_port,
+                token=gateway_token,
+                client_id="dlms_bridge_gateway",
+                spool_dir=os.path.join(spool_dir, "gateway"),
+                spool_max_bytes=self.spool_max_bytes,
+                drain_rate=drain_rate
+            )
+        # Ventana de lotes de telemetría (latencia máxima) y tamaño máximo de payload
+        self.batch_window = batch_window
+        self.batch_max_bytes = batch_max_bytes
+        self.batcher: Optional[TelemetryBatcher] = None  # compartido en modo gateway
         self.running = False
         
         logger.info(f"🏗️  Multi-Meter Bridge initialized (DB: {db_path})")
-        logger.info(f"   Architecture: Individual MQTT per meter (QoS=1)")
+        if self.gateway:
+            logger.info(f"   Architecture: One gateway MQTT session for all meters ({gateway_host}:{gateway_port}, QoS=1)")
+        else:
+            logger.info(f"   Architecture: Individual MQTT per meter (QoS=1)")
     
     def load_meters_from_db(self) -> List[Dict]:
         """Load all active meters from database"""
@@ -692,12 +1500,13 @@ class MultiMeterBridge:
                     logger.info(f"ℹ️  Meter {meter.id} ({meter.name}) has ThingsBoard disabled, skipping")
                     continue
                 
-                # Get sampling interval from MeterConfig
-                # Optimized to 2.0s for maximum performance while maintaining reliability
-                sampling_interval = 2.0  # Optimal: 30 readings/minute, safe margin for DLMS
-                if meter.configs:
-                    # Use first config's sampling interval
-                    sampling_interval = meter.configs[0].sampling_interval
+                # Get sampling interval of each measurement from MeterConfig
+                # Default 2.0s: 30 readings/minute, safe margin for DLMS
+                intervals = {
+                    cfg.measurement_name: cfg.sampling_interval or 2.0
+                    for cfg in meter.configs if cfg.enabled
+                }
+                sampling_interval = min(intervals.values())
                 
                 config = {
                     'meter_id': meter.id,
@@ -707,13 +1516,21 @@ class MultiMeterBridge:
                     'client_sap': meter.client_id,  # DLMS client address
                     'server_id': meter.server_id,   # DLMS server address
                     'password': getattr(meter, 'password', '22222222'),  # DLMS password
+                    'transport': getattr(meter, 'transport', None) or 'hdlc',  # HDLC o wrapper IEC 62056-47
                     'measurements': measurements,
-                    'interval': sampling_interval,  # C2: Usa interval de BD (5.0s) en vez de hardcoded 3.0s
+                    'interval': sampling_interval,  # Intervalo más rápido (los demás se leen en su propio ciclo)
+                    'intervals': intervals,  # Intervalo por medición
                     'tb_enabled': meter.tb_enabled,
                     'tb_host': meter.tb_host,
                     'tb_port': meter.tb_port,
                     'tb_token': meter.tb_token,
-                    'db_path': self.db.db_path  # Pass database path to worker
+                    'db_path': self.db.db_path,  # Pass database path to worker
+                    'push_only': self.push_only,
+                    'batch_window': self.batch_window,
+                    'batch_max_bytes': self.batch_max_bytes,
+                    'spool_dir': os.path.join(self.spool_dir, f"meter_{meter.id}"),
+                    'spool_max_bytes': self.spool_max_bytes,
+                    'drain_rate': self.drain_rate
                 }
                 
                 configs.append(config)
@@ -728,12 +1545,28 @@ class MultiMeterBridge:
         """Start workers for all meters"""
         logger.info(f"🚀 Starting {len(meter_configs)} meter workers...")
         
+        # Medidores que comparten host:port están detrás del mismo concentrador
+        endpoints: Dict[tuple, int] = {}
+        for config in meter_configs:
+            key = (config['dlms_host'], config['dlms_port'])
+            endpoints[key] = endpoints.get(key, 0) + 1
+        shared = {key: count for key, count in endpoints.items() if count > 1}
+        for (host, port), count in shared.items():
+            logger.info(f"🔀 Multi-drop: {count} meters share {host}:{port} over one TCP connection")
+        
         tasks = []
         for config in meter_configs:
             # ✅ Cada worker crea su propio cliente MQTT internamente
+            multi_drop = (config['dlms_host'], config['dlms_port']) in shared
             worker = MeterWorker(
                 meter_id=config['meter_id'],
-                config=config  # Sin mqtt_client compartido
+                config=config,  # Sin mqtt_client compartido
+                link_pool=self.link_pool if multi_drop else None,
+                scheduler=self.scheduler,
+                ramp=self.ramp,
+                gateway=self.gateway,
+                batcher=self.batcher,
+                scaler_store=self.scaler_store
             )
             
             self.workers[config['meter_id']] = worker
@@ -751,10 +1584,39 @@ class MultiMeterBridge:
         
         tasks = [worker.stop() for worker in self.workers.values()]
         await asyncio.gather(*tasks, return_exceptions=True)
+        await self.link_pool.close()
         
         self.workers.clear()
         logger.info("✓ All workers stopped")
     
+    async def _on_push(self, peer, notification: DataNotification):
+        """Entrega una DataNotification al worker del medidor que la envió.
+        
+        El medidor se identifica por IP; si varios comparten IP (multi-drop),
+        por la dirección HDLC de origen de la trama.
+        """
+        candidates = [w for w in self.workers.values() if w.config['dlms_host'] == peer[0]]
+        if len(candidates) > 1 and notification.source is not None:
+            candidates = [w for w in candidates if w.poller and w.poller.server_address == notification.source]
+        if len(candidates) != 1:
+            logger.warning(f"⚠️  Push from {peer[0]}:{peer[1]} (HDLC {notification.source}) matches no single meter, dropped")
+            return
+        await candidates[0].handle_push(notification)
+    
+    async def _connect_gateway(self) -> bool:
+        """Open the shared gateway session; on failure fall back to per-device tokens"""
+        logger.info(f"🔌 Connecting gateway session to {self.gateway.host}:{self.gateway.port}")
+        connected = await asyncio.to_thread(self.gateway.connect, timeout=30, keepalive=90)
+        if not connected:
+            logger.error("❌ Gateway session failed: falling back to one MQTT client per meter token")
+            await asyncio.to_thread(self.gateway.stop)
+            self.gateway = None
+        return connected
+    
+    async def _publish_gateway_batch(self, batch: Dict[str, List[Dict]]) -> Optional[int]:
+        """Publish the batched samples of all meters as one gateway message"""
+        return await asyncio.to_thread(self.gateway.publish_telemetry, batch)
+    
     async def monitor_loop(self):
         """Background monitoring and statistics"""
         logger.info("📊 Starting monitor loop (reporting every 60s)")
@@ -779,6 +1641,59 @@ class MultiMeterBridge:
                     f"MQTT={stats['messages_sent']}, "
                     f"Runtime={stats['runtime_seconds']:.0f}s"
                 )
+                cadence_stats = stats['cadence']
+                if cadence_stats['overruns'] or cadence_stats['skipped_ticks']:
+                    logger.info(
+                        f"  └─ Cadence: overruns={cadence_stats['overruns']}, "
+                        f"skipped ticks={cadence_stats['skipped_ticks']}, "
+                        f"lag avg={cadence_stats['avg_lag_ms']:.0f}ms max={cadence_stats['max_lag_ms']:.0f}ms"
+                    )
+                pipeline_stats = stats['pipeline']
+                logger.info(
+                    f"  └─ Pipeline: acquired={pipeline_stats['acquisition']['acquired']} "
+                    f"(poll avg={pipeline_stats['acquisition']['avg_poll_ms']:.0f}ms)"
+                    + "".join(
+                        f" | {name} depth={st['depth']}/{st['capacity']} (max {st['max_depth']}), "
+                        f"latency avg={st['avg_latency_ms']:.1f}ms max={st['max_latency_ms']:.1f}ms, "
+                        f"dropped={st['dropped']}, blocked={st['blocked']}, errors={st['errors']}"
+                        for name, st in (('transform', pipeline_stats['transform']), ('publish', pipeline_stats['publish']))
+                    )
+                )
+                spool_stats = stats['spool']
+                if spool_stats and (spool_stats['pending_bytes'] or spool_stats['dropped_bytes']):
+                    logger.info(
+                        f"  └─ Spool: {spool_stats['pending_bytes']} bytes pending in {spool_stats['segments']} segments, "
+                        f"sent={spool_stats['sent']} acked={spool_stats['acked']} inflight={spool_stats['inflight']}, "
+                        f"dropped={spool_stats['dropped_bytes']} bytes"
+                    )
+                batch_stats = stats['batching']
+                if batch_stats and batch_stats['flushes']:
+                    logger.info(
+                        f"  └─ Batches: {batch_stats['flushes']} sent, avg {batch_stats['avg_batch']:.1f} samples, "
+                        f"age max={batch_stats['max_age_ms']:.0f}ms, pending={batch_stats['pending']}, "
+                        f"failed={batch_stats['failed_flushes']}, dropped={batch_stats['dropped']}"
+                    )
+                frame_stats = stats['caches'].get('frame_templates')
+                if frame_stats and frame_stats['hit_rate'] is not None:
+                    logger.info(
+                        f"  └─ Frame templates: {frame_stats['templates']} cached, "
+                        f"hit rate {frame_stats['hit_rate']:.1f}%"
+                    )
+                scaler_stats = stats['caches'].get('scaler_units')
+                if scaler_stats and scaler_stats['hit_rate'] is not None:
+                    logger.info(
+                        f"  └─ Scalers: {scaler_stats['entries']} cached "
+                        f"(serial {scaler_stats['identity']}, fw {scaler_stats['firmware']}), "
+                        f"hit rate {scaler_stats['hit_rate']:.1f}%"
+                    )
+                
+                # Save per-interval performance metrics (incl. scaler cache hits/misses)
+                try:
+                    session = self.db.get_session()
+                    record_metric(session, meter_id=stats['meter_id'], **worker.collect_interval_metrics())
+                    session.close()
+                except Exception as e:
+                    logger.warning(f"  └─ Failed to save meter metrics: {e}")
                 
                 # Save network metrics to database
                 try:
@@ -817,6 +1732,69 @@ class MultiMeterBridge:
                 except Exception as e:
                     logger.warning(f"  └─ Failed to save network metrics: {e}")
             
+            ramp_stats = self.ramp.stats()
+            logger.info(
+                f"  Connection ramp: setups={ramp_stats['setups']}, in progress={ramp_stats['in_progress']}, "
+                f"waiting={ramp_stats['waiting']} (max {ramp_stats['max_waiting']}), "
+                f"wait avg={ramp_stats['avg_wait_ms']:.0f}ms max={ramp_stats['max_wait_ms']:.0f}ms"
+            )
+            
+            cadence = self.scheduler.stats()
+            logger.info(
+                f"  Scheduler: {cadence['meters']} meters, releases={cadence['releases']}, "
+                f"overruns={cadence['overruns']}, skipped ticks={cadence['skipped_ticks']}, "
+                f"max lag={cadence['max_lag_ms']:.0f}ms"
+            )
+            missed = cadence['overruns'] + cadence['skipped_ticks']
+            if missed > self._missed_ticks_reported:
+                logger.warning(
+                    f"  ⚠️  {missed - self._missed_ticks_reported} overruns/skipped ticks since last report "
+                    f"({cadence['late_meters']} meters affected): the fleet exceeds polling capacity"
+                )
+            self._missed_ticks_reported = missed
+            
+            if self.gateway:
+                gw = self.gateway.get_stats()
+                logger.info(
+                    f"  Gateway session: {'up' if gw['connected'] else 'down'}, devices={gw['devices']}, "
+                    f"messages={gw['messages_sent']} ({gw['readings_sent']} readings, {gw['bytes_sent']} bytes), "
+                    f"failed={gw['messages_failed']}, max devices/msg={gw['max_devices_per_message']}"
+                )
+                if gw['spool']:
+                    logger.info(
+                        f"  Gateway spool: {gw['spool']['pending_bytes']} bytes pending "
+                        f"({gw['spool']['segments']} segments), sent={gw['spool']['sent']} "
+                        f"acked={gw['spool']['acked']}, dropped={gw['spool']['dropped_bytes']} bytes, "
+                        f"drain {gw['spool']['rate']:.0f} msg/s"
+                    )
+            if self.batcher:
+                batch_stats = self.batcher.stats()
+                logger.info(
+                    f"  Telemetry batches: {batch_stats['flushes']} sent "
+                    f"(window={batch_stats['window_flushes']}, size={batch_stats['size_flushes']}), "
+                    f"avg {batch_stats['avg_batch']:.1f} samples, age avg={batch_stats['avg_age_ms']:.0f}ms "
+                    f"max={batch_stats['max_age_ms']:.0f}ms, pending={batch_stats['pending']}, "
+                    f"failed={batch_stats['failed_flushes']}, dropped={batch_stats['dropped']}"
+                )
+            
+            if self.push_server:
+                push_stats = self.push_server.stats()
+                logger.info(
+                    f"  Push listener :{push_stats['port']}: {push_stats['connections']} connected, "
+                    f"notifications={push_stats['notifications']}, "
+                    f"decode errors={push_stats['decode_errors']}, handler errors={push_stats['handler_errors']}"
+                )
+            
+            for link_stats in self.link_pool.stats():
+                avg_wait = link_stats['avg_wait_ms']
+                logger.info(
+                    f"  Multi-drop {link_stats['endpoint']}: "
+                    f"{'up' if link_stats['connected'] else 'down'}, "
+                    f"connects={link_stats['connects']}, resets={link_stats['resets']}, "
+                    f"turns={link_stats['transactions']}, "
+                    f"wait avg={avg_wait or 0:.1f}ms max={link_stats['max_wait_ms']:.1f}ms"
+                )
+            
             logger.info("=" * 70)
     
     async def run(self):
@@ -831,13 +1809,27 @@ class MultiMeterBridge:
                 logger.error("❌ No meters configured in database")
                 return
             
-            # ✅ Ya no se necesita setup_mqtt compartido
-            # Cada worker configurará su propio cliente MQTT
-            logger.info("✅ All workers will create individual MQTT connections")
+            # Sesión gateway compartida o, como respaldo, un cliente MQTT por medidor
+            if self.gateway and await self._connect_gateway():
+                self.batcher = TelemetryBatcher(
+                    self._publish_gateway_batch, window=self.batch_window, max_bytes=self.batch_max_bytes
+                )
+                logger.info(
+                    f"✅ Workers will publish through the gateway session "
+                    f"(batch window {self.batch_window}s, max {self.batch_max_bytes} bytes)"
+                )
+            else:
+                logger.info("✅ All workers will create individual MQTT connections")
             
             # Start all workers
             await self.start_workers(meter_configs)
             
+            # Listener push (DataNotification) en el mismo camino de publicación
+            if self.push_port is not None:
+                self.push_server = DataNotificationServer(self._on_push, port=self.push_port)
+                await self.push_server.start()
+                logger.info(f"📥 Push listener on port {self.push_server.port}")
+            
             # Start monitor
             monitor_task = asyncio.create_task(self.monitor_loop())
             
@@ -851,10 +1843,14 @@ class MultiMeterBridge:
             
             # Cleanup
             monitor_task.cancel()
+            if self.push_server:
+                await self.push_server.close()
             await self.stop_workers()
             
-            # ✅ Ya no hay mqtt_client compartido para desconectar
-            # Cada worker desconecta su propio cliente
+            # La sesión gateway se cierra después de los workers (vacía lo pendiente)
+            if self.batcher:
+                await self.batcher.close()
+                await asyncio.to_thread(self.gateway.stop)
             
         except Exception as e:
             logger.error(f"❌ Service error: {e}", exc_info=True)
@@ -873,8 +1869,35 @@ def main():
     parser = argparse.ArgumentParser(description='DLMS Multi-Meter Bridge Service')
     parser.add_argument('--db-path', type=str, default='data/admin.db',
                         help='Path to database file')
+    parser.add_argument('--push-port', type=int, default=None,
+                        help='Listen for pushed DataNotifications on this TCP port')
+    parser.add_argument('--push-only', action='store_true',
+                        help='Do not poll; publish only what meters push (requires --push-port)')
+    parser.add_argument('--max-concurrent-setups', type=int, default=8,
+                        help='Connection setups (TCP + SNRM/AARQ) allowed at once across the fleet')
+    parser.add_argument('--max-setups-per-host', type=int, default=1,
+                        help='Connection setups allowed at once against one IP address')
+    parser.add_argument('--gateway-token', type=str, default=None,
+                        help='ThingsBoard gateway device token: publish every meter over one gateway session '
+                             '(without it, each meter uses its own device token)')
+    parser.add_argument('--gateway-host', type=str, default='localhost',
+                        help='ThingsBoard MQTT host for the gateway session')
+    parser.add_argument('--gateway-port', type=int, default=1883,
+                        help='ThingsBoard MQTT port for the gateway session')
+    parser.add_argument('--batch-window', type=float, default=2.0,
+                        help='Max seconds a sample waits before its telemetry batch is published (0 = no batching)')
+    parser.add_argument('--batch-max-bytes', type=int, default=32768,
+                        help='Publish a telemetry batch early once its payload reaches this size')
+    parser.add_argument('--spool-dir', type=str, default='data/spool',
+                        help='Directory of the on-disk store-and-forward queues (one per MQTT client)')
+    parser.add_argument('--spool-max-mb', type=float, default=64.0,
+                        help='Disk budget of each queue; the oldest telemetry is dropped beyond it')
+    parser.add_argument('--drain-rate', type=float, default=50.0,
+                        help='Messages/s each queue sends to the broker (backlog drain after an outage)')
     
     args = parser.parse_args()
+    if args.push_only and args.push_port is None:
+        parser.error('--push-only requires --push-port')
     
     # Setup signal handlers
     signal.signal(signal.SIGINT, signal_handler)
@@ -888,7 +1911,21 @@ def main():
     logger.info("=" * 70)
     
     # Create and run service
-    bridge = MultiMeterBridge(db_path=args.db_path)
+    bridge = MultiMeterBridge(
+        db_path=args.db_path,
+        push_port=args.push_port,
+        push_only=args.push_only,
+        max_concurrent_setups=args.max_concurrent_setups,
+        max_setups_per_host=args.max_setups_per_host,
+        gateway_host=args.gateway_host,
+        gateway_port=args.gateway_port,
+        gateway_token=args.gateway_token,
+        batch_window=args.batch_window,
+        batch_max_bytes=args.batch_max_bytes,
+        spool_dir=args.spool_dir,
+        spool_max_mb=args.spool_max_mb,
+        drain_rate=args.drain_rate
+    )
     
     try:
         asyncio.run(bridge.run())
@@ -7,18 +7,20 @@ OPTIMIZADO: Implementa caché de scalers para reducir latencia 50%
 """
 
 import sys
+import asyncio
 import time
 import signal
-import socket
-import select
-import struct
 import traceback
 import argparse
-from typing import Dict, Optional
+import contextlib
+from typing import AsyncContextManager, Callable, Dict, List, Optional
 from dlms_client_robust import RobustDLMSClient, DLMSConfig, ConnectionState, logger
-from dlms_reader import DLMSClient as OriginalDLMSClient
-from dlms_optimized_reader import OptimizedDLMSReader
-from admin.database import record_dlms_diagnostic, db
+from dlms_reader import (
+    DLMSClient as OriginalDLMSClient, AsyncDLMSClient, AsyncMultiDropDLMSClient, AsyncMultiDropLink,
+    FrameTemplateCache, ScalerUnitCache, ScaledValue, DataNotification, _combine_server_address,
+    TRANSPORT_HDLC, TRANSPORT_WRAPPER,
+)
+from admin.database import record_dlms_diagnostic, db, ScalerUnitStore
 
 # Importar mediciones conocidas
 MEASUREMENTS = {
@@ -47,14 +49,21 @@ class ProductionDLMSPoller:
     
     def __init__(self, host: str, port: int = 3333, password: str = "22222222",
                  client_sap: int = 1, server_id: int = 1,
-                 interval: float = 1.0, measurements: list = None, verbose: bool = False):
+                 interval: float = 1.0, measurements: list = None, verbose: bool = False,
+                 window_size: int = 1, max_info_length: Optional[int] = None,
+                 scaler_store: Optional[ScalerUnitStore] = None, transport: str = TRANSPORT_HDLC):
+        
+        # Transporte DLMS: HDLC (IEC 62056-46) o wrapper TCP (IEC 62056-47).
+        # El wrapper no tiene dirección física: el wPort destino es el
+        # dispositivo lógico, que se toma de server_id.
+        self.transport = transport
         
         # Configuración (MEJORADA: timeouts más tolerantes y circuit breaker efectivo)
         self.config = DLMSConfig(
             host=host,
             port=port,
             client_sap=client_sap,
-            server_logical=0,
+            server_logical=server_id if transport == TRANSPORT_WRAPPER else 0,
             server_physical=server_id,
             password=password.encode('ascii'),
             timeout=7.0,  # Aumentado de 5.0s a 7.0s para reducir timeouts
@@ -68,14 +77,23 @@ class ProductionDLMSPoller:
         )
         
         self.interval = interval
+        self.window_size = window_size  # Ventana HDLC solicitada (el medidor puede reducirla)
+        # Longitud máxima del campo de información a negociar en el SNRM.
+        # None = SNRM mínimo (128 bytes por defecto); las respuestas mayores
+        # llegan segmentadas y el cliente las reensambla.
+        self.max_info_length = max_info_length
         self.measurements = measurements or ["voltage_l1", "current_l1"]
         self.verbose = verbose
         
         # Cliente original para las lecturas
         self.original_client: Optional[OriginalDLMSClient] = None
         
-        # Cliente optimizado con caché de scalers
-        self.optimized_reader: Optional[OptimizedDLMSReader] = None
+        # Plantillas de tramas por medidor (sobreviven a las reconexiones)
+        self.frame_cache = FrameTemplateCache()
+        
+        # Caché de scaler/unit por serie + firmware, persistida en la BD admin
+        # (sobrevive a reconexiones y reinicios del proceso)
+        self.scaler_cache = ScalerUnitCache(store=scaler_store if scaler_store is not None else ScalerUnitStore(db))
         
         # Métricas
         self.start_time: Optional[float] = None
@@ -83,9 +101,9 @@ class ProductionDLMSPoller:
         self.successful_cycles = 0
         self.reconnect_count = 0
         
-    def _create_original_client(self) -> OriginalDLMSClient:
-        """Crea una instancia del cliente original."""
-        return OriginalDLMSClient(
+    def _client_kwargs(self) -> Dict:
+        """Parámetros comunes del cliente DLMS (bloqueante o asyncio)."""
+        return dict(
             host=self.config.host,
             port=self.config.port,
             client_sap=self.config.client_sap,
@@ -94,9 +112,24 @@ class ProductionDLMSPoller:
             password=self.config.password,
             timeout=self.config.timeout,
             verbose=self.verbose,
-            max_info_length=None
+            max_info_length=self.max_info_length,
+            frame_cache=self.frame_cache,
+            window_size=self.window_size,
+            scaler_cache=self.scaler_cache,
+            transport=self.transport
         )
     
+    def _create_original_client(self) -> OriginalDLMSClient:
+        """Crea una instancia del cliente original."""
+        return OriginalDLMSClient(**self._client_kwargs())
+    
+    def get_cache_stats(self) -> Dict[str, Dict]:
+        """Estadísticas de las cachés del poller (plantillas de tramas y scalers)."""
+        return {
+            "frame_templates": self.frame_cache.stats(),
+            "scaler_units": self.scaler_cache.stats(),
+        }
+    
     def _connect_with_recovery(self) -> bool:
         """Conecta con lógica de recuperación mejorada."""
         max_attempts = 3
@@ -106,25 +139,14 @@ class ProductionDLMSPoller:
                 # Cerrar cliente anterior si existe
                 if self.original_client:
                     try:
-                        # Forzar cierre TCP con SO_LINGER para resetear la conexión
-                        if self.original_client._sock:
-                            try:
-                                # SO_LINGER con timeout 0 causa TCP RST en lugar de FIN
-                                self.original_client._sock.setsockopt(
-                                    socket.SOL_SOCKET, 
-                                    socket.SO_LINGER,
-                                    struct.pack('ii', 1, 0)  # linger ON, timeout 0
-                                )
-                                self.original_client._sock.close()
-                                logger.debug("🔌 Socket cerrado con TCP RST")
-                            except Exception as sock_err:
-                                logger.debug(f"Error cerrando socket: {sock_err}")
-                        self.original_client.close()
+                        # Forzar cierre TCP con RST (en lugar de FIN) para que el medidor libere la sesión
+                        if self.original_client.connected:
+                            self.original_client.abort(reset=True)
+                            logger.debug("🔌 Socket cerrado con TCP RST")
                     except Exception as close_err:
                         logger.debug(f"Error cerrando cliente: {close_err}")
                     finally:
                         self.original_client = None
-                        self.optimized_reader = None  # Limpiar también el reader optimizado
                 
                 # Pausa más larga en reintentos para dejar que el medidor libere la sesión TCP
                 if attempt > 1:
@@ -135,34 +157,23 @@ class ProductionDLMSPoller:
                     # En la primera conexión esperar 1.5s para que el medidor se estabilice
                     time.sleep(1.5)
                 
-                # Crear nuevo cliente
+                # Crear nuevo cliente (secuencias HDLC e invoke-id parten de cero)
                 self.original_client = self._create_original_client()
                 
-                # Resetear secuencias ANTES de conectar
-                self.original_client._send_seq = 0
-                self.original_client._recv_seq = 0
-                self.original_client._invoke_id = 1
-                
                 # Conectar
                 logger.info(f"🔌 Intentando conectar a {self.config.host}:{self.config.port} (timeout={self.config.timeout}s)...")
                 self.original_client.connect()
                 logger.info("✓ Conexión DLMS establecida")
                 
-                # Crear cliente optimizado con FASE 2 (caché de scalers)
-                # Nota: Fase 3 (batch) no soportada por este medidor
-                self.optimized_reader = OptimizedDLMSReader(self.original_client, use_batch=False)
-                
-                # Precalentar caché de scalers (primera vez)
-                if self.reconnect_count == 0:  # Solo la primera vez
-                    obis_codes = [MEASUREMENTS[m][0] for m in self.measurements]
-                    logger.info("🔥 Precalentando caché de scalers...")
-                    try:
-                        self.optimized_reader.warmup_cache(obis_codes)
-                        cache_stats = self.optimized_reader.get_cache_stats()
-                        logger.info(f"✓ Caché precalentada: {cache_stats['cache_size']} entradas")
-                        logger.info(f"⚡ Modo OPTIMIZADO: Caché de scalers activo (Fase 2)")
-                    except Exception as e:
-                        logger.warning(f"⚠ Error precalentando caché: {e}")
+                # Identificar medidor (serie + firmware) para la caché de scalers.
+                # Si cambió el firmware, las entradas guardadas se descartan.
+                try:
+                    self.original_client.bind_scaler_cache()
+                    cache_stats = self.scaler_cache.stats()
+                    logger.info(f"⚡ Caché de scalers: {cache_stats['entries']} entradas "
+                                f"(serie {cache_stats['identity']}, firmware {cache_stats['firmware']})")
+                except Exception as e:
+                    logger.warning(f"⚠ No se pudo identificar el medidor para la caché de scalers: {e}")
                 
                 self.reconnect_count += 1
                 return True
@@ -170,17 +181,7 @@ class ProductionDLMSPoller:
             except Exception as e:
                 error_str = str(e)
                 logger.warning(f"✗ Intento {attempt}/{max_attempts} falló: {error_str}")
-                # Persistir errores HDLC para diagnóstico
-                try:
-                    lc = error_str.lower()
-                    if 'hdlc' in lc or 'invalid hdlc' in lc or 'unterminated' in lc or 'frame boundary' in lc:
-                        try:
-                            with db.get_session() as session:
-                                record_dlms_diagnostic(session, meter_id=0, category='hdlc', message=error_str, severity='warning')
-                        except Exception as _inner:
-                            logger.debug(f"No se pudo grabar diagnóstico DLMS: {_inner}")
-                except Exception:
-                    pass
+                self._record_connect_error(error_str)
                 
                 # Si es error de frame boundary, el medidor tiene basura - esperar más
                 if "Invalid HDLC frame boundary" in error_str or "Incomplete HDLC frame" in error_str:
@@ -197,6 +198,19 @@ class ProductionDLMSPoller:
         logger.error("✗ No se pudo establecer conexión después de múltiples intentos")
         return False
     
+    def _record_connect_error(self, error_str: str):
+        """Persistir errores HDLC de conexión para diagnóstico."""
+        try:
+            lc = error_str.lower()
+            if 'hdlc' in lc or 'invalid hdlc' in lc or 'unterminated' in lc or 'frame boundary' in lc:
+                try:
+                    with db.get_session() as session:
+                        record_dlms_diagnostic(session, meter_id=0, category='hdlc', message=error_str, severity='warning')
+                except Exception as _inner:
+                    logger.debug(f"No se pudo grabar diagnóstico DLMS: {_inner}")
+        except Exception:
+            pass
+    
     def _read_measurement(self, measurement: str) -> Optional[float]:
         """Lee una medición con manejo de errores (OPTIMIZADO con caché)."""
         if measurement not in MEASUREMENTS:
@@ -206,37 +220,22 @@ class ProductionDLMSPoller:
         obis_code, description, unit = MEASUREMENTS[measurement]
         
         try:
-            if not self.optimized_reader:
+            if not self.original_client:
                 return None
             
             # Pre-limpieza reducida: solo si hay muchos datos esperando
-            if self.original_client and self.original_client._sock:
+            if self.original_client and self.original_client.connected:
                 try:
-                    # Check si hay MUCHOS datos esperando (>512 bytes indica problema)
-                    ready = select.select([self.original_client._sock], [], [], 0)
-                    if ready[0]:
-                        # Peek para ver cuántos bytes hay
-                        self.original_client._sock.settimeout(0.01)
-                        try:
-                            garbage = self.original_client._sock.recv(512, socket.MSG_PEEK)
-                            if len(garbage) > 100:  # Solo limpiar si hay >100 bytes
-                                garbage = self.original_client._sock.recv(1024)
-                                logger.debug(f"🧹 Pre-limpieza: {len(garbage)} bytes descartados")
-                        except socket.timeout:
-                            pass
-                        except Exception as peek_error:
-                            logger.debug(f"Error en peek/recv buffer: {peek_error}")
-                        finally:
-                            self.original_client._sock.settimeout(3.0)
-                except Exception as select_error:
-                    logger.debug(f"Error en select pre-limpieza: {select_error}")
+                    # Check si hay MUCHOS datos esperando (>100 bytes indica problema).
+                    # Solo mira (peek), no altera el timeout que gestiona el cliente.
+                    if self.original_client.pending_input(max_bytes=512) > 100:
+                        discarded = self.original_client.discard_input(timeout=0.01, max_bytes=1024)
+                        logger.debug(f"🧹 Pre-limpieza: {discarded} bytes descartados")
+                except Exception as peek_error:
+                    logger.debug(f"Error en peek/recv buffer: {peek_error}")
             
-            # Leer registro OPTIMIZADO (usa caché de scaler)
-            result = self.optimized_reader.read_register_optimized(obis_code)
-            
-            if result is None:
-                logger.warning(f"⚠️ read_register_optimized retornó None para {measurement} ({obis_code})")
-                return None
+            # Leer registro (usa caché de scaler)
+            result = self.original_client.read_register(obis_code)
             
             if isinstance(result, tuple) and len(result) >= 1:
                 # Primer elemento es el valor ya escalado
@@ -276,26 +275,44 @@ class ProductionDLMSPoller:
         start_time = time.time()
         errors_in_cycle = 0
         
-        if not self.optimized_reader:
-            logger.debug("OptimizedDLMSReader no inicializado - usando valores simulados")
+        if not self.original_client:
+            logger.debug("Cliente DLMS no inicializado - usando valores simulados")
             return {m: None for m in self.measurements}
         
+        # LECTURA EN LOTE con GET-with-list si el medidor lo negoció en el AARE
+        client = self.original_client
+        use_list = (
+            client is not None
+            and len(self.measurements) > 1
+            and client.supports_get_with_list is not False
+        )
+        if use_list:
+            obis_codes = [MEASUREMENTS[m][0] for m in self.measurements]
+            try:
+                batch = client.read_registers(obis_codes)
+            except Exception as e:
+                logger.warning(f"⚠️ Lectura en lote falló ({e}), usando lecturas individuales")
+                batch = None
+            if batch is not None:
+                for measurement, obis, result in zip(self.measurements, obis_codes, batch):
+                    if isinstance(result, Exception):
+                        logger.warning(f"⚠️ Lectura falló para {measurement} ({obis}): {result}")
+                        results[measurement] = None
+                        errors_in_cycle += 1
+                    else:
+                        results[measurement] = float(result[0])
+
         # LECTURA INDIVIDUAL con CACHE de scalers (Fase 2)
         # Más compatible - no requiere soporte de batch reading
         for measurement in self.measurements:
+            if measurement in results:
+                continue
             obis = MEASUREMENTS[measurement][0]
             
             try:
                 # Lee valor individual (usa caché de scaler automáticamente)
-                result = self.optimized_reader.read_register_optimized(obis)
-                
-                if result is not None:
-                    value, unit_code, raw = result
-                    results[measurement] = float(value)
-                else:
-                    logger.warning(f"⚠️ Lectura falló para {measurement} ({obis}): result=None")
-                    results[measurement] = None
-                    errors_in_cycle += 1
+                value, unit_code, raw = self.original_client.read_register(obis)
+                results[measurement] = float(value)
                     
             except Exception as e:
                 logger.warning(f"⚠️ Excepción leyendo {measurement} ({obis}): {e}")
@@ -314,17 +331,40 @@ class ProductionDLMSPoller:
             # Errores parciales: log pero NO reconectar
             logger.warning(f"⚠️ {errors_in_cycle}/{len(self.measurements)} lecturas fallaron (parcial, NO reconectando)")
         
-        elapsed = time.time() - start_time
+        self._log_cycle(results, time.time() - start_time)
+        return results
+    
+    @property
+    def server_address(self) -> int:
+        """Dirección del medidor como llega en sus tramas: HDLC (lógica + física) o wPort del wrapper."""
+        if self.transport == TRANSPORT_WRAPPER:
+            return self.config.server_logical
+        return _combine_server_address(self.config.server_logical, self.config.server_physical)
+    
+    def decode_notification(self, notification: DataNotification) -> Dict[str, Optional[float]]:
+        """Convierte una DataNotification (push) en mediciones, como poll_once().
         
-        # Log resultados
+        El cuerpo suele ser una estructura con los objetos del push setup en
+        orden; los elementos no numéricos (nombre lógico, reloj) se descartan y
+        los numéricos se asignan por posición a self.measurements. Se escalan
+        con la caché de scalers cuando ya conoce el OBIS.
+        """
+        body = notification.value if isinstance(notification.value, list) else [notification.value]
+        numbers = [v for v in body if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        results: Dict[str, Optional[float]] = {m: None for m in self.measurements}
+        for measurement, value in zip(self.measurements, numbers):
+            entry = self.scaler_cache.get(MEASUREMENTS[measurement][0]) if isinstance(value, int) else None
+            results[measurement] = float(ScaledValue(value, entry[0])) if entry else float(value)
+        return results
+    
+    def _log_cycle(self, results: Dict[str, Optional[float]], elapsed: float):
+        """Log de los valores de un ciclo."""
         values_str = " | ".join([
             f"{k.upper()[:1]}: {v:7.2f} {MEASUREMENTS[k][2]}" if v is not None else f"{k.upper()[:1]}: ---"
             for k, v in results.items()
         ])
         
         logger.info(f"| {values_str} | ({elapsed:.3f}s)")
-        
-        return results
     
     def run(self):
         """Ejecuta el polling continuo."""
@@ -361,22 +401,10 @@ class ProductionDLMSPoller:
                 # Drenaje preventivo periódico basado en tiempo
                 time_since_drain = time.time() - last_drain_time
                 if time_since_drain >= drain_interval_seconds:
-                    if self.original_client and self.original_client._sock:
+                    if self.original_client and self.original_client.connected:
                         logger.info(f"🧹 Drenaje preventivo ejecutándose (cada {drain_interval_seconds}s)...")
-                        bytes_drained = 0
-                        
-                        # Limpiar socket
-                        self.original_client._sock.settimeout(0.03)
-                        try:
-                            for _ in range(3):  # Hasta 3 intentos
-                                chunk = self.original_client._sock.recv(2048)
-                                if not chunk:
-                                    break
-                                bytes_drained += len(chunk)
-                        except socket.timeout:
-                            pass
-                        finally:
-                            self.original_client._sock.settimeout(self.config.timeout)
+                        # Limpiar socket y buffer de recepción del cliente
+                        bytes_drained = self.original_client.discard_input(timeout=0.03, max_bytes=3 * 2048)
                         
                         if bytes_drained > 0:
                             logger.warning(f"🧹 Drenaje preventivo: {bytes_drained} bytes residuales eliminados")
@@ -444,6 +472,139 @@ class ProductionDLMSPoller:
         
         return 0
 
+class AsyncDLMSPoller(ProductionDLMSPoller):
+    """Poller sobre AsyncDLMSClient para conducirlo desde un event loop.
+    
+    Misma configuración, cachés y métricas que ProductionDLMSPoller, pero sin
+    ocupar un hilo por medidor: timeouts, reintentos y pausas son awaitables
+    y se cancelan con la tarea que los ejecuta.
+    
+    Con ``link`` (medidores multi-drop detrás de un concentrador RS485/TCP) la
+    sesión HDLC de este medidor viaja por la conexión TCP compartida del
+    concentrador en lugar de abrir una propia.
+    
+    ``setup_slot`` devuelve un contexto asíncrono que se mantiene durante cada
+    intento de conexión + asociación (p. ej. la rampa del bridge, que limita
+    los establecimientos simultáneos en toda la flota).
+    """
+    
+    def __init__(self, *args, link: Optional[AsyncMultiDropLink] = None,
+                 setup_slot: Optional[Callable[[], AsyncContextManager]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.link = link
+        self.setup_slot = setup_slot
+        self.client: Optional[AsyncDLMSClient] = None
+    
+    def _create_async_client(self) -> AsyncDLMSClient:
+        kwargs = self._client_kwargs()
+        if self.link is None:
+            return AsyncDLMSClient(**kwargs)
+        del kwargs['host'], kwargs['port']
+        return AsyncMultiDropDLMSClient(self.link, **kwargs)
+    
+    async def close(self):
+        """Cierra la asociación (DISC) si hay cliente."""
+        client, self.client = self.client, None
+        if client:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.debug(f"Error cerrando cliente: {e}")
+    
+    async def connect(self) -> bool:
+        """Conecta con la misma lógica de recuperación que _connect_with_recovery()."""
+        max_attempts = 3
+        
+        for attempt in range(1, max_attempts + 1):
+            try:
+                # Cerrar cliente anterior con TCP RST para liberar la sesión del medidor
+                # (en multi-drop solo se olvida la asociación; el enlace compartido sigue)
+                if self.client:
+                    self.client.abort(reset=True)
+                    self.client = None
+                    logger.debug("🔌 Socket cerrado con TCP RST")
+                
+                if attempt > 1:
+                    delay = 2.0 * attempt  # 2s, 4s, 6s
+                    logger.debug(f"Esperando {delay}s para estabilización del medidor...")
+                    await asyncio.sleep(delay)
+                elif self.reconnect_count > 0:
+                    await asyncio.sleep(1.5)
+                
+                async with (self.setup_slot() if self.setup_slot else contextlib.nullcontext()):
+                    self.client = self._create_async_client()
+                    logger.info(f"🔌 Intentando conectar a {self.config.host}:{self.config.port} (timeout={self.config.timeout}s)...")
+                    await self.client.connect()
+                    logger.info("✓ Conexión DLMS establecida")
+                    
+                    try:
+                        await self.client.bind_scaler_cache()
+                        cache_stats = self.scaler_cache.stats()
+                        logger.info(f"⚡ Caché de scalers: {cache_stats['entries']} entradas "
+                                    f"(serie {cache_stats['identity']}, firmware {cache_stats['firmware']})")
+                    except Exception as e:
+                        logger.warning(f"⚠ No se pudo identificar el medidor para la caché de scalers: {e}")
+                
+                self.reconnect_count += 1
+                return True
+                
+            except Exception as e:
+                error_str = str(e)
+                logger.warning(f"✗ Intento {attempt}/{max_attempts} falló: {error_str}")
+                # SQLAlchemy es bloqueante: fuera del event loop
+                await asyncio.to_thread(self._record_connect_error, error_str)
+                
+                if "Invalid HDLC frame boundary" in error_str or "Incomplete HDLC frame" in error_str:
+                    if attempt < max_attempts:
+                        logger.debug("Detectada basura en buffer del medidor, esperando 3.0s extra...")
+                        await asyncio.sleep(3.0)
+                
+                if attempt < max_attempts:
+                    delay = 2.0 * attempt
+                    logger.info(f"Reintentando en {delay:.1f}s...")
+                    await asyncio.sleep(delay)
+        
+        logger.error("✗ No se pudo establecer conexión después de múltiples intentos")
+        return False
+    
+    async def poll(self, measurements: Optional[List[str]] = None) -> Dict[str, Optional[float]]:
+        """Ciclo de polling: las mediciones pedidas (por defecto todas) en una sola lectura en lote."""
+        start_time = time.time()
+        if measurements is None:
+            measurements = self.measurements
+        
+        if not self.client:
+            logger.debug("Cliente DLMS no inicializado - usando valores simulados")
+            return {m: None for m in measurements}
+        
+        results: Dict[str, Optional[float]] = {}
+        errors_in_cycle = 0
+        obis_codes = [MEASUREMENTS[m][0] for m in measurements]
+        try:
+            batch = await self.client.read_registers(obis_codes)
+        except Exception as e:
+            logger.warning(f"⚠️ Lectura en lote falló: {e}")
+            batch = [e] * len(obis_codes)
+        for measurement, obis, result in zip(measurements, obis_codes, batch):
+            if isinstance(result, Exception):
+                logger.warning(f"⚠️ Lectura falló para {measurement} ({obis}): {result}")
+                results[measurement] = None
+                errors_in_cycle += 1
+            else:
+                results[measurement] = float(result[0])
+        
+        if errors_in_cycle >= len(measurements):
+            logger.warning(f"⚠ Demasiados errores ({errors_in_cycle}/{len(measurements)}), reconectando...")
+            if await self.connect():
+                logger.info("Reintentando lecturas después de reconexión...")
+                return await self.poll(measurements)
+        elif errors_in_cycle > 0:
+            logger.warning(f"⚠️ {errors_in_cycle}/{len(measurements)} lecturas fallaron (parcial, NO reconectando)")
+        
+        self._log_cycle(results, time.time() - start_time)
+        return results
+
+
 def main():
     parser = argparse.ArgumentParser(description="Polling DLMS robusto para producción")
     parser.add_argument("--host", default="192.168.1.127", help="Host del medidor")
@@ -452,6 +613,12 @@ def main():
     parser.add_argument("--interval", type=float, default=1.0, help="Intervalo de polling (segundos)")
     parser.add_argument("--measurements", nargs="+", default=["voltage_l1", "current_l1"],
                        help="Mediciones a leer")
+    parser.add_argument("--window-size", type=int, default=1,
+                       help="Ventana HDLC a negociar (1-7, el medidor puede reducirla)")
+    parser.add_argument("--max-info-length", type=lambda x: int(x, 0), default=None,
+                       help="Longitud máxima del campo de información HDLC (omitir = SNRM mínimo)")
+    parser.add_argument("--transport", choices=[TRANSPORT_HDLC, TRANSPORT_WRAPPER], default=TRANSPORT_HDLC,
+                       help="Capa de enlace: tramas HDLC o wrapper IEC 62056-47 (sin SNRM/UA ni CRC)")
     parser.add_argument("--verbose", action="store_true", help="Modo verbose")
     
     args = parser.parse_args()
@@ -462,7 +629,10 @@ def main():
         password=args.password,
         interval=args.interval,
         measurements=args.measurements,
-        verbose=args.verbose
+        verbose=args.verbose,
+        window_size=args.window_size,
+        max_info_length=args.max_info_length,
+        transport=args.transport
     )
     
     return poller.run()
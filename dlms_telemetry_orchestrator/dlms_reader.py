@@ -16,16 +16,35 @@ can be extended as needed.
 from __future__ import annotations
 
 import argparse
+import asyncio
 import socket
 import struct
 import sys
+import threading
 import time
-from dataclasses import dataclass
-from decimal import Decimal, getcontext
-from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from array import array
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Generator, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
 
-# Increase decimal precision to avoid rounding issues when applying scaler.
-getcontext().prec = 12
+try:  # NumPy is optional; columnar profile decoding falls back to array.array
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+# Size of the per-connection receive buffer. The HDLC length field is 11 bits,
+# so any single frame (max 2047 bytes + flags) always fits; wrapper frames
+# carry a 16-bit length and grow the buffer on demand up to MAX_FRAME_BUFFER.
+RX_BUFFER_SIZE = 4096
+MAX_FRAME_BUFFER = 0x20000
+
+# Link layers a client can speak over TCP: HDLC (IEC 62056-46) or the
+# IEC 62056-47 wrapper.
+TRANSPORT_HDLC = "hdlc"
+TRANSPORT_WRAPPER = "wrapper"
+TRANSPORTS = (TRANSPORT_HDLC, TRANSPORT_WRAPPER)
 
 
 # ---------------------------------------------------------------------------
@@ -33,6 +52,50 @@ getcontext().prec = 12
 # ---------------------------------------------------------------------------
 
 
+def _build_crc16_table() -> Tuple[int, ...]:
+    """Precompute the byte-wise lookup table for the reflected 0x8408 polynomial."""
+
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ 0x8408
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC16_TABLE = _build_crc16_table()
+
+# Initial register value and the constant left in the register after folding a
+# block *including* its own (little-endian) FCS when the block is intact.
+CRC16_INIT = 0xFFFF
+CRC16_GOOD_RESIDUE = 0xF0B8
+
+
+def _crc16_update(crc: int, data: bytes) -> int:
+    """Fold *data* into a running, non-finalised CRC16 register.
+
+    Start from :data:`CRC16_INIT`, call repeatedly for consecutive chunks and
+    pass the result through :func:`_crc16_finalize` to obtain the HCS/FCS
+    value. Any buffer-protocol object (``bytes``, ``bytearray``,
+    ``memoryview``) is accepted, so callers never need to concatenate.
+    """
+
+    table = _CRC16_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def _crc16_finalize(crc: int) -> int:
+    """Turn a running CRC16 register into the transmitted check value."""
+
+    return (~crc) & 0xFFFF
+
+
 def _crc16_hdlc(data: bytes) -> int:
     """Compute the HDLC CRC16 (x^16 + x^12 + x^5 + 1, reflected polynomial).
 
@@ -41,15 +104,7 @@ def _crc16_hdlc(data: bytes) -> int:
     significant byte transmitted first.
     """
 
-    crc = 0xFFFF
-    for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x0001:
-                crc = (crc >> 1) ^ 0x8408
-            else:
-                crc >>= 1
-    return (~crc) & 0xFFFF
+    return _crc16_finalize(_crc16_update(CRC16_INIT, data))
 
 
 def _encode_hdlc_address(value: int) -> bytes:
@@ -99,28 +154,101 @@ def _combine_server_address(logical: int, physical: int) -> int:
 # ---------------------------------------------------------------------------
 
 
-@dataclass
 class ParsedFrame:
-    """Structured representation of a decoded HDLC frame."""
-
-    format_field: int
-    destination: int
-    source: int
-    control: int
-    frame_type: str
-    send_sequence: Optional[int]
-    receive_sequence: Optional[int]
-    poll_final: int
-    info: bytes
-    hcs_valid: bool
-    fcs_valid: bool
+    """Structured representation of a decoded HDLC frame.
+
+    The record does not own a copy of the frame: it keeps the buffer it was
+    parsed from plus the offsets of the information field. ``info`` copies the
+    field out on first access; ``info_view`` exposes it without copying and is
+    only valid until the client receives the next frame into the same buffer.
+    """
+
+    __slots__ = (
+        "format_field",
+        "destination",
+        "source",
+        "control",
+        "frame_type",
+        "send_sequence",
+        "receive_sequence",
+        "poll_final",
+        "hcs_valid",
+        "fcs_valid",
+        "_buffer",
+        "_info_start",
+        "_info_end",
+        "_info",
+    )
+
+    def __init__(
+        self,
+        format_field: int,
+        destination: int,
+        source: int,
+        control: int,
+        hcs_valid: bool,
+        fcs_valid: bool,
+        buffer: memoryview,
+        info_start: int,
+        info_end: int,
+    ) -> None:
+        self.format_field = format_field
+        self.destination = destination
+        self.source = source
+        self.control = control
+        (
+            self.frame_type,
+            self.send_sequence,
+            self.receive_sequence,
+            self.poll_final,
+        ) = _determine_frame_type(control)
+        self.hcs_valid = hcs_valid
+        self.fcs_valid = fcs_valid
+        self._buffer = buffer
+        self._info_start = info_start
+        self._info_end = info_end
+        self._info: Optional[bytes] = None
 
     @property
     def is_valid(self) -> bool:
         return self.hcs_valid and self.fcs_valid
 
+    @property
+    def segmented(self) -> bool:
+        """True when further segments of the same APDU follow this frame."""
+
+        return bool(self.format_field & HDLC_FORMAT_SEGMENTED)
+
+    @property
+    def info(self) -> bytes:
+        if self._info is None:
+            self._info = bytes(self._buffer[self._info_start : self._info_end])
+        return self._info
+
+    @property
+    def info_view(self) -> memoryview:
+        if self._info is not None:
+            return memoryview(self._info)
+        return self._buffer[self._info_start : self._info_end]
+
+    @property
+    def info_length(self) -> int:
+        return self._info_end - self._info_start
+
+    def __repr__(self) -> str:
+        return (
+            f"ParsedFrame(format_field=0x{self.format_field:04X}, destination={self.destination}, "
+            f"source={self.source}, control=0x{self.control:02X}, frame_type={self.frame_type!r}, "
+            f"send_sequence={self.send_sequence}, receive_sequence={self.receive_sequence}, "
+            f"info_length={self.info_length}, hcs_valid={self.hcs_valid}, fcs_valid={self.fcs_valid})"
+        )
+
+
+# Segmentation bit of the format field: more segments of this APDU follow.
+HDLC_FORMAT_SEGMENTED = 0x0800
 
-def _build_frame(control: int, dest: int, src: int, info: bytes) -> bytes:
+
+def _build_frame(control: int, dest: int, src: int, info: bytes, segmented: bool = False) -> bytes:
     """Construct an HDLC frame with automatic length, HCS, and FCS."""
 
     dest_bytes = _encode_hdlc_address(dest)
@@ -136,51 +264,207 @@ def _build_frame(control: int, dest: int, src: int, info: bytes) -> bytes:
         + 2  # FCS
     )
     format_field = 0xA000 | body_len
+    if segmented:
+        format_field |= HDLC_FORMAT_SEGMENTED
     format_bytes = format_field.to_bytes(2, "big")
     header = format_bytes + dest_bytes + src_bytes + bytes([control])
 
+    crc = _crc16_update(CRC16_INIT, header)
     hcs_bytes = b""
     if include_hcs:
-        hcs = _crc16_hdlc(header)
-        hcs_bytes = hcs.to_bytes(2, "little")
+        hcs_bytes = _crc16_finalize(crc).to_bytes(2, "little")
+        crc = _crc16_update(crc, hcs_bytes)
 
-    fcs_input = header + hcs_bytes + info
-    fcs = _crc16_hdlc(fcs_input)
+    # The FCS continues from the HCS register, so the header is folded once.
+    fcs = _crc16_finalize(_crc16_update(crc, info))
     fcs_bytes = fcs.to_bytes(2, "little")
 
     return b"".join((b"\x7E", header, hcs_bytes, info, fcs_bytes, b"\x7E"))
 
 
-def _build_snrm_info(max_info_tx: int, max_info_rx: int) -> bytes:
+class _FrameTemplate:
+    """Pre-encoded frame whose control byte and a few info bytes vary per use.
+
+    Addresses, the format field and the constant part of the information
+    field are encoded once. Rendering copies the template, patches the control
+    byte, the cached HCS and any per-request bytes (e.g. the invoke ID) and
+    folds only the information field into the FCS.
+    """
+
+    __slots__ = ("frame", "prefix", "control_offset", "info_offset", "fcs_offset", "has_hcs")
+
+    def __init__(self, dest: int, src: int, info: bytes) -> None:
+        self.frame = _build_frame(0x00, dest, src, info)
+        self.control_offset = 3 + len(_encode_hdlc_address(dest)) + len(_encode_hdlc_address(src))
+        self.prefix = self.frame[1 : self.control_offset]
+        self.has_hcs = len(info) > 0
+        self.info_offset = self.control_offset + (3 if self.has_hcs else 1)
+        self.fcs_offset = len(self.frame) - 3
+
+    def render(
+        self,
+        cache: "FrameTemplateCache",
+        control: int,
+        patches: Iterable[Tuple[int, int]] = (),
+    ) -> bytearray:
+        frame = bytearray(self.frame)
+        frame[self.control_offset] = control
+        hcs, crc = cache.header_state(self.prefix, control, self.has_hcs)
+        if self.has_hcs:
+            frame[self.control_offset + 1 : self.control_offset + 3] = hcs
+        info_offset = self.info_offset
+        for offset, value in patches:
+            frame[info_offset + offset] = value
+        fcs_offset = self.fcs_offset
+        crc = _crc16_update(crc, memoryview(frame)[info_offset:fcs_offset])
+        frame[fcs_offset : fcs_offset + 2] = _crc16_finalize(crc).to_bytes(2, "little")
+        return frame
+
+
+class FrameTemplateCache:
+    """Per-meter cache of request frame templates and header checksums.
+
+    Owned by whoever outlives the connection (the poller passes the same
+    instance to every ``DLMSClient`` it creates), so reconnecting to a meter
+    does not re-encode its requests. HCS values are cached per header and
+    control byte: for a given request layout there are at most 64 I-frame
+    N(S)/N(R) combinations.
+    """
+
+    def __init__(self) -> None:
+        self._templates: Dict[Tuple[Any, ...], _FrameTemplate] = {}
+        self._frames: Dict[Tuple[Any, ...], bytes] = {}
+        self._headers: Dict[Tuple[bytes, int, bool], Tuple[bytes, int]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def template(self, key: Tuple[Any, ...], dest: int, src: int, info: Callable[[], bytes]) -> _FrameTemplate:
+        template = self._templates.get(key)
+        if template is None:
+            self.misses += 1
+            template = _FrameTemplate(dest, src, info())
+            self._templates[key] = template
+        else:
+            self.hits += 1
+        return template
+
+    def frame(self, key: Tuple[Any, ...], build: Callable[[], bytes]) -> bytes:
+        frame = self._frames.get(key)
+        if frame is None:
+            self.misses += 1
+            frame = build()
+            self._frames[key] = frame
+        else:
+            self.hits += 1
+        return frame
+
+    def header_state(self, prefix: bytes, control: int, has_hcs: bool) -> Tuple[bytes, int]:
+        """Return ``(hcs_bytes, crc_register)`` for a header + control byte.
+
+        The register is the running CRC after the header (and HCS, when
+        present), ready for the information field to be folded on top.
+        """
+
+        key = (prefix, control, has_hcs)
+        state = self._headers.get(key)
+        if state is None:
+            crc = _crc16_update(_crc16_update(CRC16_INIT, prefix), (control,))
+            hcs = b""
+            if has_hcs:
+                hcs = _crc16_finalize(crc).to_bytes(2, "little")
+                crc = _crc16_update(crc, hcs)
+            state = (hcs, crc)
+            self._headers[key] = state
+        return state
+
+    def clear(self) -> None:
+        self._templates.clear()
+        self._frames.clear()
+        self._headers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "templates": len(self._templates) + len(self._frames),
+            "hcs_variants": len(self._headers),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total * 100) if total else None,
+        }
+
+
+# HDLC parameter identifiers used in the SNRM/UA negotiation block.
+HDLC_PARAM_MAX_INFO_TX = 0x05
+HDLC_PARAM_MAX_INFO_RX = 0x06
+HDLC_PARAM_WINDOW_TX = 0x07
+HDLC_PARAM_WINDOW_RX = 0x08
+
+# Defaults that apply when a parameter is absent from the UA (IEC 62056-46).
+HDLC_DEFAULT_MAX_INFO = 128
+HDLC_DEFAULT_WINDOW = 1
+
+
+def _build_snrm_info(
+    max_info_tx: int,
+    max_info_rx: int,
+    window_tx: int = HDLC_DEFAULT_WINDOW,
+    window_rx: int = HDLC_DEFAULT_WINDOW,
+) -> bytes:
     """Construct the SNRM negotiation information block."""
 
-    return bytes(
+    if not (1 <= window_tx <= 7 and 1 <= window_rx <= 7):
+        raise ValueError("HDLC window sizes must be in range 1..7")
+    params = bytes(
         [
-            0x81,
-            0x80,
-            0x12,  # parameter identifier for HDLC parameters
-            0x05,
+            HDLC_PARAM_MAX_INFO_TX,
             0x02,
             (max_info_tx >> 8) & 0xFF,
             max_info_tx & 0xFF,
-            0x06,
+            HDLC_PARAM_MAX_INFO_RX,
             0x02,
             (max_info_rx >> 8) & 0xFF,
             max_info_rx & 0xFF,
-            0x07,
+            HDLC_PARAM_WINDOW_TX,
             0x04,
             0x00,
             0x00,
             0x00,
-            0x01,  # window size transmit
-            0x08,
+            window_tx,
+            HDLC_PARAM_WINDOW_RX,
             0x04,
             0x00,
             0x00,
             0x00,
-            0x01,  # window size receive
+            window_rx,
         ]
     )
+    # Format identifier, group identifier (HDLC parameters), group length.
+    return bytes([0x81, 0x80, len(params)]) + params
+
+
+def _parse_hdlc_parameters(info: bytes) -> Dict[int, int]:
+    """Decode the parameter block of a UA (or SNRM) frame.
+
+    Returns a mapping of parameter identifier to integer value. An empty
+    information field yields an empty mapping, meaning "all defaults".
+    """
+
+    if not info:
+        return {}
+    if len(info) < 3 or info[0] != 0x81 or info[1] != 0x80:
+        raise ValueError("Malformed HDLC parameter negotiation block")
+    end = min(len(info), 3 + info[2])
+    params: Dict[int, int] = {}
+    idx = 3
+    while idx + 2 <= end:
+        param_id = info[idx]
+        length = info[idx + 1]
+        value_end = idx + 2 + length
+        if value_end > end:
+            raise ValueError("Truncated HDLC parameter negotiation block")
+        params[param_id] = int.from_bytes(info[idx + 2 : value_end], "big")
+        idx = value_end
+    return params
 
 
 def _build_aarq_apdu(password: bytes) -> bytes:
@@ -211,13 +495,25 @@ def _build_aarq_apdu(password: bytes) -> bytes:
     return b"\xE6\xE6\x00" + prefix + auth_field + suffix
 
 
+# Offset of the invoke-id-and-priority byte inside a GET.request APDU.
+_GET_INVOKE_ID_OFFSET = 5
+
+# Attribute references per GET.request-with-list APDU.
+GET_WITH_LIST_BATCH_SIZE = 16
+
+
 def _build_get_apdu(
     invoke_id: int,
     class_id: int,
     logical_name: bytes,
     attribute_id: int,
+    access_selection: Optional[bytes] = None,
 ) -> bytes:
-    """Build the DLMS GET.request normal APDU."""
+    """Build the DLMS GET.request normal APDU.
+
+    *access_selection* is the encoded ``selector + parameters`` for selective
+    access; ``None`` requests the whole attribute.
+    """
 
     if len(logical_name) != 6:
         raise ValueError("Logical name must consist of 6 bytes")
@@ -229,32 +525,273 @@ def _build_get_apdu(
             class_id.to_bytes(2, "big"),
             logical_name,
             bytes([attribute_id & 0xFF]),
-            b"\x00",  # No selective access
+            b"\x00" if access_selection is None else b"\x01" + access_selection,
         )
     )
 
 
-def _extract_get_response_payload(info: bytes, expected_invoke_id: int) -> bytes:
-    """Validate a GET.response APDU and return the data payload."""
+def _encode_axdr_length(length: int) -> bytes:
+    """Encode an A-XDR length / element count (short or long form)."""
+
+    if length < 0x80:
+        return bytes([length])
+    if length <= 0xFF:
+        return bytes([0x81, length])
+    if length <= 0xFFFF:
+        return b"\x82" + length.to_bytes(2, "big")
+    return b"\x84" + length.to_bytes(4, "big")
+
+
+def _decode_axdr_length(buffer: bytes, offset: int) -> Tuple[int, int]:
+    """Decode an A-XDR length at *offset*; return ``(length, new_offset)``."""
+
+    if offset >= len(buffer):
+        raise DlmsIncompleteData("Missing A-XDR length")
+    first = buffer[offset]
+    if first < 0x80:
+        return first, offset + 1
+    size = first & 0x7F
+    end = offset + 1 + size
+    if end > len(buffer):
+        raise DlmsIncompleteData("Truncated A-XDR length")
+    return int.from_bytes(buffer[offset + 1 : end], "big"), end
+
+
+# xDLMS conformance block bits (bit 0 is the MSB of the 24-bit field).
+CONFORMANCE_BLOCK_TRANSFER_WITH_GET = 1 << (23 - 11)
+CONFORMANCE_MULTIPLE_REFERENCES = 1 << (23 - 14)
+CONFORMANCE_SELECTIVE_ACCESS = 1 << (23 - 21)
+
+
+def _parse_aare_conformance(aare: bytes) -> Tuple[Optional[int], Optional[int]]:
+    """Extract ``(negotiated_conformance, server_max_pdu_size)`` from an AARE.
+
+    Returns ``(None, None)`` when the InitiateResponse cannot be located.
+    """
+
+    idx = aare.find(b"\x5F\x1F\x04")
+    if idx < 0 or idx + 9 > len(aare):
+        return None, None
+    conformance = int.from_bytes(aare[idx + 4 : idx + 7], "big")
+    max_pdu = int.from_bytes(aare[idx + 7 : idx + 9], "big")
+    return conformance, max_pdu
+
+
+def _build_get_with_list_apdu(invoke_id: int, requests: Sequence[Tuple[int, bytes, int]]) -> bytes:
+    """Build a GET.request-with-list APDU for ``(class_id, ln, attribute)`` items."""
+
+    parts = [b"\xE6\xE6\x00", b"\xC0\x03", bytes([invoke_id & 0xFF]), _encode_axdr_length(len(requests))]
+    for class_id, logical_name, attribute_id in requests:
+        if len(logical_name) != 6:
+            raise ValueError("Logical name must consist of 6 bytes")
+        parts.append(class_id.to_bytes(2, "big"))
+        parts.append(logical_name)
+        parts.append(bytes([attribute_id & 0xFF]))
+        parts.append(b"\x00")  # No selective access
+    return b"".join(parts)
+
+
+# Restricting object used when a profile does not capture a clock first.
+CLOCK_LOGICAL_NAME = bytes([0, 0, 1, 0, 0, 255])
+_DATE_TIME_DEVIATION_UNSPECIFIED = -0x8000
+
+
+def _encode_date_time(value: datetime) -> bytes:
+    """Encode *value* as a 12-byte COSEM date-time.
+
+    Naive datetimes are sent with the deviation marked "not specified", so the
+    meter interprets them in its own local time.
+    """
+
+    offset = value.utcoffset()
+    if offset is None:
+        deviation = _DATE_TIME_DEVIATION_UNSPECIFIED
+    else:
+        # COSEM deviation is UTC minus local time, in minutes.
+        deviation = -int(offset.total_seconds() // 60)
+    return b"".join(
+        (
+            value.year.to_bytes(2, "big"),
+            bytes([value.month, value.day, value.isoweekday(), value.hour, value.minute, value.second]),
+            bytes([value.microsecond // 10000]),
+            deviation.to_bytes(2, "big", signed=True),
+            b"\x00",  # clock status
+        )
+    )
+
+
+def _decode_date_time(raw: bytes) -> Optional[datetime]:
+    """Decode a 12-byte COSEM date-time; ``None`` if it is not a full timestamp."""
+
+    if len(raw) != 12:
+        return None
+    year = int.from_bytes(raw[0:2], "big")
+    month, day, hour, minute, second, hundredths = raw[2], raw[3], raw[5], raw[6], raw[7], raw[8]
+    if year == 0xFFFF or month > 12 or day > 31 or hour == 0xFF:
+        return None
+    deviation = int.from_bytes(raw[9:11], "big", signed=True)
+    tzinfo = None if deviation == _DATE_TIME_DEVIATION_UNSPECIFIED else timezone(timedelta(minutes=-deviation))
+    try:
+        return datetime(
+            year,
+            month,
+            day,
+            hour,
+            0 if minute == 0xFF else minute,
+            0 if second == 0xFF else second,
+            0 if hundredths == 0xFF else hundredths * 10000,
+            tzinfo=tzinfo,
+        )
+    except ValueError:
+        return None
+
+
+def _build_range_descriptor(
+    start: datetime,
+    end: datetime,
+    restricting_object: Tuple[int, bytes, int, int] = (8, CLOCK_LOGICAL_NAME, 2, 0),
+) -> bytes:
+    """Selective access by time range (selector 1) over all captured columns."""
+
+    class_id, logical_name, attribute_id, data_index = restricting_object
+    return b"".join(
+        (
+            b"\x01",  # range_descriptor
+            b"\x02\x04",
+            b"\x02\x04",
+            b"\x12" + class_id.to_bytes(2, "big"),
+            b"\x09\x06" + logical_name,
+            b"\x0F" + bytes([attribute_id & 0xFF]),
+            b"\x12" + data_index.to_bytes(2, "big"),
+            b"\x09\x0C" + _encode_date_time(start),
+            b"\x09\x0C" + _encode_date_time(end),
+            b"\x01\x00",  # selected_values: all columns
+        )
+    )
+
+
+def _build_entry_descriptor(from_entry: int, to_entry: int = 0, from_column: int = 1, to_column: int = 0) -> bytes:
+    """Selective access by entry range (selector 2); ``0`` means "up to the last"."""
+
+    return b"".join(
+        (
+            b"\x02",  # entry_descriptor
+            b"\x02\x04",
+            b"\x06" + from_entry.to_bytes(4, "big"),
+            b"\x06" + to_entry.to_bytes(4, "big"),
+            b"\x12" + from_column.to_bytes(2, "big"),
+            b"\x12" + to_column.to_bytes(2, "big"),
+        )
+    )
 
-    if not info.startswith(b"\xE6\xE7\x00"):
+
+class DlmsAccessError(RuntimeError):
+    """A GET returned a data-access-result instead of data."""
+
+    def __init__(self, code: int) -> None:
+        super().__init__(f"GET response returned error code 0x{code:02X}")
+        self.code = code
+
+
+class DlmsServiceError(RuntimeError):
+    """The meter answered a request with an exception or service error APDU."""
+
+
+def _check_response_header(info: bytes, response_type: int) -> None:
+    if info[:3] != b"\xE6\xE7\x00":
         raise RuntimeError("Malformed GET response (missing LLC header)")
-    if len(info) < 7:
+    if len(info) < 6:
         raise RuntimeError("Malformed GET response (too short)")
-    if info[3] != 0xC4:
+    tag = info[3]
+    if tag in (0xD8, 0x0E):  # exception-response / confirmedServiceError
+        raise DlmsServiceError(f"Meter rejected the request (APDU tag 0x{tag:02X})")
+    if tag != 0xC4:
         raise RuntimeError("Unexpected GET response tag")
-    if info[4] != 0x01:
+    if info[4] != response_type:
         raise RuntimeError("Unsupported GET response type")
 
+
+def _build_get_next_apdu(invoke_id: int, block_number: int) -> bytes:
+    """Build a GET.request-next APDU acknowledging *block_number*."""
+
+    return b"\xE6\xE6\x00\xC0\x02" + bytes([invoke_id & 0xFF]) + block_number.to_bytes(4, "big")
+
+
+def _parse_get_datablock(info: bytes, expected_invoke_id: int) -> Tuple[bool, int, memoryview]:
+    """Split a GET.response-with-datablock into ``(last_block, block_number, raw_data)``.
+
+    ``raw_data`` is a view into *info*; consume it before receiving again.
+    """
+
+    _check_response_header(info, 0x02)
+    if len(info) < 13:
+        raise RuntimeError("Malformed GET datablock (too short)")
+    if info[5] != (expected_invoke_id & 0xFF):
+        raise RuntimeError("Invoke-ID mismatch in GET response")
+    last_block = info[6] != 0x00
+    block_number = int.from_bytes(info[7:11], "big")
+    if info[11] != 0x00:
+        raise DlmsAccessError(info[12])
+    length, offset = _decode_axdr_length(info, 12)
+    if offset + length > len(info):
+        raise RuntimeError("Malformed GET datablock (truncated raw data)")
+    return last_block, block_number, memoryview(info)[offset : offset + length]
+
+
+def _split_get_data_results(buffer: bytes, count: int) -> List[Union[bytes, Exception]]:
+    """Split an encoded ``SEQUENCE OF Get-Data-Result`` into per-item payloads.
+
+    Items that carry a data-access-result are returned as
+    :class:`DlmsAccessError` instances.
+    """
+
+    items, offset = _decode_axdr_length(buffer, 0)
+    if items != count:
+        raise RuntimeError(f"GET-with-list returned {items} results for {count} requests")
+    results: List[Union[bytes, Exception]] = []
+    for _ in range(count):
+        if offset + 2 > len(buffer):
+            raise RuntimeError("Malformed GET-with-list response (truncated)")
+        choice = buffer[offset]
+        if choice == 0x00:
+            end = decode_data(buffer, offset + 1)[1]
+            results.append(buffer[offset + 1 : end])
+            offset = end
+        else:
+            results.append(DlmsAccessError(buffer[offset + 1]))
+            offset += 2
+    return results
+
+
+def _extract_get_with_list_payloads(info: bytes, expected_invoke_id: int, count: int) -> List[Union[bytes, Exception]]:
+    """Split a GET.response-with-list into per-item encoded data payloads."""
+
+    _check_response_header(info, 0x03)
+    if info[5] != (expected_invoke_id & 0xFF):
+        raise RuntimeError("Invoke-ID mismatch in GET response")
+    return _split_get_data_results(bytes(info[6:]), count)
+
+
+def _extract_get_response_payload(info: bytes, expected_invoke_id: int) -> bytes:
+    """Validate a GET.response APDU and return the data payload.
+
+    *info* may be a ``memoryview`` into the receive buffer; only the data
+    payload is copied out.
+    """
+
+    _check_response_header(info, 0x01)
+    if len(info) < 7:
+        raise RuntimeError("Malformed GET response (too short)")
+
     invoke_field = info[5]
     if invoke_field != (expected_invoke_id & 0xFF):
         raise RuntimeError("Invoke-ID mismatch in GET response")
 
     result = info[6]
     if result != 0x00:
-        raise RuntimeError(f"GET response returned error code 0x{result:02X}")
+        raise DlmsAccessError(info[7] if len(info) > 7 else result)
 
-    return info[7:]
+    return bytes(info[7:])
 
 
 # ---------------------------------------------------------------------------
@@ -276,60 +813,74 @@ def _determine_frame_type(control: int) -> Tuple[str, Optional[int], Optional[in
     return "U", None, None, pf
 
 
-def _parse_frame(raw: bytes) -> ParsedFrame:
-    if len(raw) < 5 or raw[0] != 0x7E or raw[-1] != 0x7E:
+def _parse_frame_view(buffer: memoryview, start: int, end: int) -> ParsedFrame:
+    """Parse the frame occupying ``buffer[start:end]`` (flags included) in place.
+
+    No intermediate ``bytes`` objects are built: addresses are decoded and the
+    HCS/FCS are checked by walking offsets, and the returned record refers back
+    into *buffer* for the information field. The CRC is folded here, in one
+    pass, once the closing flag is buffered; the receive loop does not fold it
+    per received chunk (same bytes folded, only earlier, at the cost of state
+    kept across partial reads).
+    """
+
+    if end - start < 5 or buffer[start] != 0x7E or buffer[end - 1] != 0x7E:
         raise ValueError("Invalid HDLC frame boundary")
 
-    body = raw[1:-1]
-    format_field = int.from_bytes(body[:2], "big")
-    idx = 2
-    dest, consumed = _decode_hdlc_address(body, idx)
-    idx += consumed
-    src, consumed = _decode_hdlc_address(body, idx)
-    idx += consumed
-    control = body[idx]
+    body_end = end - 1
+    format_field = (buffer[start + 1] << 8) | buffer[start + 2]
+    idx = start + 3
+    addresses = []
+    for _ in range(2):
+        value = 0
+        while True:
+            if idx >= body_end:
+                raise ValueError("unterminated HDLC address")
+            byte = buffer[idx]
+            idx += 1
+            value = (value << 7) | (byte >> 1)
+            if byte & 0x01:
+                break
+        addresses.append(value)
+    if idx >= body_end:
+        raise ValueError("Incomplete HDLC frame (missing FCS)")
+    control = buffer[idx]
     idx += 1
 
-    payload = body[idx:]
-    if len(payload) < 2:
+    payload_len = body_end - idx - 2
+    if payload_len < 0:
         raise ValueError("Incomplete HDLC frame (missing FCS)")
-    fcs_bytes = payload[-2:]
-    payload = payload[:-2]
 
-    if payload:
-        if len(payload) < 2:
+    # Single pass: the HCS is checked against the register after the header,
+    # then HCS + info + FCS are folded on top and compared with the residue.
+    crc = _crc16_update(CRC16_INIT, buffer[start + 1 : idx])
+    hcs_valid = True
+    if payload_len:
+        if payload_len < 2:
             raise ValueError("Invalid payload length for frame with information")
-        hcs_bytes = payload[:2]
-        info = payload[2:]
+        hcs_valid = _crc16_finalize(crc) == (buffer[idx] | (buffer[idx + 1] << 8))
+        info_start = idx + 2
     else:
-        hcs_bytes = b""
-        info = b""
-
-    header = body[: idx]
-    hcs_valid = True
-    if hcs_bytes:
-        hcs_calc = _crc16_hdlc(header)
-        hcs_valid = hcs_calc == int.from_bytes(hcs_bytes, "little")
+        info_start = idx
+    fcs_valid = _crc16_update(crc, buffer[idx:body_end]) == CRC16_GOOD_RESIDUE
 
-    fcs_calc = _crc16_hdlc(header + hcs_bytes + info)
-    fcs_valid = fcs_calc == int.from_bytes(fcs_bytes, "little")
-
-    frame_type, ns, nr, pf = _determine_frame_type(control)
     return ParsedFrame(
-        format_field=format_field,
-        destination=dest,
-        source=src,
-        control=control,
-        frame_type=frame_type,
-        send_sequence=ns,
-        receive_sequence=nr,
-        poll_final=pf,
-        info=info,
-        hcs_valid=hcs_valid,
-        fcs_valid=fcs_valid,
+        format_field,
+        addresses[0],
+        addresses[1],
+        control,
+        hcs_valid,
+        fcs_valid,
+        buffer,
+        info_start,
+        body_end - 2,
     )
 
 
+def _parse_frame(raw: bytes) -> ParsedFrame:
+    return _parse_frame_view(memoryview(raw), 0, len(raw))
+
+
 # ---------------------------------------------------------------------------
 # DLMS data parsing
 # ---------------------------------------------------------------------------
@@ -339,336 +890,3225 @@ class DlmsDataError(ValueError):
     pass
 
 
-def _parse_data(buffer: bytes) -> Tuple[Any, bytes]:
-    if not buffer:
-        raise DlmsDataError("Unexpected end of data")
-    tag = buffer[0]
-    if tag == 0x00:  # null-data
-        return None, buffer[1:]
-    if tag == 0x02:  # structure
-        if len(buffer) < 2:
-            raise DlmsDataError("Malformed structure")
-        count = buffer[1]
-        remaining = buffer[2:]
-        items = []
-        for _ in range(count):
-            value, remaining = _parse_data(remaining)
-            items.append(value)
-        return items, remaining
-    if tag == 0x05:  # double-long (signed 32)
-        if len(buffer) < 5:
-            raise DlmsDataError("Malformed double-long")
-        return int.from_bytes(buffer[1:5], "big", signed=True), buffer[5:]
-    if tag == 0x06:  # double-long-unsigned (unsigned 32)
-        if len(buffer) < 5:
-            raise DlmsDataError("Malformed double-long-unsigned")
-        return int.from_bytes(buffer[1:5], "big", signed=False), buffer[5:]
-    if tag == 0x09:  # octet-string
-        if len(buffer) < 2:
-            raise DlmsDataError("Malformed octet-string")
-        length = buffer[1]
-        if len(buffer) < 2 + length:
-            raise DlmsDataError("Incomplete octet-string")
-        return buffer[2 : 2 + length], buffer[2 + length :]
-    if tag == 0x0A:  # visible-string
-        if len(buffer) < 2:
-            raise DlmsDataError("Malformed visible-string")
-        length = buffer[1]
-        if len(buffer) < 2 + length:
-            raise DlmsDataError("Incomplete visible-string")
-        raw = buffer[2 : 2 + length]
-        try:
-            decoded = raw.decode("ascii")
-        except UnicodeDecodeError:
-            decoded = raw.decode("latin-1", errors="ignore")
-        return decoded, buffer[2 + length :]
-    if tag == 0x0F:  # integer (8-bit signed)
-        if len(buffer) < 2:
-            raise DlmsDataError("Malformed integer8")
-        return struct.unpack("!b", buffer[1:2])[0], buffer[2:]
-    if tag == 0x10:  # long (16-bit signed)
-        if len(buffer) < 3:
-            raise DlmsDataError("Malformed long")
-        return int.from_bytes(buffer[1:3], "big", signed=True), buffer[3:]
-    if tag == 0x11:  # unsigned (8-bit)
-        if len(buffer) < 2:
-            raise DlmsDataError("Malformed unsigned8")
-        return buffer[1], buffer[2:]
-    if tag == 0x12:  # long-unsigned (16-bit)
-        if len(buffer) < 3:
-            raise DlmsDataError("Malformed long-unsigned")
-        return int.from_bytes(buffer[1:3], "big", signed=False), buffer[3:]
-    if tag == 0x14:  # long64-unsigned (64-bit unsigned)
-        if len(buffer) < 9:
-            raise DlmsDataError("Malformed long64-unsigned")
-        return int.from_bytes(buffer[1:9], "big", signed=False), buffer[9:]
-    if tag == 0x16:  # enum
-        if len(buffer) < 2:
-            raise DlmsDataError("Malformed enum")
-        return buffer[1], buffer[2:]
-    raise DlmsDataError(f"Unsupported DLMS data type 0x{tag:02X}")
+class DlmsIncompleteData(DlmsDataError):
+    """The buffer ended before the encoded value was complete."""
 
 
-UNIT_LABELS: Dict[int, str] = {
-    0: "",
-    1: "year",
-    5: "h",
-    6: "min",
-    7: "s",
-    8: "°",
-    9: "K",
-    20: "Wh",
-    25: "varh",
-    27: "VAh",
-    29: "W",
-    30: "VA",
-    31: "var",
-    32: "V",
-    33: "A",
-    35: "Hz",
-    37: "°C",
-    38: "%",
+# Fixed-width numeric types: tag -> (struct format, name). decode_data unpacks
+# these inline; the remaining types go through _DATA_DECODERS.
+_FIXED_WIDTH_TYPES: Dict[int, Tuple[str, str]] = {
+    0x03: (">?", "boolean"),
+    0x05: (">i", "double-long"),
+    0x06: (">I", "double-long-unsigned"),
+    0x0F: (">b", "integer"),
+    0x10: (">h", "long"),
+    0x11: (">B", "unsigned"),
+    0x12: (">H", "long-unsigned"),
+    0x14: (">q", "long64"),
+    0x15: (">Q", "long64-unsigned"),
+    0x16: (">B", "enum"),
+    0x17: (">f", "float32"),
+    0x18: (">d", "float64"),
+}
+_FIXED_WIDTH_UNPACK: Dict[int, Tuple[Callable[..., Tuple[Any, ...]], int]] = {
+    tag: (struct.Struct(fmt).unpack_from, struct.calcsize(fmt)) for tag, (fmt, _name) in _FIXED_WIDTH_TYPES.items()
 }
 
 
-def _resolve_unit_label(unit_code: int, preferred: Optional[str] = None) -> Tuple[str, Optional[str]]:
-    reported = UNIT_LABELS.get(unit_code, f"code {unit_code}")
-    if preferred and reported != preferred:
-        return preferred, reported
-    return reported, None
+def _fixed_width_decoder(fmt: str, name: str) -> Callable[[memoryview, int], Tuple[Any, int]]:
+    unpack_from = struct.Struct(fmt).unpack_from
+    size = struct.calcsize(fmt)
 
+    def decode(view: memoryview, offset: int) -> Tuple[Any, int]:
+        if offset + size > len(view):
+            raise DlmsIncompleteData(f"Malformed {name}")
+        return unpack_from(view, offset)[0], offset + size
 
-# ---------------------------------------------------------------------------
-# DLMS client implementation
-# ---------------------------------------------------------------------------
+    return decode
 
 
-class DLMSClient:
-    def __init__(
-        self,
-        host: str,
-        port: int,
-        server_logical: int,
-        server_physical: int,
-        client_sap: int,
-        max_info_length: Optional[int],
-        password: bytes,
-        verbose: bool = False,
-        timeout: float = 5.0,
-    ) -> None:
-        self.host = host
-        self.port = port
-        self.server_address = _combine_server_address(server_logical, server_physical)
-        self.client_address = client_sap
-        self.max_info_length = max_info_length
-        self.password = password
-        self.verbose = verbose
-        self.timeout = timeout
+def _decode_null(view: memoryview, offset: int) -> Tuple[Any, int]:
+    return None, offset
 
-        self._sock: Optional[socket.socket] = None
-        self._send_seq = 0
-        self._recv_seq = 0
-        self._invoke_id = 1
 
-    # ---- logging helpers -------------------------------------------------
-    def _log(self, message: str) -> None:
-        if self.verbose:
-            now = time.strftime("%H:%M:%S")
-            print(f"[{now}] {message}")
+def _string_bounds(view: memoryview, offset: int, name: str) -> Tuple[int, int]:
+    length, start = _decode_axdr_length(view, offset)
+    if start + length > len(view):
+        raise DlmsIncompleteData(f"Incomplete {name}")
+    return start, start + length
 
-    def _log_frame(self, label: str, frame: bytes) -> None:
-        if self.verbose:
-            hex_repr = " ".join(f"{byte:02X}" for byte in frame)
-            self._log(f"{label} {hex_repr}")
 
-    # ---- socket helpers --------------------------------------------------
-    def _send_frame(self, frame: bytes) -> None:
-        if not self._sock:
-            raise RuntimeError("Not connected")
-        self._log_frame("TX", frame)
-        self._sock.sendall(frame)
+def _decode_octet_string(view: memoryview, offset: int) -> Tuple[Any, int]:
+    start, end = _string_bounds(view, offset, "octet-string")
+    return bytes(view[start:end]), end
 
-    def _read_frame(self, timeout: Optional[float] = None) -> bytes:
-        if not self._sock:
-            raise RuntimeError("Not connected")
-        self._sock.settimeout(timeout if timeout is not None else self.timeout)
-        buffer = bytearray()
-        while True:
-            chunk = self._sock.recv(1)
-            if not chunk:
-                raise ConnectionError("Socket closed while waiting for frame")
-            byte = chunk[0]
-            if not buffer:
-                if byte != 0x7E:
-                    continue
-                buffer.append(byte)
-            else:
-                buffer.append(byte)
-                if byte == 0x7E:
-                    if len(buffer) == 1:  # consecutive flags
-                        buffer.clear()
-                        buffer.append(byte)
-                        continue
-                    frame = bytes(buffer)
-                    self._log_frame("RX", frame)
-                    return frame
 
-    def _drain_initial_frames(self) -> None:
+def _decode_visible_string(view: memoryview, offset: int) -> Tuple[Any, int]:
+    start, end = _string_bounds(view, offset, "visible-string")
+    raw = bytes(view[start:end])
+    try:
+        return raw.decode("ascii"), end
+    except UnicodeDecodeError:
+        return raw.decode("latin-1", errors="ignore"), end
+
+
+def _decode_utf8_string(view: memoryview, offset: int) -> Tuple[Any, int]:
+    start, end = _string_bounds(view, offset, "utf8-string")
+    return bytes(view[start:end]).decode("utf-8", errors="replace"), end
+
+
+def _decode_bit_string(view: memoryview, offset: int) -> Tuple[Any, int]:
+    bits, start = _decode_axdr_length(view, offset)
+    end = start + (bits + 7) // 8
+    if end > len(view):
+        raise DlmsIncompleteData("Incomplete bit-string")
+    value = int.from_bytes(view[start:end], "big") >> ((8 - bits % 8) % 8)
+    return format(value, f"0{bits}b") if bits else "", end
+
+
+def _decode_bcd(view: memoryview, offset: int) -> Tuple[Any, int]:
+    if offset >= len(view):
+        raise DlmsIncompleteData("Malformed bcd")
+    byte = view[offset]
+    return (byte >> 4) * 10 + (byte & 0x0F), offset + 1
+
+
+def _fixed_octets_decoder(size: int, name: str) -> Callable[[memoryview, int], Tuple[Any, int]]:
+    def decode(view: memoryview, offset: int) -> Tuple[Any, int]:
+        if offset + size > len(view):
+            raise DlmsIncompleteData(f"Malformed {name}")
+        return bytes(view[offset : offset + size]), offset + size
+
+    return decode
+
+
+def _decode_date_time_value(view: memoryview, offset: int) -> Tuple[Any, int]:
+    if offset + 12 > len(view):
+        raise DlmsIncompleteData("Malformed date-time")
+    raw = bytes(view[offset : offset + 12])
+    value = _decode_date_time(raw)
+    return (raw if value is None else value), offset + 12
+
+
+# Decoders for every non-container A-XDR type, keyed by tag. Each takes the
+# view and the offset just past the tag and returns ``(value, next_offset)``.
+# date (0x1A) and time (0x1B) stay raw because they are mostly wildcards.
+_DATA_DECODERS: Dict[int, Callable[[memoryview, int], Tuple[Any, int]]] = {
+    0x00: _decode_null,
+    0x04: _decode_bit_string,
+    0x09: _decode_octet_string,
+    0x0A: _decode_visible_string,
+    0x0C: _decode_utf8_string,
+    0x0D: _decode_bcd,
+    0x19: _decode_date_time_value,
+    0x1A: _fixed_octets_decoder(5, "date"),
+    0x1B: _fixed_octets_decoder(4, "time"),
+}
+_DATA_DECODERS.update(
+    {tag: _fixed_width_decoder(fmt, name) for tag, (fmt, name) in _FIXED_WIDTH_TYPES.items()}
+)
+
+
+def decode_data(buffer: Union[bytes, bytearray, memoryview], offset: int = 0) -> Tuple[Any, int]:
+    """Decode one A-XDR ``Data`` value starting at *offset*.
+
+    Returns ``(value, next_offset)``. Arrays and structures become lists and
+    are decoded with an explicit stack, so deep or long containers cost
+    linear time and no recursion. Truncated input raises
+    :class:`DlmsIncompleteData`.
+    """
+
+    view = buffer if isinstance(buffer, memoryview) else memoryview(buffer)
+    end = len(view)
+    fixed = _FIXED_WIDTH_UNPACK
+    decoders = _DATA_DECODERS
+    items: Optional[List[Any]] = None  # container being filled, None at top level
+    remaining = 0  # elements still expected in ``items``
+    stack: List[Tuple[List[Any], int]] = []  # enclosing containers
+    while True:
+        if offset >= end:
+            raise DlmsIncompleteData("Unexpected end of data")
+        tag = view[offset]
+        offset += 1
+        fixed_width = fixed.get(tag)
+        if fixed_width is not None:
+            unpack_from, size = fixed_width
+            if offset + size > end:
+                raise DlmsIncompleteData(f"Malformed {_FIXED_WIDTH_TYPES[tag][1]}")
+            value: Any = unpack_from(view, offset)[0]
+            offset += size
+        elif tag == 0x01 or tag == 0x02:  # array / structure
+            count, offset = _decode_axdr_length(view, offset)
+            if count:
+                if items is not None:
+                    stack.append((items, remaining))
+                items, remaining = [], count
+                continue
+            value = []
+        elif tag == 0x09 and offset < end and view[offset] < 0x80:  # short octet-string
+            length = view[offset]
+            offset += 1
+            if offset + length > end:
+                raise DlmsIncompleteData("Incomplete octet-string")
+            value = bytes(view[offset : offset + length])
+            offset += length
+        else:
+            decoder = decoders.get(tag)
+            if decoder is None:
+                raise DlmsDataError(f"Unsupported DLMS data type 0x{tag:02X}")
+            value, offset = decoder(view, offset)
+        while items is not None:
+            items.append(value)
+            remaining -= 1
+            if remaining:
+                break
+            value = items
+            if stack:
+                items, remaining = stack.pop()
+            else:
+                items = None
+        if items is None:
+            return value, offset
+
+
+def iter_decode(buffer: Union[bytes, bytearray, memoryview], offset: int = 0) -> Iterator[Any]:
+    """Yield the elements of an encoded array/structure as they are decoded.
+
+    A scalar value is yielded once. Nothing beyond the current element is
+    materialised, which keeps memory flat for large profile buffers.
+    """
+
+    view = buffer if isinstance(buffer, memoryview) else memoryview(buffer)
+    if offset >= len(view):
+        raise DlmsIncompleteData("Unexpected end of data")
+    if view[offset] not in (0x01, 0x02):
+        yield decode_data(view, offset)[0]
+        return
+    count, offset = _decode_axdr_length(view, offset + 1)
+    for _ in range(count):
+        value, offset = decode_data(view, offset)
+        yield value
+
+
+def _parse_data(buffer: bytes) -> Tuple[Any, bytes]:
+    value, offset = decode_data(buffer)
+    return value, buffer[offset:]
+
+
+class IncrementalDataDecoder:
+    """Decode one A-XDR ``Data`` value that arrives in arbitrary chunks.
+
+    When the value is an array or structure its elements are returned by
+    :meth:`feed` as soon as each one is complete, so only the undecoded tail
+    is kept in memory. A scalar value is returned once it is complete.
+    """
+
+    def __init__(self) -> None:
+        self._pending = bytearray()
+        self._remaining: Optional[int] = None  # elements still to decode
+        self.container_tag: Optional[int] = None  # 0x01/0x02, or None for a scalar
+        self.element_count: Optional[int] = None
+        self.bytes_fed = 0
+
+    @property
+    def complete(self) -> bool:
+        return self._remaining == 0
+
+    def _read_header(self) -> bool:
+        if not self._pending:
+            return False
+        tag = self._pending[0]
+        if tag not in (0x01, 0x02):
+            self._remaining = 1
+            return True
+        try:
+            count, offset = _decode_axdr_length(self._pending, 1)
+        except DlmsIncompleteData:
+            return False
+        del self._pending[:offset]
+        self.container_tag = tag
+        self.element_count = count
+        self._remaining = count
+        return True
+
+    def feed(self, chunk: Union[bytes, bytearray, memoryview]) -> List[Any]:
+        """Append *chunk* and return the elements completed by it."""
+
+        if self.complete and chunk:
+            raise DlmsDataError("Data after the end of the decoded value")
+        self._pending += chunk
+        self.bytes_fed += len(chunk)
+        if self._remaining is None and not self._read_header():
+            return []
+        decoded: List[Any] = []
+        consumed = 0
+        with memoryview(self._pending) as view:
+            while self._remaining:
+                try:
+                    value, consumed_next = decode_data(view, consumed)
+                except DlmsIncompleteData:
+                    break
+                consumed = consumed_next
+                decoded.append(value)
+                self._remaining -= 1
+        del self._pending[:consumed]
+        if self.complete and self._pending:
+            raise DlmsDataError("Data after the end of the decoded value")
+        return decoded
+
+    def finish(self) -> None:
+        """Raise if the value fed so far is incomplete."""
+
+        if not self.complete:
+            raise DlmsDataError(f"Value truncated after {self.bytes_fed} bytes")
+
+
+# array.array typecodes for the fixed-width types (struct format char -> typecode).
+_ARRAY_TYPECODES: Dict[str, str] = {
+    "?": "B",
+    "b": "b",
+    "B": "B",
+    "h": "h",
+    "H": "H",
+    "i": "i",
+    "I": "I",
+    "q": "q",
+    "Q": "Q",
+    "f": "f",
+    "d": "d",
+}
+
+
+def _columnar_fields(view: memoryview, offset: int) -> Optional[Tuple[int, int, List[Tuple[int, str, int]]]]:
+    """Describe an array of identically shaped structures starting at *offset*.
+
+    Returns ``(row_count, body_offset, fields)`` where every field is
+    ``(tag, struct_code, width)``, or ``None`` when the first row contains a
+    type that has no fixed width. Octet/visible strings count as fixed width
+    using the length found in the first row.
+    """
+
+    if offset + 2 > len(view) or view[offset] != 0x01:
+        return None
+    count, body = _decode_axdr_length(view, offset + 1)
+    if not count or body + 2 > len(view) or view[body] != 0x02 or view[body + 1] >= 0x80:
+        return None
+    fields: List[Tuple[int, str, int]] = []
+    position = body + 2
+    for _ in range(view[body + 1]):
+        if position >= len(view):
+            return None
+        tag = view[position]
+        fixed_width = _FIXED_WIDTH_TYPES.get(tag)
+        if fixed_width is not None:
+            code = fixed_width[0][1:]
+            width = struct.calcsize(">" + code)
+            position += 1 + width
+        elif tag in (0x09, 0x0A) and position + 1 < len(view) and view[position + 1] < 0x80:
+            width = view[position + 1]
+            code = f"{width}s"
+            position += 2 + width
+        else:
+            return None
+        fields.append((tag, code, width))
+    return count, body, fields
+
+
+def _columnar_row_size(fields: Sequence[Tuple[int, str, int]]) -> int:
+    return 2 + sum(1 + width + (1 if code.endswith("s") else 0) for _tag, code, width in fields)
+
+
+def _columnar_is_homogeneous(body: bytes, count: int, fields: Sequence[Tuple[int, str, int]]) -> bool:
+    """Check every row against the first one using strided byte comparisons."""
+
+    row_size = _columnar_row_size(fields)
+    if len(body) < row_size * count:
+        return False
+    body = body[: row_size * count]
+    header = body[:2]
+    if body[0::row_size] != header[:1] * count or body[1::row_size] != header[1:] * count:
+        return False
+    position = 2
+    for tag, code, width in fields:
+        if body[position::row_size] != bytes([tag]) * count:
+            return False
+        position += 1
+        if code.endswith("s"):
+            if body[position::row_size] != bytes([width]) * count:
+                return False
+            position += 1
+        position += width
+    return True
+
+
+def _decode_columns_numpy(body: bytes, count: int, fields: Sequence[Tuple[int, str, int]]) -> List[Any]:
+    names: List[str] = []
+    formats: List[Any] = []
+    offsets: List[int] = []
+    position = 2
+    for index, (_tag, code, width) in enumerate(fields):
+        position += 2 if code.endswith("s") else 1
+        names.append(f"c{index}")
+        formats.append(("u1", (width,)) if code.endswith("s") else ">" + code)
+        offsets.append(position)
+        position += width
+    dtype = np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": position})
+    table = np.frombuffer(body, dtype=dtype, count=count)
+    columns: List[Any] = []
+    for name, (_tag, code, _width) in zip(names, fields):
+        column = table[name]
+        columns.append(column if code.endswith("s") else column.astype(column.dtype.newbyteorder("=")))
+    return columns
+
+
+def _decode_columns_struct(body: bytes, count: int, fields: Sequence[Tuple[int, str, int]]) -> List[Any]:
+    layout = ">xx" + "".join(("xx" if code.endswith("s") else "x") + code for _tag, code, _width in fields)
+    row_size = struct.calcsize(layout)
+    rows = struct.iter_unpack(layout, body[: row_size * count])
+    columns: List[Any] = []
+    for values, (_tag, code, _width) in zip(zip(*rows), fields):
+        typecode = _ARRAY_TYPECODES.get(code)
+        columns.append(array(typecode, values) if typecode else list(values))
+    return columns
+
+
+def decode_columns(buffer: Union[bytes, bytearray, memoryview], offset: int = 0) -> Tuple[List[Any], bool]:
+    """Decode an array of structures column by column.
+
+    Returns ``(columns, vectorized)``. When every row has the same types and
+    string lengths, each column is decoded straight into a NumPy array (or an
+    ``array.array`` without NumPy; strings become lists of bytes, or ``(n,
+    width)`` uint8 arrays with NumPy). Otherwise, e.g. with null timestamps
+    in compressed profiles, rows are decoded one by one and ``vectorized`` is
+    False, with each column returned as a list.
+    """
+
+    view = buffer if isinstance(buffer, memoryview) else memoryview(buffer)
+    described = _columnar_fields(view, offset)
+    if described is not None:
+        count, body_offset, fields = described
+        body = bytes(view[body_offset:])
+        if _columnar_is_homogeneous(body, count, fields):
+            if np is not None:
+                return _decode_columns_numpy(body, count, fields), True
+            return _decode_columns_struct(body, count, fields), True
+
+    rows = list(iter_decode(view, offset))
+    width = len(rows[0]) if rows and isinstance(rows[0], list) else 0
+    if any(not isinstance(row, list) or len(row) != width for row in rows):
+        raise DlmsDataError("Array elements are not structures of equal size")
+    return [list(column) for column in zip(*rows)] if rows else [], False
+
+
+def _scale_column(column: Any, scaler: int) -> Any:
+    """Apply ``10 ** scaler`` to a numeric column in one pass.
+
+    Negative scalers divide by the exact power of ten, so 2291 with scaler -1
+    gives 229.1 rather than 229.10000000000002.
+    """
+
+    if scaler < 0:
+        divisor = 10.0 ** -scaler
+        if np is not None and isinstance(column, np.ndarray):
+            return column / divisor
+        if isinstance(column, array):
+            return array("d", [value / divisor for value in column])
+        return [value / divisor if isinstance(value, (int, float)) else value for value in column]
+    factor = 10.0 ** scaler
+    if np is not None and isinstance(column, np.ndarray):
+        return column * factor
+    if isinstance(column, array):
+        return array("d", [value * factor for value in column])
+    return [value * factor if isinstance(value, (int, float)) else value for value in column]
+
+
+def _date_time_column(column: Any) -> Any:
+    """Decode a column of 12-byte COSEM date-times.
+
+    ``(n, 12)`` uint8 arrays become ``datetime64[s]`` arrays in UTC (NaT where
+    the timestamp is not fully specified), the same instants as the aware
+    datetimes of the row-wise path; stamps whose deviation is "not specified"
+    stay in meter local time, like the naive datetimes. Other columns become
+    lists of ``datetime``/``None``.
+    """
+
+    if np is not None and isinstance(column, np.ndarray) and column.ndim == 2 and column.shape[1] == 12:
+        fields = column.astype(np.int64)
+        year = (fields[:, 0] << 8) | fields[:, 1]
+        valid = (year != 0xFFFF) & (fields[:, 2] <= 12) & (fields[:, 3] <= 31) & (fields[:, 5] < 24)
+        year = np.where(valid, year, 1970)
+        month = np.where(valid, fields[:, 2], 1)
+        day = np.where(valid, fields[:, 3], 1)
+        # Days since 1970-01-01 from the civil date (proleptic Gregorian).
+        shifted = year - (month <= 2)
+        era = shifted // 400
+        year_of_era = shifted - era * 400
+        day_of_year = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+        days = era * 146097 + year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year - 719468
+        seconds = (
+            days * 86400
+            + np.where(valid, fields[:, 5], 0) * 3600
+            + np.where(fields[:, 6] < 60, fields[:, 6], 0) * 60
+            + np.where(fields[:, 7] < 60, fields[:, 7], 0)
+        )
+        # COSEM deviation is UTC minus local time, in minutes.
+        deviation = ((fields[:, 9] << 8) | fields[:, 10]) - ((fields[:, 9] & 0x80) << 9)
+        seconds += np.where(deviation != _DATE_TIME_DEVIATION_UNSPECIFIED, deviation, 0) * 60
+        stamps = seconds.astype("datetime64[s]")
+        stamps[~valid] = np.datetime64("NaT")
+        return stamps
+    return [
+        value if isinstance(value, datetime) else _decode_date_time(bytes(value)) if value is not None else None
+        for value in column
+    ]
+
+
+UNIT_LABELS: Dict[int, str] = {
+    0: "",
+    1: "year",
+    5: "h",
+    6: "min",
+    7: "s",
+    8: "°",
+    9: "K",
+    20: "Wh",
+    25: "varh",
+    27: "VAh",
+    29: "W",
+    30: "VA",
+    31: "var",
+    32: "V",
+    33: "A",
+    35: "Hz",
+    37: "°C",
+    38: "%",
+}
+
+
+def _resolve_unit_label(unit_code: int, preferred: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    reported = UNIT_LABELS.get(unit_code, f"code {unit_code}")
+    if preferred and reported != preferred:
+        return preferred, reported
+    return reported, None
+
+
+# ---------------------------------------------------------------------------
+# Fixed-point register values
+# ---------------------------------------------------------------------------
+
+
+# 10 ** n for every magnitude an integer (int8) scaler can take.
+_POWERS_OF_TEN = tuple(10 ** n for n in range(129))
+
+
+class ScaledValue:
+    """Register value kept as read: ``raw * 10 ** scaler``.
+
+    ``float()`` is the fast path used for telemetry; negative scalers divide
+    by the exact integer power of ten, so 2291 with scaler -1 gives 229.1.
+    :meth:`exact` builds a Decimal only when a consumer asks for it.
+    Equality and hashing go through ``float()`` so a value can stand in for
+    the float it replaces (dict keys, sets); compare ``exact()`` for Decimals.
+    """
+
+    __slots__ = ("raw", "scaler")
+
+    def __init__(self, raw: int, scaler: int = 0) -> None:
+        self.raw = raw
+        self.scaler = scaler
+
+    def __float__(self) -> float:
+        scaler = self.scaler
+        if scaler < 0:
+            return self.raw / _POWERS_OF_TEN[-scaler]
+        return float(self.raw * _POWERS_OF_TEN[scaler])
+
+    def exact(self) -> Decimal:
+        if self.scaler < 0:
+            return Decimal(f"{self.raw}E{self.scaler}")
+        return Decimal(self.raw * _POWERS_OF_TEN[self.scaler])
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ScaledValue):
+            return float(self) == float(other)
+        if isinstance(other, (int, float)):
+            return float(self) == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(float(self))
+
+    def __repr__(self) -> str:
+        return f"ScaledValue({self.raw}, {self.scaler})"
+
+    def __str__(self) -> str:
+        return str(self.exact())
+
+    def __format__(self, spec: str) -> str:
+        return format(float(self), spec) if spec else str(self)
+
+
+# Integer registers keep their exact form; float32/float64 registers are plain floats.
+RegisterValue = Union[ScaledValue, float]
+
+
+# ---------------------------------------------------------------------------
+# Scaler/unit cache
+# ---------------------------------------------------------------------------
+
+
+# Objects read after each association to key the scaler/unit cache.
+SERIAL_NUMBER_OBIS = "0-0:96.1.0.255"
+FIRMWARE_VERSION_OBIS = ("1-0:0.2.0.255", "0-0:42.0.0.255")
+
+
+def _normalize_obis(obis: str) -> str:
+    return bytes_to_obis(obis_to_bytes(obis))
+
+
+def _identification_text(value: Any) -> Optional[str]:
+    if isinstance(value, bytes):
+        if value and all(0x20 <= byte < 0x7F for byte in value):
+            return value.decode("ascii").strip()
+        return value.hex().upper() or None
+    if value is None:
+        return None
+    return str(value).strip() or None
+
+
+class ScalerUnitCache:
+    """Scaler/unit of Register objects, keyed by meter identity and OBIS.
+
+    Scaler and unit are static configuration, so they only need to be read
+    once per meter and firmware. The client binds the cache to the meter's
+    serial number and firmware version after every association; binding to a
+    different firmware drops the entries. An optional *store* persists them
+    across restarts and must provide ``load(identity, firmware)`` (discarding
+    entries recorded under another firmware) and
+    ``save(identity, firmware, entries)``. Store failures are counted but
+    never fail a read.
+
+    Only :meth:`load`, :meth:`flush` and :meth:`bind` touch the store; the
+    protocol flows use :meth:`rekey` and :meth:`put`, which stay in memory,
+    so an async driver can run the store calls in a worker thread.
+    """
+
+    def __init__(self, store: Any = None) -> None:
+        self.store = store
+        self.identity: Optional[str] = None
+        self.firmware: Optional[str] = None
+        self._entries: Dict[str, Tuple[int, int]] = {}
+        self._unsaved: Dict[str, Tuple[int, int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.store_errors = 0
+        self.last_store_error: Optional[str] = None
+
+    def bind(self, identity: str, firmware: Optional[str]) -> None:
+        if self.rekey(identity, firmware):
+            self.load()
+
+    def rekey(self, identity: str, firmware: Optional[str]) -> bool:
+        """Key the cache to a meter; True if the entries were reset and should be loaded."""
+
+        if identity == self.identity and firmware == self.firmware:
+            return False
+        if identity == self.identity:
+            self.invalidations += 1
+        self.identity = identity
+        self.firmware = firmware
+        self._entries = {}
+        self._unsaved = {}
+        return self.store is not None
+
+    def load(self) -> None:
+        if self.store is None or self.identity is None:
+            return
+        try:
+            loaded = dict(self.store.load(self.identity, self.firmware))
+        except Exception as exc:  # persistent cache is best effort
+            self._store_failed(exc)
+            return
+        loaded.update(self._entries)
+        self._entries = loaded
+
+    def get(self, obis: str) -> Optional[Tuple[int, int]]:
+        entry = self._entries.get(_normalize_obis(obis))
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def put(self, entries: Dict[str, Tuple[int, int]]) -> None:
+        normalized = {_normalize_obis(obis): entry for obis, entry in entries.items()}
+        self._entries.update(normalized)
+        if self.store is not None and self.identity is not None:
+            self._unsaved.update(normalized)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._unsaved)
+
+    def flush(self) -> None:
+        """Save the entries learned since the last flush (kept for a retry on failure)."""
+
+        if not self._unsaved:
+            return
+        identity, firmware = self.identity, self.firmware
+        unsaved, self._unsaved = self._unsaved, {}
+        try:
+            self.store.save(identity, firmware, unsaved)
+        except Exception as exc:
+            self._store_failed(exc)
+            if (identity, firmware) == (self.identity, self.firmware):
+                unsaved.update(self._unsaved)
+                self._unsaved = unsaved
+
+    def discard(self, obis: str) -> None:
+        self._entries.pop(_normalize_obis(obis), None)
+
+    def _store_failed(self, exc: Exception) -> None:
+        self.store_errors += 1
+        self.last_store_error = str(exc)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "identity": self.identity,
+            "firmware": self.firmware,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups * 100.0) if lookups else None,
+            "invalidations": self.invalidations,
+            "store_errors": self.store_errors,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Sans-IO protocol core
+# ---------------------------------------------------------------------------
+
+
+class FrameEvent(NamedTuple):
+    """A U- or S-frame, or any frame that arrived before the link was set up.
+
+    ``frame`` is only valid until the next :meth:`DlmsConnection.next_event`.
+    """
+
+    frame: ParsedFrame
+
+
+class ApduEvent(NamedTuple):
+    """A complete xDLMS APDU, reassembled from its I-frame segments.
+
+    ``receive_sequence`` is the N(R) of its first frame: the response to the
+    only outstanding request must acknowledge every frame sent so far.
+    """
+
+    apdu: Union[memoryview, bytes]
+    receive_sequence: int
+
+
+class _ConnectionBase:
+    """Byte buffers and request bookkeeping shared by the transports.
+
+    Received bytes go in through :meth:`receive_data` (or :meth:`receive_buffer`
+    and :meth:`commit_received` to read straight into the buffer) and come out
+    of ``next_event`` as :class:`FrameEvent` / :class:`ApduEvent` records,
+    ``None`` meaning more bytes are needed. Frames queued by the ``send_*``
+    methods are collected with :meth:`data_to_send`.
+    """
+
+    transport = ""
+
+    def __init__(
+        self,
+        frame_cache: Optional[FrameTemplateCache] = None,
+        trace: Optional[Callable[[str, Union[bytes, memoryview]], None]] = None,
+        check_addresses: bool = False,
+    ) -> None:
+        self.frame_cache = frame_cache if frame_cache is not None else FrameTemplateCache()
+        self.trace = trace  # called with ("TX" | "RX", frame) when set
+        # Drop frames not addressed from this server to this client, as needed
+        # when several meters answer on the same line (multi-drop).
+        self.check_addresses = check_addresses
+        self._invoke_id = 1
+
+        # Bytes between _rx_start and _rx_end are received but not yet
+        # consumed as a frame.
+        self._rx_buf = bytearray(RX_BUFFER_SIZE)
+        self._rx_view = memoryview(self._rx_buf)
+        self._rx_start = 0
+        self._rx_end = 0
+        self._outbound = bytearray()
+
+        self.frames_sent = 0
+        self.frames_received = 0
+        self.frames_foreign = 0
+
+    def reset(self) -> None:
+        """Forget the link: sequence numbers, partial APDUs and all buffered bytes."""
+
+        self.reset_sequences()
+        self.clear_received()
+        self._outbound.clear()
+
+    def reset_sequences(self) -> None:
+        pass
+
+    # ---- input -----------------------------------------------------------
+    def receive_buffer(self) -> memoryview:
+        """Return the free tail of the receive buffer, compacting it first.
+
+        A buffer filled by one incomplete frame is doubled, which only happens
+        for wrapper APDUs beyond :data:`RX_BUFFER_SIZE`.
+        """
+
+        if self._rx_start == self._rx_end:
+            self._rx_start = self._rx_end = 0
+        elif self._rx_end == len(self._rx_buf):
+            pending = self._rx_end - self._rx_start
+            if pending == len(self._rx_buf):
+                if pending >= MAX_FRAME_BUFFER:
+                    raise RuntimeError("Receive buffer overflow while waiting for frame")
+                self._grow(2 * pending)
+            else:
+                self._rx_buf[:pending] = self._rx_view[self._rx_start : self._rx_end]
+                self._rx_start = 0
+                self._rx_end = pending
+        return self._rx_view[self._rx_end :]
+
+    def _grow(self, size: int) -> None:
+        # Earlier frames may still be viewed, so move to a new buffer instead
+        # of resizing the exported one.
+        pending = self._rx_end - self._rx_start
+        grown = bytearray(size)
+        grown[:pending] = self._rx_view[self._rx_start : self._rx_end]
+        self._rx_buf = grown
+        self._rx_view = memoryview(grown)
+        self._rx_start = 0
+        self._rx_end = pending
+
+    def commit_received(self, count: int) -> None:
+        """Account for *count* bytes written into :meth:`receive_buffer`."""
+
+        self._rx_end += count
+
+    def receive_data(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        """Append received bytes, growing the buffer if they do not fit."""
+
+        pending = self._rx_end - self._rx_start
+        if pending + len(data) > len(self._rx_buf):
+            self._grow(max(2 * len(self._rx_buf), pending + len(data)))
+        elif self._rx_end + len(data) > len(self._rx_buf):
+            self._rx_buf[:pending] = self._rx_view[self._rx_start : self._rx_end]
+            self._rx_start = 0
+            self._rx_end = pending
+        self._rx_view[self._rx_end : self._rx_end + len(data)] = data
+        self._rx_end += len(data)
+
+    @property
+    def pending_input(self) -> int:
+        return self._rx_end - self._rx_start
+
+    @property
+    def pending_output(self) -> int:
+        return len(self._outbound)
+
+    def clear_received(self) -> int:
+        """Drop received bytes not yet consumed as frames; return how many."""
+
+        discarded = self._rx_end - self._rx_start
+        self._rx_start = self._rx_end = 0
+        return discarded
+
+    def next_invoke_id(self) -> int:
+        value = self._invoke_id & 0xFF
+        self._invoke_id = (self._invoke_id + 1) % 0x100
+        if self._invoke_id == 0:
+            self._invoke_id = 1
+        return value
+
+    # ---- output ----------------------------------------------------------
+    def data_to_send(self) -> bytes:
+        """Return and clear the bytes queued for transmission."""
+
+        data = bytes(self._outbound)
+        self._outbound.clear()
+        return data
+
+    def _queue(self, frame: Union[bytes, bytearray]) -> None:
+        if self.trace is not None:
+            self.trace("TX", frame)
+        self._outbound += frame
+        self.frames_sent += 1
+
+
+class DlmsConnection(_ConnectionBase):
+    """HDLC link and xDLMS framing for one client/server pair, without I/O.
+
+    Sequence numbers, segment reassembly (including the RR polls it needs)
+    and frame templates live here; drivers only move bytes.
+    """
+
+    transport = TRANSPORT_HDLC
+
+    def __init__(
+        self,
+        server_address: int,
+        client_address: int,
+        max_info_length: Optional[int] = None,
+        window_size: int = HDLC_DEFAULT_WINDOW,
+        frame_cache: Optional[FrameTemplateCache] = None,
+        trace: Optional[Callable[[str, Union[bytes, memoryview]], None]] = None,
+        check_addresses: bool = False,
+    ) -> None:
+        if not 1 <= window_size <= 7:
+            raise ValueError("HDLC window size must be in range 1..7")
+        super().__init__(frame_cache, trace, check_addresses)
+        self.server_address = server_address
+        self.client_address = client_address
+        self.max_info_length = max_info_length
+        self.window_size = window_size
+
+        # Link parameters as negotiated by the UA (from this client's side).
+        self.max_info_tx = HDLC_DEFAULT_MAX_INFO
+        self.max_info_rx = HDLC_DEFAULT_MAX_INFO
+        self.window_tx = HDLC_DEFAULT_WINDOW
+        self.window_rx = HDLC_DEFAULT_WINDOW
+        self.linked = False  # I-frames are only interpreted between UA and DISC
+
+        self._send_seq = 0
+        self._recv_seq = 0
+        self._ack_seq = 0  # oldest N(S) not yet acknowledged by the meter
+        self.peer_final = False  # last I-frame from the meter carried F=1
+        self._segments: Optional[bytearray] = None
+        self._segments_nr = 0
+
+    def reset(self) -> None:
+        self.linked = False
+        super().reset()
+
+    def reset_sequences(self) -> None:
+        self._send_seq = 0
+        self._recv_seq = 0
+        self._ack_seq = 0
+        self.peer_final = False
+        self._segments = None
+
+    # ---- input -----------------------------------------------------------
+    def _locate_frame(self) -> Optional[Tuple[int, int]]:
+        """Find the next complete frame in the buffer using the length field.
+
+        Returns the ``(start, end)`` offsets of the frame including both flags,
+        or ``None`` when more data is needed. Garbage before an opening flag and
+        frames whose length field does not land on a closing flag are skipped.
+        """
+
+        buf = self._rx_buf
+        start = self._rx_start
+        end = self._rx_end
+        while start < end:
+            flag = buf.find(0x7E, start, end)
+            if flag < 0:
+                start = end
+                break
+            start = flag
+            if end - start < 3:
+                break
+            format_hi = buf[start + 1]
+            if format_hi == 0x7E:  # consecutive flags
+                start += 1
+                continue
+            if format_hi & 0xF0 != 0xA0:  # not a frame format type 3 header
+                start += 1
+                continue
+            total = (((format_hi & 0x07) << 8) | buf[start + 2]) + 2
+            if end - start < total:
+                break
+            if buf[start + total - 1] != 0x7E:
+                start += 1
+                continue
+            self._rx_start = start
+            return start, start + total
+        self._rx_start = start
+        return None
+
+    def next_frame(self) -> Optional[memoryview]:
+        """Return the next complete raw frame (flags included), or ``None``."""
+
+        located = self._locate_frame()
+        if located is None:
+            return None
+        start, end = located
+        # Keep the closing flag: HDLC allows it to double as the next opening flag.
+        self._rx_start = end - 1
+        self.frames_received += 1
+        frame = self._rx_view[start:end]
+        if self.trace is not None:
+            self.trace("RX", frame)
+        return frame
+
+    def next_event(self) -> Optional[Union[FrameEvent, ApduEvent]]:
+        """Consume buffered frames until one yields an event.
+
+        Segments of a longer APDU are absorbed (acknowledging them with RR
+        whenever the meter hands the line over) and surface as one
+        :class:`ApduEvent`. Link-level violations raise ``RuntimeError``.
+        """
+
+        while True:
+            located = self._locate_frame()
+            if located is None:
+                return None
+            start, end = located
+            self._rx_start = end - 1
+            self.frames_received += 1
+            if self.trace is not None:
+                self.trace("RX", self._rx_view[start:end])
+            parsed = _parse_frame_view(self._rx_view, start, end)
+            if self.check_addresses and (
+                parsed.source != self.server_address or parsed.destination != self.client_address
+            ):
+                self.frames_foreign += 1
+                continue
+            frame_type = parsed.frame_type
+            if frame_type != "I" or not self.linked:
+                if frame_type == "S" and self.linked:
+                    if not parsed.is_valid or parsed.receive_sequence is None:
+                        raise RuntimeError("Checksum mismatch on RR frame")
+                    self._acknowledge(parsed.receive_sequence)
+                return FrameEvent(parsed)
+            if not parsed.is_valid:
+                raise RuntimeError("Checksum mismatch on I-frame response")
+            self._acknowledge(parsed.receive_sequence)
+            # V(R) is the next N(S) expected from the meter.
+            self._recv_seq = (parsed.send_sequence + 1) % 8
+            self.peer_final = bool(parsed.poll_final)
+            if parsed.segmented:
+                if self._segments is None:
+                    self._segments = bytearray()
+                    self._segments_nr = parsed.receive_sequence
+                self._segments += parsed.info_view
+                if parsed.poll_final:
+                    self.send_rr()
+                continue
+            if self._segments is not None:
+                self._segments += parsed.info_view
+                apdu = bytes(self._segments)
+                self._segments = None
+                return ApduEvent(apdu, self._segments_nr)
+            return ApduEvent(parsed.info_view, parsed.receive_sequence)
+
+    # ---- sequence numbers ------------------------------------------------
+    @property
+    def send_sequence(self) -> int:
+        return self._send_seq
+
+    @property
+    def outstanding_frames(self) -> int:
+        """Number of I-frames sent but not yet acknowledged by the meter."""
+
+        return (self._send_seq - self._ack_seq) % 8
+
+    def _acknowledge(self, receive_sequence: int) -> None:
+        """Apply the meter's N(R), which must fall within the outstanding frames."""
+
+        acked = (receive_sequence - self._ack_seq) % 8
+        if acked > self.outstanding_frames:
+            raise RuntimeError(
+                f"Unexpected receive sequence. Expected {self._send_seq}, got {receive_sequence}"
+            )
+        self._ack_seq = receive_sequence
+
+    def _i_control(self, poll: bool = True) -> int:
+        control = ((self._recv_seq & 0x07) << 5) | (0x10 if poll else 0) | ((self._send_seq & 0x07) << 1)
+        self._send_seq = (self._send_seq + 1) % 8
+        return control
+
+    # ---- output ----------------------------------------------------------
+    def send_snrm(self) -> None:
+        self._queue(
+            self.frame_cache.frame(
+                ("snrm", self.server_address, self.client_address, self.max_info_length, self.window_size),
+                self._build_snrm_frame,
+            )
+        )
+
+    def _build_snrm_frame(self) -> bytes:
+        if self.max_info_length is not None or self.window_size != HDLC_DEFAULT_WINDOW:
+            max_info = self.max_info_length or HDLC_DEFAULT_MAX_INFO
+            snrm_info = _build_snrm_info(max_info, max_info, self.window_size, self.window_size)
+        else:
+            snrm_info = b""
+        return _build_frame(0x93, self.server_address, self.client_address, snrm_info)
+
+    def accept_ua(self, event: Union[FrameEvent, ApduEvent]) -> None:
+        """Validate the UA answering SNRM and adopt its link parameters."""
+
+        ua = event.frame if isinstance(event, FrameEvent) else None
+        if ua is None or ua.frame_type != "U" or ua.control not in (0x73, 0x63):
+            raise RuntimeError("Unexpected response to SNRM")
+        if not ua.is_valid:
+            raise RuntimeError("UA frame failed CRC validation")
+        self._apply_ua_parameters(_parse_hdlc_parameters(ua.info))
+        self.reset_sequences()
+        self.linked = True
+
+    def _apply_ua_parameters(self, params: Dict[int, int]) -> None:
+        """Adopt the link parameters from the UA, never exceeding our proposal.
+
+        The UA lists the meter's own transmit/receive limits, so its receive
+        values bound what this client may send and vice versa. A meter that
+        answers with a smaller window (or none at all) drops the link back to
+        send-one, wait-one operation.
+        """
+
+        proposed_info = self.max_info_length or HDLC_DEFAULT_MAX_INFO
+        self.max_info_tx = min(proposed_info, params.get(HDLC_PARAM_MAX_INFO_RX, HDLC_DEFAULT_MAX_INFO))
+        self.max_info_rx = min(proposed_info, params.get(HDLC_PARAM_MAX_INFO_TX, HDLC_DEFAULT_MAX_INFO))
+        self.window_tx = max(1, min(self.window_size, params.get(HDLC_PARAM_WINDOW_RX, HDLC_DEFAULT_WINDOW)))
+        self.window_rx = max(1, min(self.window_size, params.get(HDLC_PARAM_WINDOW_TX, HDLC_DEFAULT_WINDOW)))
+
+    def send_aarq(self, password: bytes) -> None:
+        aarq = self.frame_cache.template(
+            ("aarq", self.server_address, self.client_address, password),
+            self.server_address,
+            self.client_address,
+            lambda: _build_aarq_apdu(password),
+        )
+        self._queue(aarq.render(self.frame_cache, self._i_control()))
+
+    def send_disc(self) -> None:
+        self.linked = False
+        self._queue(
+            self.frame_cache.frame(
+                ("disc", self.server_address, self.client_address),
+                lambda: _build_frame(0x53, self.server_address, self.client_address, b""),
+            )
+        )
+
+    def send_rr(self) -> None:
+        """Acknowledge received I-frames and ask the meter for the next segment."""
+
+        control = ((self._recv_seq & 0x07) << 5) | 0x11
+        self._queue(
+            self.frame_cache.frame(
+                ("rr", self.server_address, self.client_address, control),
+                lambda: _build_frame(control, self.server_address, self.client_address, b""),
+            )
+        )
+
+    def send_get(self, class_id: int, ln: bytes, attribute_id: int, invoke_id: int, poll: bool = True) -> None:
+        """Queue a GET.request-normal rendered from the cached frame template."""
+
+        template = self.frame_cache.template(
+            ("get", self.server_address, self.client_address, class_id, ln, attribute_id),
+            self.server_address,
+            self.client_address,
+            lambda: _build_get_apdu(0, class_id, ln, attribute_id),
+        )
+        self._queue(
+            template.render(self.frame_cache, self._i_control(poll), ((_GET_INVOKE_ID_OFFSET, invoke_id),))
+        )
+
+    def segment_apdu(self, apdu: bytes) -> List[bytes]:
+        """Split an APDU into information fields of at most ``max_info_tx`` bytes."""
+
+        size = self.max_info_tx
+        if len(apdu) <= size:
+            return [apdu]
+        return [apdu[offset : offset + size] for offset in range(0, len(apdu), size)]
+
+    def send_information(self, info: bytes, segmented: bool = False) -> None:
+        """Queue one I-frame; all but the last segment of an APDU set *segmented*."""
+
+        self._queue(
+            _build_frame(self._i_control(), self.server_address, self.client_address, info, segmented=segmented)
+        )
+
+
+# IEC 62056-47 wrapper header: version, source wPort, destination wPort and
+# APDU length, all 16-bit big endian.
+WRAPPER_VERSION = 0x0001
+WRAPPER_HEADER_SIZE = 8
+WRAPPER_MAX_APDU = 0xFFFF
+_WRAPPER_VERSION_BYTES = WRAPPER_VERSION.to_bytes(2, "big")
+_LLC_REQUEST = b"\xE6\xE6\x00"
+_LLC_RESPONSE = b"\xE6\xE7\x00"
+
+
+def _build_wrapper_frame(source: int, destination: int, apdu: Union[bytes, bytearray]) -> bytes:
+    """Prefix an APDU (without LLC header) with the wrapper header."""
+
+    if len(apdu) > WRAPPER_MAX_APDU:
+        raise ValueError("APDU too long for the wrapper length field")
+    return struct.pack(">HHHH", WRAPPER_VERSION, source, destination, len(apdu)) + apdu
+
+
+def _parse_wrapper_header(buffer: Union[bytes, bytearray, memoryview], start: int = 0) -> Tuple[int, int, int]:
+    """Return ``(source, destination, length)`` from a wrapper header."""
+
+    _version, source, destination, length = struct.unpack_from(">HHHH", buffer, start)
+    return source, destination, length
+
+
+class WrapperConnection(_ConnectionBase):
+    """xDLMS over the IEC 62056-47 TCP wrapper for one client/server pair.
+
+    Each APDU travels behind an 8-byte header instead of an HDLC frame: no
+    SNRM/UA/DISC, no checksums and no N(S)/N(R), as TCP already provides
+    ordering and integrity. The wPorts are the client SAP and the server's
+    logical device address.
+
+    The interface matches :class:`DlmsConnection` so the client flows run
+    unchanged: the LLC header is stripped from outgoing APDUs and an
+    ``E6 E7 00`` header is laid over the tail of the wrapper header of each
+    received APDU, sequence numbers stay at zero and APDUs are never
+    segmented. Without flags the stream cannot be resynchronised reliably;
+    after garbage, the next version word is taken as the start of a header.
+    """
+
+    transport = TRANSPORT_WRAPPER
+
+    def __init__(
+        self,
+        server_address: int,
+        client_address: int,
+        window_size: int = HDLC_DEFAULT_WINDOW,
+        frame_cache: Optional[FrameTemplateCache] = None,
+        trace: Optional[Callable[[str, Union[bytes, memoryview]], None]] = None,
+        check_addresses: bool = False,
+    ) -> None:
+        super().__init__(frame_cache, trace, check_addresses)
+        self.server_address = server_address
+        self.client_address = client_address
+        self.max_info_length: Optional[int] = None
+        # No link window either: *window_size* only caps the GETs pipelined
+        # before waiting for responses, as with HDLC.
+        self.window_size = self.window_tx = self.window_rx = window_size
+        self.max_info_tx = self.max_info_rx = WRAPPER_MAX_APDU
+        self.send_sequence = 0
+        self.outstanding_frames = 0
+        self.peer_final = False
+
+    # ---- input -----------------------------------------------------------
+    def _locate_frame(self) -> Optional[Tuple[int, int]]:
+        """Return the ``(start, end)`` offsets of the next complete wrapper frame."""
+
+        buf = self._rx_buf
+        start = self._rx_start
+        end = self._rx_end
+        while end - start >= 2:
+            if buf[start] != 0x00 or buf[start + 1] != 0x01:
+                found = buf.find(_WRAPPER_VERSION_BYTES, start + 1, end)
+                # Keep a trailing 0x00: it may start the next version word.
+                start = found if found >= 0 else end - 1 if buf[end - 1] == 0x00 else end
+                continue
+            if end - start < WRAPPER_HEADER_SIZE:
+                break
+            total = WRAPPER_HEADER_SIZE + ((buf[start + 6] << 8) | buf[start + 7])
+            if end - start < total:
+                break
+            self._rx_start = start
+            return start, start + total
+        self._rx_start = start
+        return None
+
+    def next_frame(self) -> Optional[memoryview]:
+        """Return the next complete raw wrapper frame (header included), or ``None``."""
+
+        located = self._locate_frame()
+        if located is None:
+            return None
+        start, end = located
+        self._rx_start = end
+        self.frames_received += 1
+        frame = self._rx_view[start:end]
+        if self.trace is not None:
+            self.trace("RX", frame)
+        return frame
+
+    def next_event(self) -> Optional[ApduEvent]:
+        while True:
+            frame = self.next_frame()
+            if frame is None:
+                return None
+            source, destination, length = _parse_wrapper_header(frame)
+            if self.check_addresses and (source != self.server_address or destination != self.client_address):
+                self.frames_foreign += 1
+                continue
+            if not length:
+                continue
+            # The destination wPort and length are no longer needed: reuse
+            # them as the LLC header the APDU parsers expect.
+            frame[5:WRAPPER_HEADER_SIZE] = _LLC_RESPONSE
+            return ApduEvent(frame[5:], 0)
+
+    # ---- output ----------------------------------------------------------
+    def _wrap(self, apdu: Union[bytes, bytearray]) -> bytes:
+        if apdu[:3] == _LLC_REQUEST:
+            apdu = apdu[3:]
+        return _build_wrapper_frame(self.client_address, self.server_address, apdu)
+
+    def send_aarq(self, password: bytes) -> None:
+        self._queue(
+            self.frame_cache.frame(
+                ("wrapper-aarq", self.server_address, self.client_address, password),
+                lambda: self._wrap(_build_aarq_apdu(password)),
+            )
+        )
+
+    def send_rr(self) -> None:
+        """Nothing to poll for: the meter sends whole APDUs unasked."""
+
+    def send_get(self, class_id: int, ln: bytes, attribute_id: int, invoke_id: int, poll: bool = True) -> None:
+        frame = bytearray(
+            self.frame_cache.frame(
+                ("wrapper-get", self.server_address, self.client_address, class_id, ln, attribute_id),
+                lambda: self._wrap(_build_get_apdu(0, class_id, ln, attribute_id)),
+            )
+        )
+        frame[WRAPPER_HEADER_SIZE + _GET_INVOKE_ID_OFFSET - len(_LLC_REQUEST)] = invoke_id
+        self._queue(frame)
+
+    def segment_apdu(self, apdu: bytes) -> List[bytes]:
+        return [apdu]
+
+    def send_information(self, info: bytes, segmented: bool = False) -> None:
+        self._queue(self._wrap(info))
+
+
+# ---------------------------------------------------------------------------
+# DLMS client implementation
+# ---------------------------------------------------------------------------
+
+
+# A flow is a generator implementing one exchange on top of DlmsConnection.
+# It yields the timeout for the next event (None for the client default) and
+# receives that event; drivers throw socket.timeout / ConnectionError into it
+# when no event arrives. The same flow thus runs over any transport.
+Flow = Generator[Optional[float], Union[FrameEvent, ApduEvent], Any]
+
+
+class _DLMSClientBase:
+    """Association state and the protocol flows shared by every driver.
+
+    Nothing here performs I/O: drivers implement ``_run`` to move the bytes of
+    :attr:`protocol` over their transport while stepping a flow.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        server_logical: int,
+        server_physical: int,
+        client_sap: int,
+        max_info_length: Optional[int],
+        password: bytes,
+        verbose: bool = False,
+        timeout: float = 5.0,
+        frame_cache: Optional[FrameTemplateCache] = None,
+        window_size: int = HDLC_DEFAULT_WINDOW,
+        scaler_cache: Optional[ScalerUnitCache] = None,
+        transport: str = TRANSPORT_HDLC,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.client_address = client_sap
+        self.password = password
+        self.verbose = verbose
+        self.timeout = timeout
+        self.transport = transport
+        self.protocol: Union[DlmsConnection, WrapperConnection]
+        if transport == TRANSPORT_WRAPPER:
+            # The wrapper addresses logical devices only; the destination
+            # wPort is the logical address and the physical one is unused.
+            self.server_address = server_logical
+            self.protocol = WrapperConnection(
+                server_logical,
+                client_sap,
+                window_size,
+                frame_cache,
+                trace=self._log_frame if verbose else None,
+            )
+        elif transport == TRANSPORT_HDLC:
+            self.server_address = _combine_server_address(server_logical, server_physical)
+            self.protocol = DlmsConnection(
+                self.server_address,
+                client_sap,
+                max_info_length,
+                window_size,
+                frame_cache,
+                trace=self._log_frame if verbose else None,
+            )
+        else:
+            raise ValueError(f"Unknown DLMS transport {transport!r}; expected one of {', '.join(TRANSPORTS)}")
+        self.frame_cache = self.protocol.frame_cache
+        self.scaler_cache = scaler_cache
+        self.serial_number: Optional[str] = None
+        self.firmware_version: Optional[str] = None
+        self._scaler_cache_bound = False  # per association
+
+        # xDLMS services granted in the AARE. ``supports_get_with_list`` stays
+        # None until the meter has told us, and flips to False if a
+        # GET-with-list is rejected despite the conformance bit.
+        self.negotiated_conformance: Optional[int] = None
+        self.server_max_pdu_size: Optional[int] = None
+        self.supports_get_with_list: Optional[bool] = None
+        self.get_list_batch_size = GET_WITH_LIST_BATCH_SIZE
+
+    # ---- logging helpers -------------------------------------------------
+    def _log(self, message: str) -> None:
+        if self.verbose:
+            now = time.strftime("%H:%M:%S")
+            print(f"[{now}] {message}")
+
+    def _log_frame(self, label: str, frame: Union[bytes, memoryview]) -> None:
+        if self.verbose:
+            hex_repr = " ".join(f"{byte:02X}" for byte in frame)
+            self._log(f"{label} {hex_repr}")
+
+    # ---- link state ------------------------------------------------------
+    @property
+    def max_info_length(self) -> Optional[int]:
+        return self.protocol.max_info_length
+
+    @property
+    def window_size(self) -> int:
+        return self.protocol.window_size
+
+    @property
+    def max_info_tx(self) -> int:
+        return self.protocol.max_info_tx
+
+    @property
+    def max_info_rx(self) -> int:
+        return self.protocol.max_info_rx
+
+    @property
+    def window_tx(self) -> int:
+        return self.protocol.window_tx
+
+    @property
+    def window_rx(self) -> int:
+        return self.protocol.window_rx
+
+    @property
+    def outstanding_frames(self) -> int:
+        """Number of I-frames sent but not yet acknowledged by the meter."""
+
+        return self.protocol.outstanding_frames
+
+    def reset_link_state(self) -> int:
+        """Resynchronise after a sequence error without re-associating.
+
+        Sequence numbers start over and unconsumed input is dropped; returns
+        the number of bytes discarded.
+        """
+
+        self.protocol.reset_sequences()
+        return self.protocol.clear_received()
+
+    # ---- association flows -----------------------------------------------
+    def _associate_flow(self, drain: bool = True) -> Flow:
+        protocol = self.protocol
+        protocol.reset()
+        self._scaler_cache_bound = False
+        if drain:
+            try:
+                while True:
+                    event = yield 0.2
+                    frame_type = event.frame.frame_type if isinstance(event, FrameEvent) else "I"
+                    self._log(f"Discarding unsolicited frame type {frame_type}")
+            except (socket.timeout, ConnectionError):
+                pass
+            protocol.clear_received()
+
+        # SNRM (the wrapper has no link layer to set up)
+        if protocol.transport == TRANSPORT_HDLC:
+            protocol.send_snrm()
+            protocol.accept_ua((yield None))
+            self._log(
+                f"HDLC link established (window tx={protocol.window_tx}/rx={protocol.window_rx}, "
+                f"max info tx={protocol.max_info_tx}/rx={protocol.max_info_rx})"
+            )
+
+        # AARQ
+        protocol.send_aarq(self.password)
+        self._accept_aare(bytes((yield from self._receive_apdu_flow("AARQ"))))
+
+    def _accept_aare(self, aare: bytes) -> None:
+        if not aare.startswith(b"\xE6\xE7\x00\x61"):
+            raise RuntimeError("Unexpected AARE payload")
+        result = None
+        info = aare[3:]
+        for idx in range(len(info) - 4):
+            if (
+                info[idx] == 0xA2
+                and info[idx + 1] == 0x03
+                and info[idx + 2] == 0x02
+                and info[idx + 3] == 0x01
+            ):
+                result = info[idx + 4]
+                break
+        if result is None:
+            raise RuntimeError("AARE payload missing association result")
+        if result != 0x00:
+            raise RuntimeError(f"Association rejected with result code 0x{result:02X}")
+        conformance, max_pdu = _parse_aare_conformance(aare)
+        self.negotiated_conformance = conformance
+        self.server_max_pdu_size = max_pdu
+        if conformance is not None:
+            self.supports_get_with_list = bool(conformance & CONFORMANCE_MULTIPLE_REFERENCES)
+            self._log(f"Negotiated conformance 0x{conformance:06X}, server max PDU {max_pdu}")
+        self._log("Application association established")
+
+    def _disconnect_flow(self) -> Flow:
+        if self.protocol.transport == TRANSPORT_WRAPPER:
+            # Closing the TCP connection releases a wrapper association.
+            return
+        self.protocol.send_disc()
+        try:
+            event = yield 2.0
+            if not isinstance(event, FrameEvent) or event.frame.control not in (0x73, 0x63):
+                self._log("Unexpected DISC response; ignoring")
+        except (socket.timeout, ConnectionError):
+            self._log("No UA response to DISC")
+
+    # ---- APDU flows ------------------------------------------------------
+    def _receive_apdu_flow(self, description: str) -> Flow:
+        """Receive the response to the single outstanding request, reassembled."""
+
+        event = yield None
+        if not isinstance(event, ApduEvent):
+            raise RuntimeError(f"Expected I-frame for {description}, got {event.frame.frame_type}")
+        if event.receive_sequence != self.protocol.send_sequence:
+            raise RuntimeError(
+                f"Unexpected receive sequence. Expected {self.protocol.send_sequence}, "
+                f"got {event.receive_sequence}"
+            )
+        return event.apdu
+
+    def _send_apdu_flow(self, apdu: bytes) -> Flow:
+        """Send an APDU, splitting it into segments above ``max_info_tx``.
+
+        Every segment but the last carries the segmentation bit and P=1; the
+        meter acknowledges each one with RR before the next is sent.
+        """
+
+        protocol = self.protocol
+        segments = protocol.segment_apdu(apdu)
+        for index, segment in enumerate(segments):
+            last = index == len(segments) - 1
+            protocol.send_information(segment, segmented=not last)
+            if not last:
+                event = yield None
+                if not isinstance(event, FrameEvent) or event.frame.frame_type != "S":
+                    raise RuntimeError("Expected RR while sending segmented APDU")
+
+    # ---- DLMS GET flows --------------------------------------------------
+    def _start_get_flow(
+        self, class_id: int, logical_name: bytes, attribute_id: int, access_selection: Optional[bytes] = None
+    ) -> Flow:
+        protocol = self.protocol
+        invoke_id = protocol.next_invoke_id()
+        if access_selection is None:
+            protocol.send_get(class_id, logical_name, attribute_id, invoke_id)
+        else:
+            yield from self._send_apdu_flow(
+                _build_get_apdu(invoke_id, class_id, logical_name, attribute_id, access_selection)
+            )
+        info = yield from self._receive_apdu_flow(f"GET attribute {attribute_id}")
+        return info, invoke_id
+
+    @staticmethod
+    def _datablock(
+        info: Union[memoryview, bytes], invoke_id: int, expected: Optional[int]
+    ) -> Tuple[bool, int, Union[memoryview, bytes]]:
+        """Return ``(last, block_number, raw)`` for one GET response.
+
+        A GET.response-normal counts as a single last block.
+        """
+
+        if expected is None and len(info) > 4 and info[4] != 0x02:
+            return True, 0, _extract_get_response_payload(info, invoke_id)
+        last_block, block_number, raw = _parse_get_datablock(info, invoke_id)
+        if expected is not None and block_number != expected:
+            raise RuntimeError(f"Unexpected GET block number {block_number}, expected {expected}")
+        return last_block, block_number, raw
+
+    def _next_block_flow(self, invoke_id: int, block_number: int) -> Flow:
+        """Acknowledge datablock *block_number* with GET.request-next."""
+
+        yield from self._send_apdu_flow(_build_get_next_apdu(invoke_id, block_number))
+        return (yield from self._receive_apdu_flow(f"GET block {block_number + 1}"))
+
+    def _get_data_flow(self, info: Union[memoryview, bytes], invoke_id: int) -> Flow:
+        """Return the data of a GET response, following datablocks."""
+
+        blocks: List[bytes] = []
+        expected: Optional[int] = None
+        while True:
+            last_block, block_number, raw = self._datablock(info, invoke_id, expected)
+            blocks.append(bytes(raw))
+            if last_block:
+                return b"".join(blocks)
+            info = yield from self._next_block_flow(invoke_id, block_number)
+            expected = block_number + 1
+
+    def _get_flow(
+        self, class_id: int, logical_name: bytes, attribute_id: int, access_selection: Optional[bytes] = None
+    ) -> Flow:
+        info, invoke_id = yield from self._start_get_flow(class_id, logical_name, attribute_id, access_selection)
+        return (yield from self._get_data_flow(info, invoke_id))
+
+    def _get_attributes_flow(self, requests: Sequence[Tuple[int, bytes, int]]) -> Flow:
+        """Issue several GET.requests, keeping up to ``window_tx`` of them in flight.
+
+        *requests* holds ``(class_id, logical_name, attribute_id)`` tuples. The
+        result list is in request order; an item whose GET.response carried an
+        error is returned as the exception instead of aborting the batch. Link
+        level problems (sequence, checksum, timeouts) still raise.
+
+        With a negotiated window of 1 this degrades to the plain sequential
+        request/response cycle.
+        """
+
+        protocol = self.protocol
+        results: List[Union[bytes, Exception]] = [b""] * len(requests)
+        if protocol.window_tx <= 1:
+            for index, (class_id, ln, attribute_id) in enumerate(requests):
+                try:
+                    results[index] = yield from self._get_flow(class_id, ln, attribute_id)
+                except DlmsAccessError as exc:
+                    results[index] = exc
+            return results
+
+        position = 0
+        while position < len(requests):
+            burst = requests[position : position + protocol.window_tx]
+            in_flight: Dict[int, int] = {}
+            # Responses that started a block transfer; continued once the burst is drained.
+            blocked: List[Tuple[int, int, bytes]] = []
+            for offset, (class_id, ln, attribute_id) in enumerate(burst):
+                invoke_id = protocol.next_invoke_id()
+                # Only the last frame of the burst carries P=1, handing the line to the meter.
+                protocol.send_get(class_id, ln, attribute_id, invoke_id, poll=offset == len(burst) - 1)
+                in_flight[invoke_id] = position + offset
+            while in_flight:
+                event = yield None
+                if isinstance(event, FrameEvent):
+                    if event.frame.frame_type == "S":
+                        continue
+                    raise RuntimeError(f"Expected I-frame for pipelined GET, got {event.frame.frame_type}")
+                info = event.apdu
+                invoke_id = info[5] if len(info) > 5 else -1
+                index = in_flight.pop(invoke_id, None)
+                if index is None:
+                    raise RuntimeError("Invoke-ID mismatch in GET response")
+                if len(info) > 4 and info[4] == 0x02:
+                    blocked.append((index, invoke_id, bytes(info)))
+                else:
+                    try:
+                        results[index] = _extract_get_response_payload(info, invoke_id)
+                    except RuntimeError as exc:
+                        results[index] = exc
+                if in_flight and protocol.peer_final:
+                    # The meter closed its window with responses still due; poll for the rest.
+                    protocol.send_rr()
+            if protocol.outstanding_frames:
+                raise RuntimeError(
+                    f"Unexpected receive sequence. Expected {protocol.send_sequence}, "
+                    f"got {(protocol.send_sequence - protocol.outstanding_frames) % 8}"
+                )
+            for index, invoke_id, info in blocked:
+                try:
+                    results[index] = yield from self._get_data_flow(info, invoke_id)
+                except DlmsAccessError as exc:
+                    results[index] = exc
+            position += len(burst)
+        return results
+
+    def _get_with_list_flow(self, requests: Sequence[Tuple[int, bytes, int]]) -> Flow:
+        """Read several attributes with GET.request-with-list.
+
+        Requests are sent in batches of ``get_list_batch_size`` references per
+        APDU; the response is demultiplexed back into request order, with
+        per-item data-access-results returned as :class:`DlmsAccessError`.
+        Raises :class:`DlmsServiceError` when the meter rejects the service.
+        """
+
+        results: List[Union[bytes, Exception]] = []
+        batch_size = max(1, self.get_list_batch_size)
+        for position in range(0, len(requests), batch_size):
+            batch = requests[position : position + batch_size]
+            invoke_id = self.protocol.next_invoke_id()
+            yield from self._send_apdu_flow(_build_get_with_list_apdu(invoke_id, batch))
+            info = yield from self._receive_apdu_flow("GET-with-list")
+            if len(info) > 4 and info[4] == 0x02:
+                raw = yield from self._get_data_flow(info, invoke_id)
+                results.extend(_split_get_data_results(raw, len(batch)))
+            else:
+                results.extend(_extract_get_with_list_payloads(info, invoke_id, len(batch)))
+        return results
+
+    def _get_many_flow(self, requests: Sequence[Tuple[int, bytes, int]]) -> Flow:
+        """Read several attributes using the cheapest service the meter supports.
+
+        GET-with-list is used when the association granted multiple-references
+        (or did not say); otherwise, or after the meter rejects it once, the
+        requests go through the (pipelined) single GETs.
+        """
+
+        if len(requests) > 1 and self.supports_get_with_list is not False:
+            try:
+                return (yield from self._get_with_list_flow(requests))
+            except DlmsServiceError as exc:
+                self._log(f"GET-with-list not supported, falling back to single GETs: {exc}")
+                self.supports_get_with_list = False
+        return (yield from self._get_attributes_flow(requests))
+
+    # ---- register flows --------------------------------------------------
+    def _decode_scaler_unit(self, scaler_payload: bytes) -> Tuple[int, int]:
+        scaler_structure, remaining = _parse_data(scaler_payload)
+        if remaining:
+            self._log("Warning: unused bytes after scaler/unit structure")
+        if not isinstance(scaler_structure, list) or len(scaler_structure) != 2:
+            raise RuntimeError("Unexpected scaler/unit structure")
+        scaler = scaler_structure[0]
+        unit_code = scaler_structure[1]
+        if not isinstance(scaler, int) or not isinstance(unit_code, int):
+            raise RuntimeError("Malformed scaler/unit contents")
+        return scaler, unit_code
+
+    def _decode_register_value(self, value_payload: bytes, scaler: int, unit_code: int) -> Tuple[RegisterValue, int, Any]:
+        value_raw, next_offset = decode_data(value_payload)
+        if next_offset != len(value_payload):
+            self._log("Warning: unused bytes after value payload")
+
+        if isinstance(value_raw, float):
+            # float32/float64 registers: scale in floating point, no exact form
+            return value_raw * 10.0 ** scaler, unit_code, value_raw
+        if not isinstance(value_raw, int):
+            raise RuntimeError("Received non-numeric register value")
+        return ScaledValue(int(value_raw), scaler), unit_code, value_raw
+
+    def _identify_flow(self) -> Flow:
+        requests = [(1, obis_to_bytes(SERIAL_NUMBER_OBIS), 2)]
+        requests.extend((1, obis_to_bytes(obis), 2) for obis in FIRMWARE_VERSION_OBIS)
+        payloads = yield from self._get_many_flow(requests)
+        texts: List[Optional[str]] = []
+        for payload in payloads:
+            try:
+                texts.append(None if isinstance(payload, Exception) else _identification_text(decode_data(payload)[0]))
+            except DlmsDataError:
+                texts.append(None)
+        self.serial_number = texts[0]
+        self.firmware_version = next((text for text in texts[1:] if text), None)
+        return self.serial_number, self.firmware_version
+
+    def _bind_scaler_cache_flow(self) -> Flow:
+        """Key the scaler/unit cache to this meter (once per association).
+
+        Meters without a readable serial number are keyed by their address.
+        Returns True when the driver must :meth:`ScalerUnitCache.load` it.
+        """
+
+        if self.scaler_cache is None or self._scaler_cache_bound:
+            return False
+        serial, firmware = yield from self._identify_flow()
+        identity = serial or f"{self.host}:{self.port}/{self.server_address}"
+        reload = self.scaler_cache.rekey(identity, firmware)
+        self._scaler_cache_bound = True
+        self._log(f"Scaler cache bound to {identity} (firmware {firmware})")
+        return reload
+
+    def _uses_scaler_cache(self, attribute: int, scaler_attribute: int) -> bool:
+        return self.scaler_cache is not None and attribute == 2 and scaler_attribute == 3
+
+    def _read_registers_flow(self, obis_codes: Sequence[str], attribute: int, scaler_attribute: int) -> Flow:
+        """Read several Register (class 3) objects, scaler/unit included.
+
+        Scalers already in :attr:`scaler_cache` are not requested again; the
+        remaining scaler and value GETs are issued through GET-with-list where
+        the meter supports it and share the negotiated window otherwise. Each
+        item is either ``(value, unit_code, raw_value)`` or the exception that
+        prevented reading that register. The driver binds the cache first and
+        flushes the scalers learned here to its store afterwards.
+        """
+
+        class_id = 3  # Register class
+        cache = self.scaler_cache if self._uses_scaler_cache(attribute, scaler_attribute) else None
+        cached: List[Optional[Tuple[int, int]]] = []
+        requests: List[Tuple[int, bytes, int]] = []
+        for obis in obis_codes:
+            logical_name = obis_to_bytes(obis)
+            entry = cache.get(obis) if cache is not None else None
+            cached.append(entry)
+            if entry is None:
+                requests.append((class_id, logical_name, scaler_attribute))
+            requests.append((class_id, logical_name, attribute))
+        payloads = iter((yield from self._get_many_flow(requests)))
+
+        results: List[Union[Tuple[RegisterValue, int, Any], Exception]] = []
+        learned: Dict[str, Tuple[int, int]] = {}
+        for obis, entry in zip(obis_codes, cached):
+            scaler_payload = next(payloads) if entry is None else None
+            value_payload = next(payloads)
+            if isinstance(scaler_payload, Exception):
+                results.append(scaler_payload)
+                continue
+            if isinstance(value_payload, Exception):
+                results.append(value_payload)
+                continue
+            try:
+                if entry is None:
+                    entry = self._decode_scaler_unit(scaler_payload)
+                    learned[obis] = entry
+                results.append(self._decode_register_value(value_payload, *entry))
+            except (RuntimeError, DlmsDataError) as exc:
+                results.append(exc)
+        if cache is not None and learned:
+            cache.put(learned)
+        return results
+
+
+class _BlockingDLMSClient(_DLMSClientBase):
+    """Public blocking API; subclasses supply the transport behind ``_run``."""
+
+    def _run(self, flow: Flow) -> Any:
+        """Step *flow* to completion, feeding it events from the transport."""
+
+        try:
+            timeout = next(flow)
+            while True:
+                try:
+                    event = self._next_event(timeout)
+                except (socket.timeout, ConnectionError) as exc:
+                    timeout = flow.throw(exc)
+                else:
+                    timeout = flow.send(event)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            flow.close()
+            self._flush()
+
+    def _flush(self) -> None:
+        raise NotImplementedError
+
+    def _next_event(self, timeout: Optional[float]) -> Union[FrameEvent, ApduEvent]:
+        raise NotImplementedError
+
+    # ---- DLMS GET --------------------------------------------------------
+    def get_attribute(
+        self,
+        class_id: int,
+        logical_name: bytes,
+        attribute_id: int,
+        access_selection: Optional[bytes] = None,
+    ) -> bytes:
+        """Read one attribute and return its encoded data, following datablocks."""
+
+        return self._run(self._get_flow(class_id, logical_name, attribute_id, access_selection))
+
+    def stream_attribute(
+        self,
+        class_id: int,
+        logical_name: bytes,
+        attribute_id: int,
+        access_selection: Optional[bytes] = None,
+    ) -> Iterator[Any]:
+        """Read an attribute and yield its decoded value as datablocks arrive.
+
+        Arrays and structures are yielded element by element, so large values
+        such as profile buffers or object lists never need to be held whole.
+        A scalar value is yielded once. The generator must be exhausted before
+        the client is used for another request.
+        """
+
+        info, invoke_id = self._run(self._start_get_flow(class_id, logical_name, attribute_id, access_selection))
+        decoder = IncrementalDataDecoder()
+        expected: Optional[int] = None
+        while True:
+            last_block, block_number, raw = self._datablock(info, invoke_id, expected)
+            yield from decoder.feed(raw)
+            if last_block:
+                break
+            info = self._run(self._next_block_flow(invoke_id, block_number))
+            expected = block_number + 1
+        decoder.finish()
+
+    def get_attributes(self, requests: Sequence[Tuple[int, bytes, int]]) -> List[Union[bytes, Exception]]:
+        return self._run(self._get_attributes_flow(requests))
+
+    def get_attributes_with_list(
+        self, requests: Sequence[Tuple[int, bytes, int]]
+    ) -> List[Union[bytes, Exception]]:
+        return self._run(self._get_with_list_flow(requests))
+
+    def get_many(self, requests: Sequence[Tuple[int, bytes, int]]) -> List[Union[bytes, Exception]]:
+        return self._run(self._get_many_flow(requests))
+
+    # ---- Public API ------------------------------------------------------
+    def read_register(self, obis: str, attribute: int = 2, scaler_attribute: int = 3) -> Tuple[RegisterValue, int, Any]:
+        result = self.read_registers([obis], attribute, scaler_attribute)[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def read_registers(
+        self, obis_codes: Sequence[str], attribute: int = 2, scaler_attribute: int = 3
+    ) -> List[Union[Tuple[RegisterValue, int, Any], Exception]]:
+        if not self._uses_scaler_cache(attribute, scaler_attribute):
+            return self._run(self._read_registers_flow(obis_codes, attribute, scaler_attribute))
+        self.bind_scaler_cache()
+        try:
+            return self._run(self._read_registers_flow(obis_codes, attribute, scaler_attribute))
+        finally:
+            self.scaler_cache.flush()
+
+    def identify(self) -> Tuple[Optional[str], Optional[str]]:
+        """Read the meter serial number and firmware version (one round trip)."""
+
+        return self._run(self._identify_flow())
+
+    def bind_scaler_cache(self) -> None:
+        if self._run(self._bind_scaler_cache_flow()):
+            self.scaler_cache.load()
+
+
+class DLMSClient(_BlockingDLMSClient):
+    """Blocking DLMS/COSEM client over a TCP socket."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._sock: Optional[socket.socket] = None
+        self._sock_timeout: Optional[float] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    # ---- socket helpers --------------------------------------------------
+    def _set_timeout(self, timeout: float) -> None:
+        if self._sock and timeout != self._sock_timeout:
+            self._sock.settimeout(timeout)
+            self._sock_timeout = timeout
+
+    def _flush(self) -> None:
+        data = self.protocol.data_to_send()
+        if data:
+            if not self._sock:
+                raise RuntimeError("Not connected")
+            self._sock.sendall(data)
+
+    def _fill_rx_buffer(self, timeout: Optional[float]) -> None:
+        if not self._sock:
+            raise RuntimeError("Not connected")
+        self._set_timeout(timeout if timeout is not None else self.timeout)
+        received = self._sock.recv_into(self.protocol.receive_buffer())
+        if not received:
+            raise ConnectionError("Socket closed while waiting for frame")
+        self.protocol.commit_received(received)
+
+    def _next_event(self, timeout: Optional[float]) -> Union[FrameEvent, ApduEvent]:
+        protocol = self.protocol
+        while True:
+            event = protocol.next_event()
+            # Also sends any RR the core queued while reassembling segments.
+            self._flush()
+            if event is not None:
+                return event
+            self._fill_rx_buffer(timeout)
+
+    def _read_frame(self, timeout: Optional[float] = None) -> bytes:
+        """Receive the next raw frame without interpreting it."""
+
+        while True:
+            frame = self.protocol.next_frame()
+            if frame is not None:
+                return bytes(frame)
+            self._fill_rx_buffer(timeout)
+
+    def pending_input(self, max_bytes: int = 512) -> int:
+        """Return how many received bytes are waiting, without consuming them.
+
+        Counts the unparsed tail of the receive buffer plus up to *max_bytes*
+        peeked from the socket.
+        """
+
+        if not self._sock:
+            return 0
+        pending = self.protocol.pending_input
+        try:
+            pending += len(self._sock.recv(max_bytes, socket.MSG_PEEK | socket.MSG_DONTWAIT))
+        except (BlockingIOError, InterruptedError):
+            pass
+        return pending
+
+    def discard_input(self, timeout: float = 0.03, max_bytes: int = 8192) -> int:
+        """Drop buffered and queued input; return the number of bytes discarded.
+
+        Used to resynchronise after errors without touching the socket timeout
+        the client tracks for its own reads.
+        """
+
+        if not self._sock:
+            return 0
+        discarded = self.protocol.clear_received()
+        self._set_timeout(timeout)
+        try:
+            while discarded < max_bytes:
+                received = self._sock.recv_into(self.protocol.receive_buffer())
+                if not received:
+                    break
+                discarded += received
+                self.protocol.clear_received()
+        except (socket.timeout, BlockingIOError):
+            pass
+        finally:
+            self.protocol.clear_received()
+            self._set_timeout(self.timeout)
+        return discarded
+
+    # ---- connectivity ----------------------------------------------------
+    def connect(self) -> None:
+        if self._sock:
+            return
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock_timeout = self.timeout
+        self._log(f"Connected to {self.host}:{self.port}")
+        self._run(self._associate_flow())
+
+    def abort(self, reset: bool = False) -> None:
+        """Drop the connection without DISC; *reset* sends a TCP RST instead of FIN.
+
+        A reset lets meters that keep one session per TCP connection release it
+        immediately.
+        """
+
+        sock, self._sock = self._sock, None
+        self._sock_timeout = None
+        self.protocol.reset()
+        if sock is None:
+            return
+        if reset:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            except OSError:
+                pass
+        sock.close()
+
+    def close(self) -> None:
         if not self._sock:
             return
-        self._sock.settimeout(0.2)
+        try:
+            self._run(self._disconnect_flow())
+        finally:
+            self.abort()
+            self._log("Connection closed")
+
+
+# ---------------------------------------------------------------------------
+# asyncio DLMS client
+# ---------------------------------------------------------------------------
+
+
+class AsyncDLMSClient(_DLMSClientBase):
+    """DLMS/COSEM client on asyncio streams.
+
+    Runs the same protocol flows as :class:`DLMSClient`, but every network
+    wait is a coroutine, so one event loop can hold thousands of meter
+    connections without a thread each. Timeouts apply per frame and
+    cancelling the calling task aborts a pending connect or read at once;
+    a cancelled association is torn down rather than left half open.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    # ---- stream helpers --------------------------------------------------
+    async def _run(self, flow: Flow) -> Any:
+        try:
+            timeout = next(flow)
+            while True:
+                try:
+                    event = await self._next_event(timeout)
+                except (socket.timeout, ConnectionError) as exc:
+                    timeout = flow.throw(exc)
+                else:
+                    timeout = flow.send(event)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            flow.close()
+
+    def _flush(self) -> None:
+        data = self.protocol.data_to_send()
+        if data:
+            if self._writer is None:
+                raise RuntimeError("Not connected")
+            self._writer.write(data)
+
+    async def _await_event(self) -> Union[FrameEvent, ApduEvent]:
+        protocol = self.protocol
+        while True:
+            event = protocol.next_event()
+            self._flush()
+            if event is not None:
+                return event
+            await self._writer.drain()
+            space = protocol.receive_buffer()
+            data = await self._reader.read(len(space))
+            if not data:
+                raise ConnectionError("Socket closed while waiting for frame")
+            space[: len(data)] = data
+            protocol.commit_received(len(data))
+
+    async def _next_event(self, timeout: Optional[float]) -> Union[FrameEvent, ApduEvent]:
+        if self._reader is None:
+            raise RuntimeError("Not connected")
+        event = self.protocol.next_event()
+        self._flush()
+        if event is not None:  # already buffered, no timer needed
+            return event
+        try:
+            return await asyncio.wait_for(self._await_event(), timeout if timeout is not None else self.timeout)
+        except asyncio.TimeoutError:
+            raise socket.timeout("timed out") from None
+
+    async def discard_input(self, timeout: float = 0.03, max_bytes: int = 8192) -> int:
+        """Drop buffered and queued input; return the number of bytes discarded."""
+
+        if self._reader is None:
+            return 0
+        discarded = self.protocol.clear_received()
+        try:
+            while discarded < max_bytes:
+                data = await asyncio.wait_for(self._reader.read(max_bytes - discarded), timeout)
+                if not data:
+                    break
+                discarded += len(data)
+        except asyncio.TimeoutError:
+            pass
+        return discarded
+
+    # ---- connectivity ----------------------------------------------------
+    async def connect(self) -> None:
+        if self._writer is not None:
+            return
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout
+            )
+        except asyncio.TimeoutError:
+            raise socket.timeout("timed out") from None
+        self._log(f"Connected to {self.host}:{self.port}")
+        try:
+            await self._run(self._associate_flow())
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self, reset: bool = False) -> None:
+        """Drop the connection without DISC; *reset* sends a TCP RST instead of FIN.
+
+        A reset lets meters that keep one session per TCP connection release it
+        immediately.
+        """
+
+        writer = self._writer
+        self._reader = self._writer = None
+        self.protocol.reset()
+        if writer is None:
+            return
+        if reset:
+            sock = writer.get_extra_info("socket")
+            if sock is not None:
+                try:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+                except OSError:
+                    pass
+            writer.transport.abort()
+        else:
+            writer.close()
+
+    async def close(self) -> None:
+        if self._writer is None:
+            return
+        writer = self._writer
+        try:
+            await self._run(self._disconnect_flow())
+        finally:
+            self.abort()
+            try:
+                await asyncio.wait_for(writer.wait_closed(), 2.0)
+            except (asyncio.TimeoutError, OSError):
+                pass
+            self._log("Connection closed")
+
+    # ---- DLMS GET --------------------------------------------------------
+    async def get_attribute(
+        self,
+        class_id: int,
+        logical_name: bytes,
+        attribute_id: int,
+        access_selection: Optional[bytes] = None,
+    ) -> bytes:
+        return await self._run(self._get_flow(class_id, logical_name, attribute_id, access_selection))
+
+    async def stream_attribute(
+        self,
+        class_id: int,
+        logical_name: bytes,
+        attribute_id: int,
+        access_selection: Optional[bytes] = None,
+    ) -> AsyncIterator[Any]:
+        info, invoke_id = await self._run(
+            self._start_get_flow(class_id, logical_name, attribute_id, access_selection)
+        )
+        decoder = IncrementalDataDecoder()
+        expected: Optional[int] = None
+        while True:
+            last_block, block_number, raw = self._datablock(info, invoke_id, expected)
+            for element in decoder.feed(raw):
+                yield element
+            if last_block:
+                break
+            info = await self._run(self._next_block_flow(invoke_id, block_number))
+            expected = block_number + 1
+        decoder.finish()
+
+    async def get_attributes(self, requests: Sequence[Tuple[int, bytes, int]]) -> List[Union[bytes, Exception]]:
+        return await self._run(self._get_attributes_flow(requests))
+
+    async def get_attributes_with_list(
+        self, requests: Sequence[Tuple[int, bytes, int]]
+    ) -> List[Union[bytes, Exception]]:
+        return await self._run(self._get_with_list_flow(requests))
+
+    async def get_many(self, requests: Sequence[Tuple[int, bytes, int]]) -> List[Union[bytes, Exception]]:
+        return await self._run(self._get_many_flow(requests))
+
+    # ---- Public API ------------------------------------------------------
+    async def read_register(
+        self, obis: str, attribute: int = 2, scaler_attribute: int = 3
+    ) -> Tuple[RegisterValue, int, Any]:
+        result = (await self.read_registers([obis], attribute, scaler_attribute))[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def read_registers(
+        self, obis_codes: Sequence[str], attribute: int = 2, scaler_attribute: int = 3
+    ) -> List[Union[Tuple[RegisterValue, int, Any], Exception]]:
+        if not self._uses_scaler_cache(attribute, scaler_attribute):
+            return await self._run(self._read_registers_flow(obis_codes, attribute, scaler_attribute))
+        await self.bind_scaler_cache()
+        try:
+            return await self._run(self._read_registers_flow(obis_codes, attribute, scaler_attribute))
+        finally:
+            if self.scaler_cache.dirty:
+                # The store is usually a database: keep its I/O off the event loop
+                await asyncio.to_thread(self.scaler_cache.flush)
+
+    async def identify(self) -> Tuple[Optional[str], Optional[str]]:
+        return await self._run(self._identify_flow())
+
+    async def bind_scaler_cache(self) -> None:
+        if await self._run(self._bind_scaler_cache_flow()):
+            await asyncio.to_thread(self.scaler_cache.load)
+
+
+# ---------------------------------------------------------------------------
+# Multi-drop concentrator links
+# ---------------------------------------------------------------------------
+
+
+class MultiDropLink:
+    """One TCP connection to a concentrator, shared by the meters behind it.
+
+    Several meters on one RS485 bus behind a serial-to-Ethernet converter
+    share a single port; one :class:`MultiDropDLMSClient` per meter attaches
+    here instead of opening its own socket. The bus is half duplex, so
+    sessions take turns: each protocol exchange (an association, a batch of
+    GETs, one datablock) holds the line exclusively and waiting sessions are
+    served first come, first served. Sequence numbers stay per session; only
+    the socket is shared.
+
+    A socket error resets the link for every session (they re-associate on
+    their next connect) so a concentrator restart costs one reconnect, not
+    one per meter.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 5.0) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.generation = 0  # bumped on every (re)connect; sessions compare it
+        self._sock: Optional[socket.socket] = None
+        self._sock_timeout: Optional[float] = None
+        self._turn = threading.Condition()
+        self._waiting: Deque[object] = deque()
+        self._busy = False
+        self.connects = 0
+        self.resets = 0
+        self.transactions = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def open(self) -> None:
+        """Connect to the concentrator unless already connected."""
+
+        with self._turn:
+            if self._sock is not None:
+                return
+            self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self._sock_timeout = self.timeout
+            self.generation += 1
+            self.connects += 1
+
+    def reset(self) -> None:
+        """Close the socket; every attached session must re-associate."""
+
+        sock, self._sock = self._sock, None
+        self._sock_timeout = None
+        if sock is not None:
+            self.resets += 1
+            self.generation += 1
+            sock.close()
+
+    close = reset
+
+    @contextmanager
+    def turn(self) -> Iterator[None]:
+        """Hold the line for one exchange, after every session queued earlier."""
+
+        ticket = object()
+        queued = time.monotonic()
+        with self._turn:
+            self._waiting.append(ticket)
+            while self._busy or self._waiting[0] is not ticket:
+                self._turn.wait()
+            self._waiting.popleft()
+            self._busy = True
+        waited = time.monotonic() - queued
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.transactions += 1
+        try:
+            yield
+        finally:
+            with self._turn:
+                self._busy = False
+                self._turn.notify_all()
+
+    def send(self, data: bytes) -> None:
+        if self._sock is None:
+            raise ConnectionError("Multi-drop link is not connected")
+        self._sock.sendall(data)
+
+    def recv_into(self, buffer: memoryview, timeout: Optional[float]) -> int:
+        if self._sock is None:
+            raise ConnectionError("Multi-drop link is not connected")
+        timeout = timeout if timeout is not None else self.timeout
+        if timeout != self._sock_timeout:
+            self._sock.settimeout(timeout)
+            self._sock_timeout = timeout
+        received = self._sock.recv_into(buffer)
+        if not received:
+            raise ConnectionError("Socket closed while waiting for frame")
+        return received
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "endpoint": f"{self.host}:{self.port}",
+            "connected": self.connected,
+            "connects": self.connects,
+            "resets": self.resets,
+            "transactions": self.transactions,
+            "avg_wait_ms": (self.wait_seconds / self.transactions * 1000) if self.transactions else None,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+        }
+
+
+class MultiDropDLMSClient(_BlockingDLMSClient):
+    """Blocking client for one meter behind a shared :class:`MultiDropLink`.
+
+    Takes the arguments of :class:`DLMSClient` from *server_logical* on.
+    Frames from other meters on the line are dropped by address, and
+    ``abort`` never touches the shared socket.
+    """
+
+    def __init__(self, link: MultiDropLink, *args: Any, **kwargs: Any) -> None:
+        super().__init__(link.host, link.port, *args, **kwargs)
+        self.link = link
+        self.protocol.check_addresses = True
+        self._generation: Optional[int] = None
+
+    @property
+    def connected(self) -> bool:
+        return self.link.connected and self._generation == self.link.generation
+
+    def _run(self, flow: Flow) -> Any:
+        with self.link.turn():
+            try:
+                return super()._run(flow)
+            except socket.timeout:
+                raise
+            except (ConnectionError, OSError):
+                self.link.reset()
+                raise
+
+    def _flush(self) -> None:
+        data = self.protocol.data_to_send()
+        if data:
+            self.link.send(data)
+
+    def _next_event(self, timeout: Optional[float]) -> Union[FrameEvent, ApduEvent]:
+        protocol = self.protocol
+        while True:
+            event = protocol.next_event()
+            self._flush()
+            if event is not None:
+                return event
+            protocol.commit_received(self.link.recv_into(protocol.receive_buffer(), timeout))
+
+    def discard_input(self, timeout: float = 0.03, max_bytes: int = 8192) -> int:
+        """Drop this session's unparsed input; the shared socket is left alone."""
+
+        return self.protocol.clear_received()
+
+    def connect(self) -> None:
+        if self.connected:
+            return
+        self.link.open()
+        # No initial drain: anything on the line may belong to another meter.
+        self._run(self._associate_flow(drain=False))
+        self._generation = self.link.generation
+        self._log(f"Associated with server {self.server_address} via {self.host}:{self.port}")
+
+    def abort(self, reset: bool = False) -> None:
+        """Forget the association. The shared link stays up, so *reset* is ignored."""
+
+        self._generation = None
+        self.protocol.reset()
+
+    def close(self) -> None:
+        if not self.connected:
+            self.abort()
+            return
+        try:
+            self._run(self._disconnect_flow())
+        finally:
+            self.abort()
+
+
+class AsyncMultiDropLink:
+    """asyncio counterpart of :class:`MultiDropLink`.
+
+    Turns are granted through an ``asyncio.Lock``, whose waiters are woken in
+    FIFO order, so meters on the same concentrator are served fairly.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 5.0) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.generation = 0
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self._turn = asyncio.Lock()
+        self._opening = asyncio.Lock()
+        self.connects = 0
+        self.resets = 0
+        self.transactions = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self.writer is not None
+
+    async def open(self) -> None:
+        async with self._opening:
+            if self.writer is not None:
+                return
+            try:
+                self.reader, self.writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout
+                )
+            except asyncio.TimeoutError:
+                raise socket.timeout("timed out") from None
+            self.generation += 1
+            self.connects += 1
+
+    def reset(self) -> None:
+        writer = self.writer
+        self.reader = self.writer = None
+        if writer is not None:
+            self.resets += 1
+            self.generation += 1
+            writer.close()
+
+    async def close(self) -> None:
+        writer = self.writer
+        self.reset()
+        if writer is not None:
+            try:
+                await asyncio.wait_for(writer.wait_closed(), 2.0)
+            except (asyncio.TimeoutError, OSError):
+                pass
+
+    @asynccontextmanager
+    async def turn(self) -> AsyncIterator[None]:
+        queued = time.monotonic()
+        async with self._turn:
+            waited = time.monotonic() - queued
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            self.transactions += 1
+            yield
+
+    stats = MultiDropLink.stats
+
+
+class AsyncMultiDropDLMSClient(AsyncDLMSClient):
+    """asyncio client for one meter behind a shared :class:`AsyncMultiDropLink`.
+
+    Takes the arguments of :class:`DLMSClient` from *server_logical* on.
+    """
+
+    def __init__(self, link: AsyncMultiDropLink, *args: Any, **kwargs: Any) -> None:
+        super().__init__(link.host, link.port, *args, **kwargs)
+        self.link = link
+        self.protocol.check_addresses = True
+        self._generation: Optional[int] = None
+
+    @property
+    def connected(self) -> bool:
+        return self.link.connected and self._generation == self.link.generation
+
+    async def _run(self, flow: Flow) -> Any:
+        async with self.link.turn():
+            if self.link.writer is None:
+                flow.close()
+                raise ConnectionError("Multi-drop link is not connected")
+            self._reader, self._writer = self.link.reader, self.link.writer
+            try:
+                return await super()._run(flow)
+            except socket.timeout:
+                raise
+            except (ConnectionError, OSError):
+                self.link.reset()
+                raise
+            finally:
+                self._reader = self._writer = None
+
+    async def discard_input(self, timeout: float = 0.03, max_bytes: int = 8192) -> int:
+        """Drop this session's unparsed input; the shared stream is left alone."""
+
+        return self.protocol.clear_received()
+
+    async def connect(self) -> None:
+        if self.connected:
+            return
+        await self.link.open()
+        try:
+            # No initial drain: anything on the line may belong to another meter.
+            await self._run(self._associate_flow(drain=False))
+        except BaseException:
+            self.abort()
+            raise
+        self._generation = self.link.generation
+        self._log(f"Associated with server {self.server_address} via {self.host}:{self.port}")
+
+    def abort(self, reset: bool = False) -> None:
+        """Forget the association. The shared link stays up, so *reset* is ignored."""
+
+        self._generation = None
+        self.protocol.reset()
+
+    async def close(self) -> None:
+        if not self.connected:
+            self.abort()
+            return
+        try:
+            await self._run(self._disconnect_flow())
+        finally:
+            self.abort()
+
+
+class MultiDropPool:
+    """Registry handing out one :class:`AsyncMultiDropLink` per concentrator endpoint."""
+
+    def __init__(self, timeout: float = 5.0) -> None:
+        self.timeout = timeout
+        self._links: Dict[Tuple[str, int], AsyncMultiDropLink] = {}
+
+    def link(self, host: str, port: int) -> AsyncMultiDropLink:
+        key = (host, port)
+        link = self._links.get(key)
+        if link is None:
+            link = self._links[key] = AsyncMultiDropLink(host, port, self.timeout)
+        return link
+
+    async def close(self) -> None:
+        links = list(self._links.values())
+        self._links.clear()
+        await asyncio.gather(*(link.close() for link in links), return_exceptions=True)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [link.stats() for link in self._links.values()]
+
+
+# ---------------------------------------------------------------------------
+# Push (DataNotification) reception
+# ---------------------------------------------------------------------------
+
+
+DATA_NOTIFICATION_TAG = 0x0F
+
+
+class DataNotification(NamedTuple):
+    """An xDLMS DataNotification pushed by a meter.
+
+    ``value`` is the decoded notification body, usually a structure holding
+    the push setup's object list in order. ``source`` is the HDLC server
+    address (or wrapper source wPort) the frame came from, when known.
+    """
+
+    invoke_id: int
+    timestamp: Optional[datetime]
+    value: Any
+    source: Optional[int] = None
+
+
+def parse_data_notification(apdu: Union[bytes, bytearray, memoryview]) -> DataNotification:
+    """Decode a DataNotification APDU, with or without the LLC header."""
+
+    view = memoryview(apdu)
+    offset = 3 if view[:2] == b"\xE6\xE7" else 0
+    if len(view) < offset + 6 or view[offset] != DATA_NOTIFICATION_TAG:
+        raise DlmsDataError("Not a DataNotification APDU")
+    invoke_id = int.from_bytes(view[offset + 1 : offset + 5], "big")
+    offset += 5
+    if view[offset] == 0x09:  # some meters send the date-time as a tagged octet-string
+        offset += 1
+        if offset >= len(view):
+            raise DlmsDataError("Truncated DataNotification date-time")
+    length = view[offset]
+    offset += 1
+    if offset + length > len(view):
+        raise DlmsDataError("Truncated DataNotification date-time")
+    timestamp = None
+    if length:
+        timestamp = _decode_date_time(bytes(view[offset : offset + length]))
+        offset += length
+    value, _end = decode_data(view, offset)
+    return DataNotification(invoke_id, timestamp, value)
+
+
+class PushReceiver:
+    """Turn an inbound HDLC or wrapper byte stream into :class:`DataNotification` records.
+
+    Sans-IO like :class:`DlmsConnection`: feed bytes to :meth:`receive_data`
+    and get back the notifications they completed. DataNotification is an
+    unconfirmed service, so nothing is ever sent back. The framing is taken
+    from the first byte (``7E`` opens an HDLC frame, ``00`` a wrapper
+    header). Segmented HDLC pushes are reassembled per source address; frames
+    with a bad checksum and APDUs that are not DataNotifications are counted
+    and skipped.
+    """
+
+    def __init__(self) -> None:
+        self._link: Optional[_ConnectionBase] = None
+        self._segments: Dict[int, bytearray] = {}
+        self.notifications = 0
+        self.errors = 0
+
+    @property
+    def transport(self) -> Optional[str]:
+        return self._link.transport if self._link is not None else None
+
+    def receive_data(self, data: Union[bytes, bytearray, memoryview]) -> List[DataNotification]:
+        if self._link is None:
+            if not len(data):
+                return []
+            self._link = WrapperConnection(0, 0) if data[0] == 0x00 else DlmsConnection(0, 0)
+        self._link.receive_data(data)
+        if self._link.transport == TRANSPORT_WRAPPER:
+            return self._wrapper_notifications()
+        return self._hdlc_notifications()
+
+    def _decode(self, info: Union[bytes, bytearray, memoryview], source: int) -> Optional[DataNotification]:
+        try:
+            notification = parse_data_notification(info)
+        except DlmsDataError:
+            self.errors += 1
+            return None
+        self.notifications += 1
+        return notification._replace(source=source)
+
+    def _wrapper_notifications(self) -> List[DataNotification]:
+        notifications: List[DataNotification] = []
+        while True:
+            raw = self._link.next_frame()
+            if raw is None:
+                return notifications
+            source, _destination, length = _parse_wrapper_header(raw)
+            if length:
+                notification = self._decode(raw[WRAPPER_HEADER_SIZE:], source)
+                if notification is not None:
+                    notifications.append(notification)
+
+    def _hdlc_notifications(self) -> List[DataNotification]:
+        notifications: List[DataNotification] = []
+        while True:
+            raw = self._link.next_frame()
+            if raw is None:
+                return notifications
+            try:
+                frame = _parse_frame_view(raw, 0, len(raw))
+            except ValueError:  # malformed frame (boundary, address, length)
+                self.errors += 1
+                continue
+            if not frame.is_valid:
+                self.errors += 1
+                continue
+            info = frame.info_view
+            if frame.frame_type == "S" or not len(info):
+                continue
+            if frame.segmented:
+                self._segments.setdefault(frame.source, bytearray()).extend(info)
+                continue
+            pending = self._segments.pop(frame.source, None)
+            if pending is not None:
+                pending += info
+                info = pending
+            notification = self._decode(info, frame.source)
+            if notification is not None:
+                notifications.append(notification)
+
+
+class DataNotificationServer:
+    """asyncio TCP server for meters that push DataNotifications.
+
+    Each inbound connection gets its own :class:`PushReceiver`; every
+    notification is passed to ``await handler(peer, notification)`` where
+    *peer* is the ``(host, port)`` of the meter. Connections idle for longer
+    than *idle_timeout* seconds are closed (``None`` keeps them open).
+    Exceptions raised by the handler are counted, not propagated, so one bad
+    notification does not drop the meter's session.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Tuple[str, int], DataNotification], Awaitable[None]],
+        host: str = "0.0.0.0",
+        port: int = 4059,
+        idle_timeout: Optional[float] = None,
+    ) -> None:
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self.sessions = 0
+        self.notifications = 0
+        self.decode_errors = 0
+        self.handler_errors = 0
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        if self.port == 0:
+            self.port = self._server.sockets[0].getsockname()[1]
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername")[:2]
+        receiver = PushReceiver()
+        self.sessions += 1
+        self._writers.add(writer)
         try:
             while True:
-                frame = self._read_frame(timeout=0.2)
-                parsed = _parse_frame(frame)
-                self._log(f"Discarding unsolicited frame type {parsed.frame_type}")
-        except (socket.timeout, ConnectionError):
+                data = await asyncio.wait_for(reader.read(RX_BUFFER_SIZE), self.idle_timeout)
+                if not data:
+                    break
+                errors = receiver.errors
+                for notification in receiver.receive_data(data):
+                    self.notifications += 1
+                    try:
+                        await self.handler(peer, notification)
+                    except Exception:
+                        self.handler_errors += 1
+                self.decode_errors += receiver.errors - errors
+        except (asyncio.TimeoutError, ConnectionError):
             pass
         finally:
-            self._sock.settimeout(self.timeout)
+            self._writers.discard(writer)
+            writer.close()
 
-    # ---- HDLC control ----------------------------------------------------
-    def _build_i_control(self, poll: bool = True) -> int:
-        pf = 1 if poll else 0
-        return (
-            ((self._recv_seq & 0x07) << 5)
-            | ((pf & 0x01) << 4)
-            | ((self._send_seq & 0x07) << 1)
-        )
+    async def close(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
 
-    def _increment_send_seq(self) -> None:
-        self._send_seq = (self._send_seq + 1) % 8
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "port": self.port,
+            "connections": len(self._writers),
+            "sessions": self.sessions,
+            "notifications": self.notifications,
+            "decode_errors": self.decode_errors,
+            "handler_errors": self.handler_errors,
+        }
 
-    def _expect_i_response(self, frame: bytes, description: str) -> ParsedFrame:
-        parsed = _parse_frame(frame)
-        if parsed.frame_type != "I":
-            raise RuntimeError(f"Expected I-frame for {description}, got {parsed.frame_type}")
-        if not parsed.is_valid:
-            raise RuntimeError(f"Checksum mismatch on {description} response")
-        if parsed.receive_sequence is None:
-            raise RuntimeError("Missing receive sequence number in response")
-        expected_nr = self._send_seq % 8
-        if parsed.receive_sequence != expected_nr:
-            raise RuntimeError(
-                f"Unexpected receive sequence. Expected {expected_nr}, got {parsed.receive_sequence}"
-            )
-        self._recv_seq = parsed.send_sequence if parsed.send_sequence is not None else 0
-        return parsed
 
-    # ---- connectivity ----------------------------------------------------
+# ---------------------------------------------------------------------------
+# Replay and simulator drivers
+# ---------------------------------------------------------------------------
+
+
+class ReplayDLMSClient(_BlockingDLMSClient):
+    """Run the protocol flows against recorded meter output.
+
+    *responses* are byte chunks in the order the meter sent them (for example
+    the RX lines of a verbose log); one chunk is fed each time the core needs
+    more input, and running out behaves like a read timeout. Everything the
+    client transmits is appended to :attr:`sent` for comparison with the
+    recorded TX side. Remaining arguments are those of :class:`DLMSClient`
+    from *server_logical* on.
+    """
+
+    def __init__(self, responses: Iterable[Union[bytes, bytearray]], *args: Any, **kwargs: Any) -> None:
+        super().__init__("replay", 0, *args, **kwargs)
+        self._responses = iter(responses)
+        self.sent: List[bytes] = []
+
+    def _flush(self) -> None:
+        data = self.protocol.data_to_send()
+        if data:
+            self.sent.append(data)
+
+    def _next_event(self, timeout: Optional[float]) -> Union[FrameEvent, ApduEvent]:
+        while True:
+            event = self.protocol.next_event()
+            self._flush()
+            if event is not None:
+                return event
+            # The line stays quiet until the client has transmitted, which is
+            # what the drain at the start of an association expects.
+            chunk = next(self._responses, None) if self.sent else None
+            if chunk is None:
+                raise socket.timeout("timed out")
+            self.protocol.receive_data(chunk)
+
     def connect(self) -> None:
-        if self._sock:
-            return
-        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
-        self._log(f"Connected to {self.host}:{self.port}")
-        self._drain_initial_frames()
+        self._run(self._associate_flow())
 
-        # SNRM
-        if self.max_info_length is not None:
-            snrm_info = _build_snrm_info(self.max_info_length, self.max_info_length)
-        else:
-            snrm_info = b""
-        snrm_frame = _build_frame(0x93, self.server_address, self.client_address, snrm_info)
-        self._send_frame(snrm_frame)
-        ua_frame = self._read_frame()
-        ua = _parse_frame(ua_frame)
-        if ua.frame_type != "U" or ua.control not in (0x73, 0x63):
-            raise RuntimeError("Unexpected response to SNRM")
-        if not ua.is_valid:
-            raise RuntimeError("UA frame failed CRC validation")
+    def close(self) -> None:
+        self._run(self._disconnect_flow())
+
+
+class MeterSimulator:
+    """Minimal in-process meter speaking HDLC (or the wrapper) and xDLMS GET.
+
+    Answers SNRM, AARQ, GET.request-normal and -with-list and DISC for the
+    attributes in *objects*, keyed by ``(class_id, logical_name, attribute_id)``
+    with A-XDR encoded values; unknown attributes return
+    object-undefined. Responses longer than the negotiated information field
+    are segmented, one frame per RR. Meant for the simulator driver, tests
+    and benchmarks, not for conformance testing.
+    """
+
+    _AARE_PREFIX = bytes.fromhex("E6E7006129A109060760857405080101A203020100A305A103020100BE10040E0800065F1F0400")
+
+    def __init__(
+        self,
+        objects: Dict[Tuple[int, bytes, int], bytes],
+        conformance: int = CONFORMANCE_MULTIPLE_REFERENCES | CONFORMANCE_SELECTIVE_ACCESS,
+        max_info: int = HDLC_DEFAULT_MAX_INFO,
+        max_pdu: int = 0x0400,
+        transport: str = TRANSPORT_HDLC,
+    ) -> None:
+        self.objects = objects
+        self.conformance = conformance
+        self.max_info = max_info
+        self.max_pdu = max_pdu
+        self.transport = transport
+        # Used only for framing input.
+        self._link = WrapperConnection(0, 0) if transport == TRANSPORT_WRAPPER else DlmsConnection(0, 0)
         self._send_seq = 0
         self._recv_seq = 0
-        self._log("HDLC link established")
+        self._pending: List[Tuple[bytes, bool]] = []
+        self._request = bytearray()
+        self._address = (0, 0)
+        self.requests = 0
 
-        # AARQ
-        aarq_info = _build_aarq_apdu(self.password)
-        aarq_frame = _build_frame(self._build_i_control(), self.server_address, self.client_address, aarq_info)
-        self._send_frame(aarq_frame)
-        self._increment_send_seq()
-        aare_frame = self._read_frame()
-        aare = self._expect_i_response(aare_frame, "AARQ")
-        if not aare.info.startswith(b"\xE6\xE7\x00\x61"):
-            raise RuntimeError("Unexpected AARE payload")
-        result = None
-        info = aare.info[3:]
-        for idx in range(len(info) - 4):
-            if (
-                info[idx] == 0xA2
-                and info[idx + 1] == 0x03
-                and info[idx + 2] == 0x02
-                and info[idx + 3] == 0x01
-            ):
-                result = info[idx + 4]
-                break
-        if result is None:
-            raise RuntimeError("AARE payload missing association result")
-        if result != 0x00:
-            raise RuntimeError(f"Association rejected with result code 0x{result:02X}")
-        self._log("Application association established")
+    def receive_data(self, data: bytes) -> bytes:
+        """Consume client bytes and return the meter's answer (possibly empty)."""
+
+        self._link.receive_data(data)
+        out = bytearray()
+        while True:
+            raw = self._link.next_frame()
+            if raw is None:
+                return bytes(out)
+            if self.transport == TRANSPORT_WRAPPER:
+                out += self._handle_wrapper(bytes(raw))
+            else:
+                out += self._handle(_parse_frame(bytes(raw)))
+
+    def _handle_wrapper(self, raw: bytes) -> bytes:
+        client, server, _length = _parse_wrapper_header(raw)
+        return _build_wrapper_frame(server, client, self._respond(raw[WRAPPER_HEADER_SIZE:]))
+
+    def _frame(self, control: int, info: bytes = b"", segmented: bool = False) -> bytes:
+        server, client = self._address
+        return _build_frame(control, client, server, info, segmented=segmented)
+
+    def _next_segment(self) -> bytes:
+        info, more = self._pending.pop(0)
+        control = (self._recv_seq << 5) | 0x10 | (self._send_seq << 1)
+        self._send_seq = (self._send_seq + 1) % 8
+        return self._frame(control, info, segmented=more)
+
+    def _handle(self, frame: ParsedFrame) -> bytes:
+        self._address = (frame.destination, frame.source)
+        if frame.frame_type == "U":
+            if frame.control == 0x93:  # SNRM
+                self._send_seq = self._recv_seq = 0
+                self._pending = []
+                return self._frame(0x73, _build_snrm_info(self.max_info, self.max_info))
+            if frame.control == 0x53:  # DISC
+                return self._frame(0x73)
+            return b""
+        if frame.frame_type == "S":
+            return self._next_segment() if self._pending else b""
+        self._recv_seq = (frame.send_sequence + 1) % 8
+        self._request += frame.info_view
+        if frame.segmented:
+            return self._frame((self._recv_seq << 5) | 0x11)
+        apdu = bytes(self._request)
+        self._request.clear()
+        response = b"\xE6\xE7\x00" + self._respond(apdu[3:])
+        size = self.max_info
+        chunks = [response[offset : offset + size] for offset in range(0, len(response), size)]
+        self._pending = [(chunk, index < len(chunks) - 1) for index, chunk in enumerate(chunks)]
+        return self._next_segment()
+
+    def _respond(self, apdu: bytes) -> bytes:
+        if apdu[0] == 0x60:
+            return (
+                self._AARE_PREFIX[3:]
+                + self.conformance.to_bytes(3, "big")
+                + self.max_pdu.to_bytes(2, "big")
+                + b"\x00\x07"
+            )
+        if apdu[:2] == b"\xC0\x01":
+            self.requests += 1
+            invoke_id = apdu[2]
+            data = self.objects.get((int.from_bytes(apdu[3:5], "big"), apdu[5:11], apdu[11]))
+            if data is None:
+                return bytes([0xC4, 0x01, invoke_id, 0x01, 0x04])
+            return bytes([0xC4, 0x01, invoke_id, 0x00]) + data
+        if apdu[:2] == b"\xC0\x03" and self.conformance & CONFORMANCE_MULTIPLE_REFERENCES:
+            self.requests += 1
+            invoke_id = apdu[2]
+            count, offset = _decode_axdr_length(apdu, 3)
+            items = bytearray()
+            for _ in range(count):
+                key = (int.from_bytes(apdu[offset : offset + 2], "big"), apdu[offset + 2 : offset + 8], apdu[offset + 8])
+                offset += 10  # class, logical name, attribute, no access selection
+                data = self.objects.get(key)
+                items += b"\x01\x04" if data is None else b"\x00" + data
+            return bytes([0xC4, 0x03, invoke_id]) + _encode_axdr_length(count) + items
+        return b"\x0E\x01"  # confirmedServiceError
+
+
+class SimulatedDLMSClient(_BlockingDLMSClient):
+    """Run the protocol flows against an in-process :class:`MeterSimulator`.
+
+    Remaining arguments are those of :class:`DLMSClient` from *server_logical* on.
+    """
+
+    def __init__(self, meter: MeterSimulator, *args: Any, **kwargs: Any) -> None:
+        super().__init__("simulator", 0, *args, **kwargs)
+        self.meter = meter
+
+    def _flush(self) -> None:
+        data = self.protocol.data_to_send()
+        if data:
+            answer = self.meter.receive_data(data)
+            if answer:
+                self.protocol.receive_data(answer)
+
+    def _next_event(self, timeout: Optional[float]) -> Union[FrameEvent, ApduEvent]:
+        while True:
+            event = self.protocol.next_event()
+            if event is not None:
+                return event
+            if not self.protocol.pending_output:
+                raise socket.timeout("timed out")
+            self._flush()
+
+    def connect(self) -> None:
+        self._run(self._associate_flow())
 
     def close(self) -> None:
-        if not self._sock:
-            return
-        try:
-            disc_frame = _build_frame(0x53, self.server_address, self.client_address, b"")
-            self._send_frame(disc_frame)
-            try:
-                ua_frame = self._read_frame(timeout=2.0)
-                ua = _parse_frame(ua_frame)
-                if ua.control not in (0x73, 0x63):
-                    self._log("Unexpected DISC response; ignoring")
-            except (socket.timeout, ConnectionError):
-                self._log("No UA response to DISC")
-        finally:
-            try:
-                self._sock.close()
-            finally:
-                self._sock = None
-                self._log("Connection closed")
+        self._run(self._disconnect_flow())
 
-    # ---- DLMS GET helper -------------------------------------------------
-    def _next_invoke_id(self) -> int:
-        value = self._invoke_id & 0xFF
-        self._invoke_id = (self._invoke_id + 1) % 0x100
-        if self._invoke_id == 0:
-            self._invoke_id = 1
-        return value
 
-    def _send_get_request(self, class_id: int, ln: bytes, attribute_id: int) -> bytes:
-        invoke_id = self._next_invoke_id()
-        apdu = _build_get_apdu(invoke_id, class_id, ln, attribute_id)
-        frame = _build_frame(self._build_i_control(), self.server_address, self.client_address, apdu)
-        self._send_frame(frame)
-        self._increment_send_seq()
-        response_frame = self._read_frame()
-        parsed = self._expect_i_response(response_frame, f"GET attribute {attribute_id}")
-        return _extract_get_response_payload(parsed.info, invoke_id)
+# ---------------------------------------------------------------------------
+# Profile Generic (class 7)
+# ---------------------------------------------------------------------------
+
+
+class CaptureObject(NamedTuple):
+    class_id: int
+    logical_name: bytes
+    attribute_id: int
+    data_index: int
+
+    @property
+    def obis(self) -> str:
+        return bytes_to_obis(self.logical_name)
+
+    @property
+    def key(self) -> str:
+        """Column name used in decoded rows (``obis`` or ``obis#attribute``)."""
+
+        if self.attribute_id == 2:
+            return self.obis
+        return f"{self.obis}#{self.attribute_id}"
+
+
+class _ProfileLayout:
+    """Capture objects of one profile plus what is needed to decode its rows."""
+
+    __slots__ = ("columns", "scalers", "capture_period", "clock_column")
+
+    def __init__(
+        self,
+        columns: List[CaptureObject],
+        scalers: Dict[int, Tuple[int, int]],
+        capture_period: Optional[int],
+    ) -> None:
+        self.columns = columns
+        self.scalers = scalers  # column index -> (scaler, unit_code)
+        self.capture_period = capture_period
+        self.clock_column = next(
+            (index for index, column in enumerate(columns) if column.class_id == 8 and column.attribute_id == 2),
+            None,
+        )
+
+
+class ProfileColumns:
+    """Column-oriented profile buffer: one array (or list) per capture object."""
+
+    __slots__ = ("columns", "row_count", "vectorized")
+
+    def __init__(self, columns: Dict[str, Any], row_count: int, vectorized: bool) -> None:
+        self.columns = columns
+        self.row_count = row_count
+        self.vectorized = vectorized
+
+    def keys(self) -> List[str]:
+        return list(self.columns)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.columns[key]
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def __repr__(self) -> str:  # pragma: no cover - debugging helper
+        return f"ProfileColumns(rows={self.row_count}, columns={self.keys()}, vectorized={self.vectorized})"
+
+
+class ProfileGenericReader:
+    """Read Profile Generic buffers such as load profiles and event logs.
+
+    The capture objects (attribute 3), capture period (attribute 4) and the
+    scaler/unit of every register column are fetched once per profile and
+    cached. Buffer reads then use selective access, either by time range
+    (range_descriptor) or by entry number (entry_descriptor), and rows are
+    decoded while the datablocks stream in.
+    """
+
+    CLASS_ID = 7
+
+    def __init__(self, client: DLMSClient) -> None:
+        self.client = client
+        self._layouts: Dict[bytes, _ProfileLayout] = {}
+
+    def clear(self) -> None:
+        self._layouts.clear()
+
+    def capture_objects(self, obis: str) -> List[CaptureObject]:
+        return list(self._layout(obis_to_bytes(obis)).columns)
+
+    def _layout(self, logical_name: bytes) -> _ProfileLayout:
+        layout = self._layouts.get(logical_name)
+        if layout is not None:
+            return layout
+        columns: List[CaptureObject] = []
+        for item in self.client.stream_attribute(self.CLASS_ID, logical_name, 3):
+            if not isinstance(item, list) or len(item) != 4:
+                raise RuntimeError("Unexpected capture object definition")
+            class_id, column_ln, attribute_id, data_index = item
+            columns.append(CaptureObject(class_id, bytes(column_ln), attribute_id, data_index))
+
+        # Scalers of register-like columns plus the capture period in one round trip.
+        scaled = [
+            index
+            for index, column in enumerate(columns)
+            if column.class_id in (3, 4) and column.attribute_id == 2
+        ]
+        requests = [(columns[index].class_id, columns[index].logical_name, 3) for index in scaled]
+        requests.append((self.CLASS_ID, logical_name, 4))
+        payloads = self.client.get_many(requests)
+
+        scalers: Dict[int, Tuple[int, int]] = {}
+        for index, payload in zip(scaled, payloads):
+            if isinstance(payload, Exception):
+                self.client._log(f"No scaler for {columns[index].key}: {payload}")
+                continue
+            scalers[index] = self.client._decode_scaler_unit(payload)
+        capture_period: Optional[int] = None
+        if not isinstance(payloads[-1], Exception):
+            period = _parse_data(payloads[-1])[0]
+            capture_period = period if isinstance(period, int) and period > 0 else None
+
+        layout = _ProfileLayout(columns, scalers, capture_period)
+        self._layouts[logical_name] = layout
+        return layout
+
+    def read(
+        self,
+        obis: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        from_entry: Optional[int] = None,
+        to_entry: int = 0,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield buffer rows as ``{column_key: value}`` dicts.
+
+        Pass *start*/*end* to select by time, *from_entry*/*to_entry* (1-based,
+        ``0`` = last) to select by entry number, or neither for the whole
+        buffer. Register columns are scaled, clock columns decoded to
+        ``datetime``; omitted timestamps are filled in from the capture period.
+        """
 
-    # ---- Public API ------------------------------------------------------
-    def read_register(self, obis: str, attribute: int = 2, scaler_attribute: int = 3) -> Tuple[Decimal, int, Any]:
         logical_name = obis_to_bytes(obis)
-        class_id = 3  # Register class
+        layout = self._layout(logical_name)
+        access = self._access_selection(layout, start, end, from_entry, to_entry)
 
-        scaler_payload = self._send_get_request(class_id, logical_name, scaler_attribute)
-        scaler_structure, remaining = _parse_data(scaler_payload)
-        if remaining:
-            self._log("Warning: unused bytes after scaler/unit structure")
-        if not isinstance(scaler_structure, list) or len(scaler_structure) != 2:
-            raise RuntimeError("Unexpected scaler/unit structure")
-        scaler = scaler_structure[0]
-        unit_code = scaler_structure[1]
-        if not isinstance(scaler, int) or not isinstance(unit_code, int):
-            raise RuntimeError("Malformed scaler/unit contents")
+        previous: Optional[datetime] = None
+        for entry in self.client.stream_attribute(self.CLASS_ID, logical_name, 2, access):
+            row = self._decode_row(layout, entry, previous)
+            if layout.clock_column is not None:
+                previous = row.get(layout.columns[layout.clock_column].key)
+            yield row
 
-        value_payload = self._send_get_request(class_id, logical_name, attribute)
-        value_raw, remaining = _parse_data(value_payload)
-        if remaining:
-            self._log("Warning: unused bytes after value payload")
+    def read_columns(
+        self,
+        obis: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        from_entry: Optional[int] = None,
+        to_entry: int = 0,
+    ) -> "ProfileColumns":
+        """Read buffer entries column-wise (same selection arguments as :meth:`read`).
 
-        if isinstance(value_raw, (bytes, str)):
-            raise RuntimeError("Received non-numeric register value")
-        value = Decimal(value_raw) * (Decimal(10) ** scaler)
-        return value, unit_code, value_raw
+        Homogeneous buffers are decoded straight into one NumPy array (or
+        ``array.array``) per capture object and register columns are scaled
+        with a single multiply per column, as floats. Clock columns become
+        ``datetime64[s]`` arrays (UTC) with NumPy. Buffers with omitted timestamps
+        fall back to row-wise decoding with the gaps filled in.
+        """
+
+        logical_name = obis_to_bytes(obis)
+        layout = self._layout(logical_name)
+        access = self._access_selection(layout, start, end, from_entry, to_entry)
+        raw = self.client.get_attribute(self.CLASS_ID, logical_name, 2, access)
+        columns, vectorized = decode_columns(raw)
+        if columns and len(columns) != len(layout.columns):
+            raise RuntimeError("Profile entry does not match the capture objects")
+        if not columns:
+            columns = [[] for _ in layout.columns]
+
+        decoded: Dict[str, Any] = {}
+        for index, (capture, column) in enumerate(zip(layout.columns, columns)):
+            if index == layout.clock_column:
+                column = _date_time_column(column)
+                if not vectorized and layout.capture_period:
+                    previous: Optional[datetime] = None
+                    for row, value in enumerate(column):
+                        if value is None and previous is not None:
+                            column[row] = previous + timedelta(seconds=layout.capture_period)
+                        previous = column[row]
+            elif index in layout.scalers:
+                column = _scale_column(column, layout.scalers[index][0])
+            decoded[capture.key] = column
+        return ProfileColumns(decoded, len(columns[0]) if columns else 0, vectorized)
+
+    def _access_selection(
+        self,
+        layout: _ProfileLayout,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        from_entry: Optional[int],
+        to_entry: int,
+    ) -> Optional[bytes]:
+        if start is not None or end is not None:
+            if start is None or end is None:
+                raise ValueError("Both start and end are required for a time range read")
+            restricting = (8, CLOCK_LOGICAL_NAME, 2, 0)
+            if layout.clock_column is not None:
+                column = layout.columns[layout.clock_column]
+                restricting = (column.class_id, column.logical_name, column.attribute_id, column.data_index)
+            return _build_range_descriptor(start, end, restricting)
+        if from_entry is not None:
+            return _build_entry_descriptor(from_entry, to_entry)
+        return None
+
+    def _decode_row(self, layout: _ProfileLayout, entry: Any, previous: Optional[datetime]) -> Dict[str, Any]:
+        if not isinstance(entry, list) or len(entry) != len(layout.columns):
+            raise RuntimeError("Profile entry does not match the capture objects")
+        row: Dict[str, Any] = {}
+        for index, (column, value) in enumerate(zip(layout.columns, entry)):
+            if index == layout.clock_column:
+                if isinstance(value, bytes):
+                    value = _decode_date_time(value)
+                elif value is None and previous is not None and layout.capture_period:
+                    value = previous + timedelta(seconds=layout.capture_period)
+            elif index in layout.scalers and isinstance(value, int):
+                scaler, _unit = layout.scalers[index]
+                value = ScaledValue(value, scaler)
+            row[column.key] = value
+        return row
 
 
 # ---------------------------------------------------------------------------
@@ -685,8 +4125,10 @@ def obis_to_bytes(obis: str) -> bytes:
     try:
         a_str, b_str = first.split("-")
         cde_part, *f_part = rest.split("*")
-        c_str, d_str, e_str = cde_part.split(".")
-        f_str = f_part[0] if f_part else "255"
+        c_str, d_str, e_str, *f_dotted = cde_part.split(".")
+        if len(f_dotted) > 1 or (f_dotted and f_part):
+            raise ValueError("too many OBIS fields")
+        f_str = f_part[0] if f_part else (f_dotted[0] if f_dotted else "255")
         a = int(a_str)
         b = int(b_str)
         c = int(c_str)
@@ -702,6 +4144,15 @@ def obis_to_bytes(obis: str) -> bytes:
     return bytes([a, b, c, d, e, f])
 
 
+def bytes_to_obis(logical_name: bytes) -> str:
+    if len(logical_name) != 6:
+        raise ValueError("Logical name must consist of 6 bytes")
+    a, b, c, d, e, f = logical_name
+    if f == 255:
+        return f"{a}-{b}:{c}.{d}.{e}"
+    return f"{a}-{b}:{c}.{d}.{e}.{f}"
+
+
 # ---------------------------------------------------------------------------
 # CLI
 # ---------------------------------------------------------------------------
@@ -773,15 +4224,53 @@ def _parse_args(argv: Optional[Iterable[str]] = None) -> argparse.Namespace:
         default="22222222",
         help="Authentication password (1-16 ASCII chars, default: 22222222)",
     )
+    parser.add_argument(
+        "--transport",
+        choices=TRANSPORTS,
+        default=TRANSPORT_HDLC,
+        help="Link layer: HDLC frames or the IEC 62056-47 wrapper (default: hdlc)",
+    )
     parser.add_argument(
         "--max-info-length",
         type=lambda x: int(x, 0),
         default=None,
         help="Maximum HDLC information field length. Omit to send a minimal SNRM",
     )
+    parser.add_argument(
+        "--window-size",
+        type=int,
+        default=1,
+        help="HDLC window size to negotiate (1..7, default: 1). Meters may negotiate it down",
+    )
+    parser.add_argument(
+        "--profile",
+        help="Read a Profile Generic buffer instead of registers (e.g. 1-0:99.1.0.255)",
+    )
+    parser.add_argument(
+        "--from",
+        dest="profile_from",
+        type=datetime.fromisoformat,
+        help="Profile range start, ISO format (meter local time unless an offset is given)",
+    )
+    parser.add_argument(
+        "--to",
+        dest="profile_to",
+        type=datetime.fromisoformat,
+        help="Profile range end, ISO format",
+    )
+    parser.add_argument(
+        "--from-entry",
+        type=int,
+        default=None,
+        help="First profile entry to read (1-based). Ignored when --from/--to are given",
+    )
+    parser.add_argument("--to-entry", type=int, default=0, help="Last profile entry to read (0 = newest)")
     parser.add_argument("--timeout", type=float, default=5.0, help="Socket timeout seconds")
     parser.add_argument("--verbose", action="store_true", help="Print frame-level logs")
-    return parser.parse_args(argv)
+    args = parser.parse_args(argv)
+    if (args.profile_from is None) != (args.profile_to is None):
+        parser.error("--from and --to must be given together")
+    return args
 
 
 def main(argv: Optional[Iterable[str]] = None) -> int:
@@ -804,15 +4293,35 @@ def main(argv: Optional[Iterable[str]] = None) -> int:
         password=password_bytes,
         verbose=args.verbose,
         timeout=args.timeout,
+        window_size=args.window_size,
+        transport=args.transport,
     )
 
     try:
         client.connect()
-        for key in args.measurements:
+        if args.profile:
+            reader = ProfileGenericReader(client)
+            columns = reader.capture_objects(args.profile)
+            print(" | ".join(column.key for column in columns))
+            rows = reader.read(
+                args.profile,
+                start=args.profile_from,
+                end=args.profile_to,
+                from_entry=args.from_entry,
+                to_entry=args.to_entry,
+            )
+            for row in rows:
+                print(" | ".join(str(value) for value in row.values()))
+            client.close()
+            return 0
+        results = client.read_registers([MEASUREMENTS[key]["obis"] for key in args.measurements])
+        for key, result in zip(args.measurements, results):
             measurement = MEASUREMENTS[key]
             preferred_unit = measurement.get("preferred_unit")
             obis = measurement["obis"]
-            value, unit_code, raw_value = client.read_register(obis)
+            if isinstance(result, Exception):
+                raise result
+            value, unit_code, raw_value = result
             display_unit, reported_unit = _resolve_unit_label(unit_code, preferred_unit)
             if reported_unit is not None:
                 warning = (
@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 """
-Cliente MQTT para ThingsBoard con reconexión automática y buffer offline.
+Cliente MQTT para ThingsBoard con reconexión automática y cola persistente en disco.
 
 Características:
 - Reconexión automática con backoff exponencial
-- Buffer de mensajes offline (cola)
+- Cola persistente en disco (store-and-forward) con drenado a ritmo controlado
 - Formato de telemetría ThingsBoard
 - Logging detallado
 - Métricas de conexión y envío
@@ -12,12 +12,14 @@ Características:
 
 import json
 import logging
+import os
 import time
 from typing import Dict, Optional, List, Callable
 from queue import Queue, Empty
-from collections import deque
 import paho.mqtt.client as mqtt
 
+from telemetry_spool import DiskQueue, SpoolForwarder
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,7 +32,9 @@ class ThingsBoardMQTTClient:
         port: int = 1883,
         access_token: str = "",
         client_id: str = "dlms_bridge",
-        max_offline_messages: int = 1000,
+        spool_dir: Optional[str] = None,
+        spool_max_bytes: int = 64 * 1024 * 1024,
+        drain_rate: float = 50.0,
         reconnect_delay_base: float = 1.0,
         reconnect_delay_max: float = 60.0
     ):
@@ -42,7 +46,10 @@ class ThingsBoardMQTTClient:
             port: Puerto MQTT (default: 1883, TLS: 8883)
             access_token: Token de acceso del dispositivo en ThingsBoard
             client_id: ID del cliente MQTT
-            max_offline_messages: Máximo de mensajes en buffer offline
+            spool_dir: Directorio de la cola en disco (default: data/spool/<client_id>);
+                pasar uno estable por medidor si client_id cambia entre reinicios
+            spool_max_bytes: Tamaño máximo de la cola en disco (bytes)
+            drain_rate: Mensajes/s al vaciar la cola tras reconectar
             reconnect_delay_base: Delay base para reconexión (segundos)
             reconnect_delay_max: Delay máximo para reconexión (segundos)
         """
@@ -51,10 +58,6 @@ class ThingsBoardMQTTClient:
         self.access_token = access_token
         self.client_id = client_id
         
-        # Buffer offline
-        self.max_offline_messages = max_offline_messages
-        self.offline_buffer: deque = deque(maxlen=max_offline_messages)
-        
         # Reconexión
         self.reconnect_delay_base = reconnect_delay_base
         self.reconnect_delay_max = reconnect_delay_max
@@ -67,7 +70,7 @@ class ThingsBoardMQTTClient:
         # Métricas
         self.messages_sent = 0
         self.messages_failed = 0
-        self.messages_buffered = 0
+        self.messages_enqueued = 0  # total encolado desde el arranque (monótono)
         self.reconnect_count = 0
         
         # Cliente MQTT
@@ -85,6 +88,13 @@ class ThingsBoardMQTTClient:
         self.client.on_disconnect = self._on_disconnect
         self.client.on_publish = self._on_publish
         
+        # Cola en disco: toda la telemetría pasa por ella, conectado o no
+        self.spool = DiskQueue(
+            spool_dir or os.path.join("data", "spool", self.client_id),
+            max_bytes=spool_max_bytes
+        )
+        self.forwarder = SpoolForwarder(self.spool, self.client, rate=drain_rate, name=self.client_id)
+        
         # Topics de ThingsBoard
         self.telemetry_topic = "v1/devices/me/telemetry"
         self.attributes_topic = "v1/devices/me/attributes"
@@ -98,8 +108,8 @@ class ThingsBoardMQTTClient:
             self.reconnect_delay = self.reconnect_delay_base
             logger.info(f"✓ Conectado a MQTT broker: {self.host}:{self.port}")
             
-            # Enviar mensajes buffered
-            self._flush_offline_buffer()
+            # Reanudar el envío de la cola en disco
+            self.forwarder.on_connect()
         else:
             self.connected = False
             error_messages = {
@@ -115,6 +125,7 @@ class ThingsBoardMQTTClient:
     def _on_disconnect(self, client, userdata, rc):
         """Callback cuando se desconecta del broker."""
         self.connected = False
+        self.forwarder.on_disconnect()
         
         if rc != 0:
             logger.warning(f"⚠ Desconectado inesperadamente (code: {rc})")
@@ -124,6 +135,7 @@ class ThingsBoardMQTTClient:
     
     def _on_publish(self, client, userdata, mid):
         """Callback cuando se publica un mensaje."""
+        self.forwarder.on_publish(mid)
         self.messages_sent += 1
         self.last_publish_time = time.time()
     
@@ -144,7 +156,10 @@ class ThingsBoardMQTTClient:
         
         try:
             logger.info(f"Conectando a {self.host}:{self.port}...")
-            self.client.connect(self.host, self.port, keepalive=60)
+            self.forwarder.start()
+            # connect_async + loop_start: si el broker no responde, paho sigue reconectando
+            # en segundo plano y on_connect reanuda el vaciado de la cola
+            self.client.connect_async(self.host, self.port, keepalive=60)
             self.client.loop_start()
             
             # Esperar conexión
@@ -164,13 +179,15 @@ class ThingsBoardMQTTClient:
     
     def disconnect(self):
         """Desconecta del broker MQTT."""
-        # ✅ PROTECCIÓN: Si ya está desconectado, retornar inmediatamente
-        if not self.connected:
-            logger.debug("Ya desconectado de MQTT broker")
-            return
-        
         try:
+            # Espera los PUBACK pendientes y persiste la posición de la cola
+            self.forwarder.stop()
+            # El loop puede estar reconectando aunque nunca llegara a conectar
             self.client.loop_stop()
+            # ✅ PROTECCIÓN: Si ya está desconectado, no enviar DISCONNECT
+            if not self.connected:
+                logger.debug("Ya desconectado de MQTT broker")
+                return
             self.client.disconnect()
             logger.info("Desconectado de MQTT broker")
         except Exception as e:
@@ -185,7 +202,8 @@ class ThingsBoardMQTTClient:
             timestamp: Timestamp en milisegundos (opcional, usa tiempo actual si no se provee)
             
         Returns:
-            True si se publicó o bufferó exitosamente, False en caso contrario
+            True si quedó en la cola en disco (se envía en cuanto haya
+            conexión), False en caso contrario
             
         Ejemplo:
             data = {
@@ -209,26 +227,12 @@ class ThingsBoardMQTTClient:
             
             payload_json = json.dumps(payload)
             
-            # Si está conectado, publicar
-            if self.connected:
-                result = self.client.publish(
-                    self.telemetry_topic,
-                    payload_json,
-                    qos=1  # At least once
-                )
-                
-                if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                    logger.debug(f"📤 Telemetría publicada: {len(data)} campos")
-                    return True
-                else:
-                    logger.warning(f"⚠ Error publicando (rc={result.rc}), buffeando...")
-                    self._buffer_message(payload_json)
-                    return False
-            else:
-                # Si no está conectado, buffear
-                logger.debug("⚠ Sin conexión MQTT, buffeando mensaje...")
-                self._buffer_message(payload_json)
-                return False
+            # Escribir en la cola en disco; el forwarder publica (QoS 1) cuando hay conexión
+            self.spool.append(self.telemetry_topic, payload_json)
+            self.forwarder.notify()
+            self.messages_enqueued += 1
+            logger.debug(f"📤 Telemetría encolada: {len(data)} campos")
+            return True
                 
         except Exception as e:
             logger.error(f"Error publicando telemetría: {e}")
@@ -289,62 +293,16 @@ class ThingsBoardMQTTClient:
             logger.error(f"Error publicando attributes: {e}")
             return False
     
-    def _buffer_message(self, message: str):
-        """Agrega mensaje al buffer offline."""
-        self.offline_buffer.append(message)
-        self.messages_buffered += 1
-        
-        if len(self.offline_buffer) >= self.max_offline_messages:
-            logger.warning(f"⚠ Buffer offline lleno ({self.max_offline_messages} mensajes)")
-    
-    def _flush_offline_buffer(self):
-        """Envía mensajes del buffer offline cuando se reconecta."""
-        if not self.offline_buffer:
-            return
-        
-        logger.info(f"📤 Enviando {len(self.offline_buffer)} mensajes del buffer offline...")
-        
-        messages_sent = 0
-        messages_failed = 0
-        
-        while self.offline_buffer and self.connected:
-            try:
-                message = self.offline_buffer.popleft()
-                result = self.client.publish(
-                    self.telemetry_topic,
-                    message,
-                    qos=1
-                )
-                
-                if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                    messages_sent += 1
-                else:
-                    # Regresar al buffer si falla
-                    self.offline_buffer.appendleft(message)
-                    messages_failed += 1
-                    break
-                
-                # Pequeña pausa para no saturar
-                time.sleep(0.01)
-                
-            except Exception as e:
-                logger.error(f"Error enviando mensaje buffered: {e}")
-                messages_failed += 1
-                break
-        
-        if messages_sent > 0:
-            logger.info(f"✓ {messages_sent} mensajes del buffer enviados exitosamente")
-        
-        if messages_failed > 0:
-            logger.warning(f"⚠ {messages_failed} mensajes fallaron al enviar")
-    
     def get_stats(self) -> Dict:
         """Retorna estadísticas del cliente MQTT."""
         return {
             "connected": self.connected,
             "messages_sent": self.messages_sent,
             "messages_failed": self.messages_failed,
-            "messages_buffered": len(self.offline_buffer),
+            # Backlog actual: bytes en la cola en disco aún sin PUBACK
+            "messages_buffered": self.spool.pending_bytes,
+            "messages_enqueued": self.messages_enqueued,
+            "spool": self.forwarder.get_stats(),
             "reconnect_count": self.reconnect_count,
             "last_publish_time": self.last_publish_time
         }
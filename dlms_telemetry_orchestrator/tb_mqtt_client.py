@@ -6,9 +6,12 @@ Uses paho-mqtt with ThingsBoard best practices
 import logging
 import time
 import json
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, List, Optional, Union
 import paho.mqtt.client as mqtt
 
+from telemetry_spool import DiskQueue, SpoolForwarder
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,7 +26,9 @@ class ThingsBoardMQTTClient:
     - Simple publish interface for telemetry
     """
     
-    def __init__(self, host: str, port: int, token: str, client_id: Optional[str] = None):
+    def __init__(self, host: str, port: int, token: str, client_id: Optional[str] = None,
+                 spool_dir: Optional[str] = None, spool_max_bytes: int = 64 * 1024 * 1024,
+                 drain_rate: float = 50.0):
         """
         Initialize ThingsBoard MQTT client
         
@@ -32,6 +37,10 @@ class ThingsBoardMQTTClient:
             port: MQTT port (default 1883)
             token: Device access token
             client_id: Optional unique client ID
+            spool_dir: Optional on-disk queue; telemetry is written there
+                and forwarded, so it survives disconnects and restarts
+            spool_max_bytes: Disk budget of the queue
+            drain_rate: Messages/s sent from the queue
         """
         self.host = host
         self.port = port
@@ -55,6 +64,13 @@ class ThingsBoardMQTTClient:
         
         self._connected = False
         self._connection_errors = 0
+        self.last_payload_bytes = 0  # Tamaño del último payload publicado
+        
+        self.spool: Optional[DiskQueue] = None
+        self.forwarder: Optional[SpoolForwarder] = None
+        if spool_dir:
+            self.spool = DiskQueue(spool_dir, max_bytes=spool_max_bytes)
+            self.forwarder = SpoolForwarder(self.spool, self.client, rate=drain_rate, name=self.client_id)
         
         logger.info(f"🔧 ThingsBoard MQTT client initialized: {self.client_id}")
     
@@ -64,6 +80,8 @@ class ThingsBoardMQTTClient:
             self._connected = True
             self._connection_errors = 0
             logger.info(f"✅ MQTT Connected: {self.client_id}")
+            if self.forwarder:
+                self.forwarder.on_connect()
         else:
             self._connected = False
             error_msgs = {
@@ -79,6 +97,8 @@ class ThingsBoardMQTTClient:
     def _on_disconnect(self, client, userdata, rc):
         """Callback when disconnected"""
         self._connected = False
+        if self.forwarder:
+            self.forwarder.on_disconnect()
         if rc != 0:
             logger.warning(f"⚠️ MQTT Disconnected unexpectedly: code {rc}")
         else:
@@ -86,6 +106,8 @@ class ThingsBoardMQTTClient:
     
     def _on_publish(self, client, userdata, mid):
         """Callback when message is published"""
+        if self.forwarder:
+            self.forwarder.on_publish(mid)
         logger.debug(f"📤 Message {mid} acknowledged")
     
     def connect(self, timeout: int = 10, keepalive: int = 60) -> bool:
@@ -101,9 +123,12 @@ class ThingsBoardMQTTClient:
         """
         try:
             logger.info(f"🔌 Connecting to ThingsBoard at {self.host}:{self.port}...")
+            if self.forwarder:
+                self.forwarder.start()
             
-            # Connect to broker
-            self.client.connect(self.host, self.port, keepalive=keepalive)
+            # connect_async: a broker that is down at startup does not skip loop_start();
+            # paho keeps reconnecting in background and on_connect resumes the spool drain
+            self.client.connect_async(self.host, self.port, keepalive=keepalive)
             
             # Start network loop in background thread
             self.client.loop_start()
@@ -117,7 +142,7 @@ class ThingsBoardMQTTClient:
                 logger.info(f"✅ Connected successfully: {self.client_id}")
                 return True
             else:
-                logger.error(f"❌ Connection timeout after {timeout}s")
+                logger.error(f"❌ Connection timeout after {timeout}s (reconnecting in background)")
                 return False
                 
         except Exception as e:
@@ -132,9 +157,12 @@ class ThingsBoardMQTTClient:
             True if disconnected successfully
         """
         try:
+            if self.forwarder:
+                self.forwarder.stop()  # espera los PUBACK pendientes y guarda la posición
+            # El loop corre aunque nunca se haya conectado (reconexión automática)
+            self.client.loop_stop()
             if self._connected:
                 logger.info(f"🔌 Disconnecting: {self.client_id}")
-                self.client.loop_stop()
                 self.client.disconnect()
                 self._connected = False
                 logger.info("✅ Disconnected successfully")
@@ -150,25 +178,26 @@ class ThingsBoardMQTTClient:
         """Check if client is connected"""
         return self._connected and self.client.is_connected()
     
-    def publish_telemetry(self, data: Dict[str, Any], wait: bool = False) -> bool:
+    def publish_telemetry(self, data: Union[Dict[str, Any], List[Dict[str, Any]]], wait: bool = False) -> bool:
         """
         Publish telemetry data with QoS=1 guarantee
         
         Args:
-            data: Telemetry data dictionary
+            data: Telemetry data dictionary, or a list of {"ts", "values"}
+                samples published as one message
             wait: Wait for publish confirmation (not implemented in paho-mqtt easily)
             
         Returns:
-            True if published successfully
+            True if published successfully (or queued on disk when spooling)
         """
-        if not self.is_connected():
+        if not self.spool and not self.is_connected():
             logger.warning("⚠️ Not connected, cannot publish telemetry")
             return False
         
         try:
             # Format telemetry for ThingsBoard
-            # If data has 'ts' key, it's already formatted
-            if "ts" in data:
+            # If data is a sample list or has 'ts' key, it's already formatted
+            if isinstance(data, list) or "ts" in data:
                 payload = data
             else:
                 # Add timestamp
@@ -180,11 +209,19 @@ class ThingsBoardMQTTClient:
             # Convert to JSON
             payload_json = json.dumps(payload)
             
-            # Publish with QoS=1
             topic = "v1/devices/me/telemetry"
+            if self.spool:
+                # Store-and-forward: the forwarder publishes it with QoS=1
+                self.spool.append(topic, payload_json)
+                self.forwarder.notify()
+                self.last_payload_bytes = len(payload_json)
+                return True
+            
+            # Publish with QoS=1
             result = self.client.publish(topic, payload_json, qos=1)
             
             if result.rc == mqtt.MQTT_ERR_SUCCESS:
+                self.last_payload_bytes = len(payload_json)
                 logger.debug(f"📤 Published: {len(payload_json)} bytes")
                 return True
             else:
@@ -234,6 +271,8 @@ class ThingsBoardMQTTClient:
         try:
             logger.info(f"🛑 Stopping ThingsBoard client: {self.client_id}")
             self.disconnect()
+            if self.spool:
+                self.spool.close()
             logger.info("✅ Client stopped successfully")
         except Exception as e:
             logger.error(f"❌ Stop error: {e}")
@@ -244,11 +283,294 @@ class ThingsBoardMQTTClient:
             "client_id": self.client_id,
             "connected": self.is_connected(),
             "connection_errors": self._connection_errors,
+            "spool": self.forwarder.get_stats() if self.forwarder else None,
+            "host": self.host,
+            "port": self.port
+        }
+
+
+class ThingsBoardGatewayClient:
+    """
+    One MQTT session for many devices, using the ThingsBoard Gateway API
+
+    The session authenticates with the gateway device token; meters are
+    addressed by name on the gateway topics:
+    - v1/gateway/connect / v1/gateway/disconnect: device online/offline
+    - v1/gateway/telemetry: {"Device A": [{"ts": ..., "values": {...}}], ...}
+    - v1/gateway/attributes: {"Device A": {...}, ...}
+
+    publish_telemetry() sends the samples of many meters as a single
+    message, so they share one PUBLISH instead of one client and one
+    network thread per meter. Batching itself is up to the caller.
+    """
+    
+    CONNECT_TOPIC = "v1/gateway/connect"
+    DISCONNECT_TOPIC = "v1/gateway/disconnect"
+    TELEMETRY_TOPIC = "v1/gateway/telemetry"
+    ATTRIBUTES_TOPIC = "v1/gateway/attributes"
+    
+    def __init__(self, host: str, port: int, token: str, client_id: Optional[str] = None,
+                 spool_dir: Optional[str] = None, spool_max_bytes: int = 256 * 1024 * 1024,
+                 drain_rate: float = 50.0):
+        """
+        Initialize ThingsBoard gateway client
+        
+        Args:
+            host: ThingsBoard server host
+            port: MQTT port (default 1883)
+            token: Gateway device access token
+            client_id: Optional unique client ID
+            spool_dir: Optional on-disk queue for telemetry (store-and-forward)
+            spool_max_bytes: Disk budget of the queue
+            drain_rate: Messages/s sent from the queue
+        """
+        self.host = host
+        self.port = port
+        self.token = token
+        self.client_id = client_id or f"dlms_gateway_{int(time.time())}"
+        
+        self.client = mqtt.Client(
+            client_id=self.client_id,
+            clean_session=True,
+            protocol=mqtt.MQTTv311
+        )
+        self.client.username_pw_set(self.token)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_publish = self._on_publish
+        
+        self.spool: Optional[DiskQueue] = None
+        self.forwarder: Optional[SpoolForwarder] = None
+        if spool_dir:
+            self.spool = DiskQueue(spool_dir, max_bytes=spool_max_bytes)
+            self.forwarder = SpoolForwarder(self.spool, self.client, rate=drain_rate, name=self.client_id)
+        
+        self._connected = False
+        self._connection_errors = 0
+        # Dispositivos anunciados (nombre -> tipo), re-anunciados al reconectar
+        self._devices: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        
+        self.messages_sent = 0
+        self.messages_failed = 0
+        self.readings_sent = 0
+        self.bytes_sent = 0
+        self.max_devices_per_message = 0
+        
+        logger.info(f"🔧 ThingsBoard gateway client initialized: {self.client_id}")
+    
+    def _on_connect(self, client, userdata, flags, rc):
+        """Callback when connected: (re)announce every known device"""
+        if rc == 0:
+            self._connected = True
+            self._connection_errors = 0
+            logger.info(f"✅ Gateway MQTT Connected: {self.client_id}")
+            with self._lock:
+                devices = list(self._devices.items())
+            for device, device_type in devices:
+                self._publish(self.CONNECT_TOPIC, {"device": device, "type": device_type})
+            if self.forwarder:
+                self.forwarder.on_connect()
+        else:
+            self._connected = False
+            self._connection_errors += 1
+            logger.error(f"❌ Gateway MQTT Connection failed: code {rc}")
+    
+    def _on_disconnect(self, client, userdata, rc):
+        """Callback when disconnected"""
+        self._connected = False
+        if self.forwarder:
+            self.forwarder.on_disconnect()
+        if rc != 0:
+            logger.warning(f"⚠️ Gateway MQTT Disconnected unexpectedly: code {rc}")
+    
+    def _on_publish(self, client, userdata, mid):
+        """Callback when a message is acknowledged"""
+        if self.forwarder:
+            self.forwarder.on_publish(mid)
+    
+    def connect(self, timeout: int = 10, keepalive: int = 60) -> bool:
+        """
+        Connect to ThingsBoard as a gateway
+        
+        Returns:
+            True if connected successfully
+        """
+        try:
+            logger.info(f"🔌 Connecting gateway session to {self.host}:{self.port}...")
+            if self.forwarder:
+                self.forwarder.start()
+            self.client.connect_async(self.host, self.port, keepalive=keepalive)
+            self.client.loop_start()
+            
+            start_time = time.time()
+            while not self._connected and (time.time() - start_time) < timeout:
+                time.sleep(0.1)
+            
+            if self._connected:
+                return True
+            logger.error(f"❌ Gateway connection timeout after {timeout}s (reconnecting in background)")
+            return False
+        except Exception as e:
+            logger.error(f"❌ Gateway connection failed: {e}")
+            return False
+    
+    def is_connected(self) -> bool:
+        """Check if the gateway session is connected"""
+        return self._connected and self.client.is_connected()
+    
+    def _publish(self, topic: str, payload: Any) -> Optional[int]:
+        """Publish JSON with QoS=1; returns the payload size, None on failure"""
+        payload_json = json.dumps(payload, separators=(",", ":"))
+        try:
+            result = self.client.publish(topic, payload_json, qos=1)
+        except Exception as e:
+            logger.error(f"❌ Gateway publish error on {topic}: {e}")
+            return None
+        if result.rc != mqtt.MQTT_ERR_SUCCESS:
+            logger.warning(f"⚠️ Gateway publish on {topic} failed: rc={result.rc}")
+            return None
+        return len(payload_json)
+    
+    def _spool(self, topic: str, payload: Any) -> Optional[int]:
+        """Queue JSON on disk for the forwarder; returns the payload size"""
+        payload_json = json.dumps(payload, separators=(",", ":"))
+        try:
+            self.spool.append(topic, payload_json)
+        except OSError as e:
+            logger.error(f"❌ Gateway spool write failed on {topic}: {e}")
+            return None
+        self.forwarder.notify()
+        return len(payload_json)
+    
+    def connect_device(self, device: str, device_type: str = "default") -> bool:
+        """Announce a device behind the gateway (v1/gateway/connect)"""
+        with self._lock:
+            self._devices[device] = device_type
+        if not self.is_connected():
+            return False  # Se anunciará en _on_connect
+        return self._publish(self.CONNECT_TOPIC, {"device": device, "type": device_type}) is not None
+    
+    def disconnect_device(self, device: str) -> bool:
+        """Mark a device offline (v1/gateway/disconnect)"""
+        with self._lock:
+            self._devices.pop(device, None)
+        if not self.is_connected():
+            return False
+        return self._publish(self.DISCONNECT_TOPIC, {"device": device}) is not None
+    
+    def publish_telemetry(self, batch: Dict[str, List[Dict[str, Any]]]) -> Optional[int]:
+        """
+        Publish samples of several devices as one v1/gateway/telemetry message
+        
+        Args:
+            batch: {device: [{"ts": ms, "values": {...}}, ...]}
+            
+        Returns:
+            Payload size in bytes, None if not published (or not queued
+            on disk when spooling)
+        """
+        if not batch:
+            return 0
+        if self.spool:
+            size = self._spool(self.TELEMETRY_TOPIC, batch)
+        elif self.is_connected():
+            size = self._publish(self.TELEMETRY_TOPIC, batch)
+        else:
+            return None
+        if size is None:
+            self.messages_failed += 1
+            return None
+        self.messages_sent += 1
+        self.readings_sent += sum(len(entries) for entries in batch.values())
+        self.bytes_sent += size
+        self.max_devices_per_message = max(self.max_devices_per_message, len(batch))
+        logger.debug(f"📤 Gateway telemetry: {len(batch)} devices, {size} bytes")
+        return size
+    
+    def publish_attributes(self, attributes: Dict[str, Dict[str, Any]]) -> bool:
+        """Publish attributes of one or more devices (v1/gateway/attributes)"""
+        if not self.is_connected():
+            logger.warning("⚠️ Gateway not connected, cannot publish attributes")
+            return False
+        return self._publish(self.ATTRIBUTES_TOPIC, attributes) is not None
+    
+    def device(self, name: str, device_type: str = "default") -> "GatewayDevice":
+        """Per-device handle with the publish interface of ThingsBoardMQTTClient"""
+        return GatewayDevice(self, name, device_type)
+    
+    def stop(self):
+        """Close the gateway session"""
+        try:
+            logger.info(f"🛑 Stopping gateway client: {self.client_id}")
+            if self.forwarder:
+                self.forwarder.stop()
+            self.client.loop_stop()
+            if self.is_connected():
+                self.client.disconnect()
+            self._connected = False
+            if self.spool:
+                self.spool.close()
+        except Exception as e:
+            logger.error(f"❌ Gateway stop error: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get gateway session statistics"""
+        with self._lock:
+            devices = len(self._devices)
+        return {
+            "client_id": self.client_id,
+            "connected": self.is_connected(),
+            "connection_errors": self._connection_errors,
+            "devices": devices,
+            "messages_sent": self.messages_sent,
+            "messages_failed": self.messages_failed,
+            "readings_sent": self.readings_sent,
+            "bytes_sent": self.bytes_sent,
+            "max_devices_per_message": self.max_devices_per_message,
+            "spool": self.forwarder.get_stats() if self.forwarder else None,
             "host": self.host,
             "port": self.port
         }
 
 
+class GatewayDevice:
+    """
+    A device published through a shared ThingsBoardGatewayClient
+
+    Drop-in for ThingsBoardMQTTClient in the workers; stop() disconnects
+    this device, not the shared session.
+    """
+    
+    def __init__(self, gateway: ThingsBoardGatewayClient, name: str, device_type: str = "default"):
+        self.gateway = gateway
+        self.name = name
+        self.device_type = device_type
+        self.last_payload_bytes = 0
+    
+    def connect(self, timeout: int = 10, keepalive: int = 60) -> bool:
+        self.gateway.connect_device(self.name, self.device_type)
+        return self.gateway.is_connected()
+    
+    def is_connected(self) -> bool:
+        return self.gateway.is_connected()
+    
+    def publish_telemetry(self, data: Union[Dict[str, Any], List[Dict[str, Any]]], wait: bool = False) -> bool:
+        if isinstance(data, dict):
+            data = [data if "ts" in data else {"ts": int(time.time() * 1000), "values": data}]
+        size = self.gateway.publish_telemetry({self.name: data})
+        if size is None:
+            return False
+        self.last_payload_bytes = size
+        return True
+    
+    def publish_attributes(self, attributes: Dict[str, Any], wait: bool = False) -> bool:
+        return self.gateway.publish_attributes({self.name: attributes})
+    
+    def stop(self):
+        self.gateway.disconnect_device(self.name)
+
+
 if __name__ == "__main__":
     # Example usage
     logging.basicConfig(
@@ -0,0 +1,490 @@
+"""
+Durable store-and-forward queue for MQTT telemetry
+Segment-based append-only log on disk, drained at a controlled rate
+
+Every publish is appended to the log first and sent from there, so a broker
+outage (or a bridge restart during one) only delays telemetry: nothing is
+dropped until the log reaches its byte budget, and RAM use does not grow
+with the backlog.
+"""
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import paho.mqtt.client as mqtt
+
+logger = logging.getLogger(__name__)
+
+# Posición en el log: (id de segmento, offset en bytes dentro del segmento)
+Position = Tuple[int, int]
+
+_HEADER = struct.Struct(">II")  # longitud, crc32 del registro
+_SUFFIX = ".seg"
+
+
+class DiskQueue:
+    """
+    Append-only telemetry log split into segment files
+    
+    Records are ``topic + b"\\n" + payload`` framed with length and CRC32, so
+    a record torn by a crash is detected and cut off on the next open.
+    Appends are fsync'ed in batches (every ``fsync_interval`` seconds or
+    ``fsync_bytes`` bytes, whichever comes first); the consumer position is
+    kept in an ``offset`` file replaced atomically on commit(). Delivery is
+    at-least-once: after a crash, records past the last commit are sent
+    again (ThingsBoard keeps one value per key and ts, so they overwrite).
+    
+    When the log would exceed ``max_bytes`` the oldest segment is dropped.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024,
+                 segment_bytes: int = 4 * 1024 * 1024, fsync_interval: float = 1.0,
+                 fsync_bytes: int = 256 * 1024):
+        """
+        Open (or recover) the queue stored in *directory*
+        
+        Args:
+            directory: Folder holding segments and the offset file
+            max_bytes: Disk budget for unsent telemetry
+            segment_bytes: Size at which the active segment is rolled
+            fsync_interval: Max seconds appended data may stay unsynced
+            fsync_bytes: Max bytes appended between two fsyncs
+        """
+        if max_bytes < 1024:
+            raise ValueError("Spool max_bytes must be at least 1 KiB")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # Al menos cuatro segmentos dentro del presupuesto para poder descartar de a poco
+        self.segment_bytes = max(512, min(segment_bytes, max_bytes // 4))
+        self.fsync_interval = fsync_interval
+        self.fsync_bytes = fsync_bytes
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        
+        self._segments: Dict[int, int] = {}  # id -> tamaño en bytes
+        for name in os.listdir(directory):
+            if name.endswith(_SUFFIX) and name[:-len(_SUFFIX)].isdigit():
+                segment = int(name[:-len(_SUFFIX)])
+                self._segments[segment] = os.path.getsize(self._path(segment))
+        if self._segments:
+            self._recover_tail(max(self._segments))
+        else:
+            self._segments[1] = 0
+            open(self._path(1), "ab").close()
+        self._active = max(self._segments)
+        self._writer = open(self._path(self._active), "ab")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        
+        self._committed = self._load_offset()
+        self._acked = self._committed  # confirmado por el broker, aún sin persistir
+        self._cursor = self._committed  # próximo registro a leer
+        self._reader = None
+        self._reader_segment: Optional[int] = None
+        self._remove_consumed()
+        
+        self.appended = 0
+        self.appended_bytes = 0
+        self.dropped_segments = 0
+        self.dropped_bytes = 0
+        self.commits = 0
+        self.fsyncs = 0
+        
+        pending = self.pending_bytes
+        if pending:
+            logger.info(f"📦 Spool {directory}: {pending} bytes pending from a previous run")
+    
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:020d}{_SUFFIX}")
+    
+    def _recover_tail(self, segment: int):
+        """Truncate the last segment after its last complete, valid record"""
+        path = self._path(segment)
+        valid = 0
+        with open(path, "rb") as f:
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                length, crc = _HEADER.unpack(header)
+                record = f.read(length)
+                if len(record) < length or zlib.crc32(record) != crc:
+                    break
+                valid += _HEADER.size + length
+        if valid < self._segments[segment]:
+            logger.warning(f"⚠️ Spool {self.directory}: dropping {self._segments[segment] - valid} torn bytes at the tail")
+            with open(path, "r+b") as f:
+                f.truncate(valid)
+                os.fsync(f.fileno())
+            self._segments[segment] = valid
+    
+    def _load_offset(self) -> Position:
+        oldest = (min(self._segments), 0)
+        try:
+            with open(os.path.join(self.directory, "offset")) as f:
+                segment, position = (int(part) for part in f.read().split())
+        except (OSError, ValueError):
+            return oldest
+        if segment not in self._segments:
+            # Segmento ya descartado (o offset de otro log): empezar por lo más antiguo que queda
+            return oldest
+        # Confirmado por el broker pero truncado en la recuperación: ya estaba entregado
+        return (segment, min(position, self._segments[segment]))
+    
+    @property
+    def pending_bytes(self) -> int:
+        """Bytes appended but not yet acknowledged by the broker"""
+        with self._lock:
+            segment, position = self._acked
+            return sum(size for s, size in self._segments.items() if s >= segment) - position
+    
+    def append(self, topic: str, payload: Any):
+        """Add one message at the tail of the log"""
+        data = payload.encode("utf-8") if isinstance(payload, str) else bytes(payload)
+        record = topic.encode("utf-8") + b"\n" + data
+        frame = _HEADER.pack(len(record), zlib.crc32(record)) + record
+        with self._lock:
+            if self._segments[self._active] and self._segments[self._active] + len(frame) > self.segment_bytes:
+                self._roll()
+            self._writer.write(frame)
+            self._segments[self._active] += len(frame)
+            self._unsynced += len(frame)
+            self.appended += 1
+            self.appended_bytes += len(frame)
+            self._enforce_budget()
+            self.maybe_sync()
+    
+    def _roll(self):
+        """Close the active segment (synced) and open the next one"""
+        self._writer.flush()
+        os.fsync(self._writer.fileno())
+        self._writer.close()
+        self._active += 1
+        self._segments[self._active] = 0
+        self._writer = open(self._path(self._active), "ab")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.fsyncs += 1
+    
+    def _enforce_budget(self):
+        """Drop the oldest segments while the unsent backlog exceeds max_bytes"""
+        while self.pending_bytes > self.max_bytes and len(self._segments) > 1:
+            oldest = min(self._segments)
+            if oldest < self._acked[0]:
+                self._delete(oldest)  # ya entregado, solo faltaba el commit
+                continue
+            lost = self._segments[oldest] - (self._acked[1] if self._acked[0] == oldest else 0)
+            self.dropped_segments += 1
+            self.dropped_bytes += lost
+            logger.warning(f"⚠️ Spool {self.directory} over {self.max_bytes} bytes: dropping oldest segment ({lost} bytes)")
+            nxt = min(s for s in self._segments if s > oldest)
+            for attr in ("_committed", "_acked", "_cursor"):
+                if getattr(self, attr)[0] <= oldest:
+                    setattr(self, attr, (nxt, 0))
+            self._delete(oldest)
+            self._write_offset(self._committed)
+    
+    def _delete(self, segment: int):
+        if self._reader_segment == segment:
+            self._reader.close()
+            self._reader = self._reader_segment = None
+        del self._segments[segment]
+        try:
+            os.remove(self._path(segment))
+        except OSError as e:
+            logger.error(f"❌ Spool could not remove segment {segment}: {e}")
+    
+    def maybe_sync(self, force: bool = False):
+        """fsync the active segment if the batch is due (or *force*)"""
+        with self._lock:
+            if not self._unsynced:
+                return
+            if force or self._unsynced >= self.fsync_bytes or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._writer.flush()
+                os.fsync(self._writer.fileno())
+                self._unsynced = 0
+                self._last_sync = time.monotonic()
+                self.fsyncs += 1
+    
+    def read(self, max_records: int = 1) -> List[Tuple[Position, str, bytes]]:
+        """
+        Return up to *max_records* messages from the read cursor on
+        
+        Each item is (end position, topic, payload); pass the end position
+        to ack() once the broker has confirmed the message.
+        """
+        out = []
+        with self._lock:
+            self._writer.flush()  # lo escrito en buffer también es legible
+            while len(out) < max_records:
+                segment, position = self._cursor
+                if position >= self._segments.get(segment, 0):
+                    later = [s for s in self._segments if s > segment]
+                    if not later:
+                        break
+                    self._cursor = (min(later), 0)
+                    continue
+                if self._reader_segment != segment:
+                    if self._reader:
+                        self._reader.close()
+                    self._reader = open(self._path(segment), "rb")
+                    self._reader_segment = segment
+                self._reader.seek(position)
+                length, crc = _HEADER.unpack(self._reader.read(_HEADER.size))
+                record = self._reader.read(length)
+                end = position + _HEADER.size + length
+                self._cursor = (segment, end)
+                if len(record) < length or zlib.crc32(record) != crc:
+                    logger.error(f"❌ Spool {self.directory}: corrupt record at {segment}:{position}, skipped")
+                    continue
+                topic, _, payload = record.partition(b"\n")
+                out.append(((segment, end), topic.decode("utf-8"), payload))
+        return out
+    
+    def ack(self, position: Position):
+        """Mark everything up to *position* as delivered (persisted by commit())"""
+        with self._lock:
+            if position > self._acked:
+                self._acked = position
+    
+    def rewind(self):
+        """Move the read cursor back to the last acknowledged message"""
+        with self._lock:
+            self._cursor = self._acked
+    
+    def commit(self):
+        """Persist the acknowledged position and delete fully sent segments"""
+        with self._lock:
+            if self._acked == self._committed:
+                return
+            self._write_offset(self._acked)
+            self._committed = self._acked
+            self.commits += 1
+            self._remove_consumed()
+    
+    def _write_offset(self, position: Position):
+        path = os.path.join(self.directory, "offset")
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(f"{position[0]} {position[1]}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        try:
+            fd = os.open(self.directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)  # que el rename sobreviva a un corte de energía
+            finally:
+                os.close(fd)
+        except OSError:
+            pass  # p. ej. Windows: no permite fsync de directorios
+    
+    def _remove_consumed(self):
+        for segment in [s for s in self._segments if s < self._committed[0] and s != self._active]:
+            self._delete(segment)
+    
+    def close(self):
+        """Sync pending appends and commit the acknowledged position"""
+        with self._lock:
+            if self._writer.closed:
+                return
+            self.maybe_sync(force=True)
+            self.commit()
+            self._writer.close()
+            if self._reader:
+                self._reader.close()
+                self._reader = self._reader_segment = None
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "pending_bytes": self.pending_bytes,
+                "max_bytes": self.max_bytes,
+                "segments": len(self._segments),
+                "appended": self.appended,
+                "appended_bytes": self.appended_bytes,
+                "dropped_segments": self.dropped_segments,
+                "dropped_bytes": self.dropped_bytes,
+                "commits": self.commits,
+                "fsyncs": self.fsyncs,
+            }
+
+
+class SpoolForwarder:
+    """
+    Background thread draining a DiskQueue into a paho MQTT client
+    
+    Messages are published with QoS=1 at up to ``rate`` messages/s (bursts
+    of ``max_inflight``), with at most ``max_inflight`` awaiting PUBACK; a
+    message is acknowledged in the queue only when its PUBACK arrives, and
+    the position is committed to disk every ``commit_interval`` seconds.
+    After a disconnect the unacknowledged tail is sent again.
+    
+    The owner of the paho client forwards its callbacks: on_connect(),
+    on_disconnect() and on_publish(mid).
+    """
+    
+    def __init__(self, queue: DiskQueue, client: mqtt.Client, rate: float = 50.0,
+                 max_inflight: int = 20, commit_interval: float = 1.0, name: str = "spool"):
+        if rate <= 0 or max_inflight < 1:
+            raise ValueError("Forwarder rate must be > 0 and max_inflight >= 1")
+        self.queue = queue
+        self.client = client
+        self.rate = rate
+        self.max_inflight = max_inflight
+        self.commit_interval = commit_interval
+        self._inflight: Deque[Tuple[int, Position]] = deque()  # (mid, posición final) en orden de envío
+        # Solo se registran PUBACK de mids propios; los de publicaciones directas (atributos, connect) se ignoran
+        self._inflight_mids: Set[int] = set()
+        self._done: Set[int] = set()
+        self._early: Set[int] = set()  # PUBACK llegados mientras publish() aún no devolvía el mid
+        self._publishing = False
+        self._done_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._resend = True  # tras (re)conectar se reenvía desde lo último confirmado
+        self._tokens = float(max_inflight)
+        self._refilled = time.monotonic()
+        self._last_commit = time.monotonic()
+        self.name = name
+        self.sent = 0
+        self.acked = 0
+        self.resent_rounds = 0
+        self._thread: Optional[threading.Thread] = None
+        self.start()
+    
+    def start(self):
+        """Start (or restart after stop()) the drain thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._resend = True
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-forwarder", daemon=True)
+        self._thread.start()
+    
+    def notify(self):
+        """New data appended: wake the drain loop"""
+        self._wake.set()
+    
+    def on_connect(self):
+        self._wake.set()
+    
+    def on_disconnect(self):
+        self._resend = True
+        self._wake.set()
+    
+    def on_publish(self, mid: int):
+        with self._done_lock:
+            if mid in self._inflight_mids:
+                self._done.add(mid)
+            elif self._publishing:
+                self._early.add(mid)
+            else:
+                return
+        self._wake.set()
+    
+    def _settle(self):
+        """Acknowledge the in-order prefix of messages whose PUBACK arrived"""
+        with self._done_lock:
+            while self._inflight and self._inflight[0][0] in self._done:
+                mid, position = self._inflight.popleft()
+                self._done.discard(mid)
+                self._inflight_mids.discard(mid)
+                self.queue.ack(position)
+                self.acked += 1
+        if time.monotonic() - self._last_commit >= self.commit_interval:
+            self.queue.commit()
+            self._last_commit = time.monotonic()
+    
+    def _run(self):
+        timeout = self.commit_interval
+        while not self._stopping:
+            self._wake.wait(timeout)
+            self._wake.clear()
+            timeout = self.commit_interval
+            try:
+                self._settle()
+                self.queue.maybe_sync()
+                if not self.client.is_connected():
+                    continue
+                if self._resend:
+                    # Lo no confirmado antes del corte se vuelve a enviar (al menos una vez)
+                    self._resend = False
+                    with self._done_lock:
+                        if self._inflight:
+                            self.resent_rounds += 1
+                        self._inflight.clear()
+                        self._inflight_mids.clear()
+                        self._done.clear()
+                    self.queue.rewind()
+                timeout = self._drain() or timeout
+            except Exception as e:
+                logger.error(f"❌ Spool forwarder error: {e}")
+                timeout = self.commit_interval
+    
+    def _drain(self) -> Optional[float]:
+        """Send what the rate and the in-flight window allow; returns seconds until more is allowed"""
+        while len(self._inflight) < self.max_inflight and not self._stopping:
+            now = time.monotonic()
+            self._tokens = min(float(self.max_inflight), self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._tokens < 1.0:
+                return (1.0 - self._tokens) / self.rate
+            records = self.queue.read(1)
+            if not records:
+                return None
+            position, topic, payload = records[0]
+            # No se toma _done_lock durante publish(): paho llama a on_publish con su propio mutex tomado
+            with self._done_lock:
+                self._publishing = True
+                self._early.clear()
+            info = None
+            try:
+                info = self.client.publish(topic, payload, qos=1)
+            finally:
+                with self._done_lock:
+                    self._publishing = False
+                    early, self._early = self._early, set()
+                    if info is not None and info.rc == mqtt.MQTT_ERR_SUCCESS:
+                        self._inflight.append((info.mid, position))
+                        self._inflight_mids.add(info.mid)
+                        if info.mid in early:
+                            self._done.add(info.mid)
+            if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                logger.warning(f"⚠️ Spool publish on {topic} failed: rc={info.rc}, retrying later")
+                self._resend = True
+                return self.commit_interval
+            self._tokens -= 1.0
+            self.sent += 1
+        return None  # ventana llena: despierta el próximo PUBACK
+    
+    def stop(self, timeout: float = 5.0):
+        """Wait up to *timeout* for in-flight messages, then stop and persist the position"""
+        deadline = time.monotonic() + timeout
+        while self._inflight and self.client.is_connected() and time.monotonic() < deadline:
+            self._wake.set()
+            time.sleep(0.05)
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._settle()
+        self.queue.maybe_sync(force=True)
+        self.queue.commit()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.queue.stats()
+        stats.update({
+            "sent": self.sent,
+            "acked": self.acked,
+            "inflight": len(self._inflight),
+            "resent_rounds": self.resent_rounds,
+            "rate": self.rate,
+        })
+        return stats
@@ -0,0 +1,179 @@
+"""Tests for the bridge's acquisition schedule, scheduler, batcher and pipeline stages"""
+
+import asyncio
+import math
+
+import pytest
+
+bridge = pytest.importorskip("dlms_multi_meter_bridge")
+
+
+def test_resume_moves_missed_slots_to_the_next_phase_slot():
+    schedule = bridge.AcquisitionSchedule({"voltage": 2.0, "energy": 900.0}, phase=0.25)
+    assert schedule.offset == 0.5
+    # Arranque: todo vence en el primer slot de la fase, no en el instante de conexión
+    schedule.resume(1000.2)
+    assert schedule.next_due() == 1000.5
+    assert schedule.take_due(1000.5) == ["voltage", "energy"]
+    # Tras un corte: de nuevo en la rejilla del medidor
+    schedule.resume(1234.9)
+    assert schedule.next_due() == 1236.5
+    assert math.isclose((schedule.next_due() - schedule.offset) % schedule.fastest, 0.0)
+
+
+def test_resume_keeps_slots_that_are_not_overdue():
+    schedule = bridge.AcquisitionSchedule({"voltage": 2.0, "energy": 900.0}, phase=0.0)
+    schedule.resume(100.0)
+    schedule.take_due(100.0)
+    schedule.resume(101.0)
+    assert schedule._due == {"voltage": 102.0, "energy": 900.0}
+
+
+class FakePublish:
+    """Publish coroutine that records batches and fails while ``failing``"""
+
+    def __init__(self):
+        self.batches = []
+        self.failing = False
+
+    async def __call__(self, batch):
+        if self.failing:
+            return None
+        self.batches.append(batch)
+        return len(str(batch))
+
+
+def test_batcher_retries_failed_batch_in_order():
+    async def scenario():
+        publish = FakePublish()
+        batcher = bridge.TelemetryBatcher(publish, window=10.0)
+        publish.failing = True
+        batcher.add("m1", 1, {"v": 1})
+        batcher.add("m1", 2, {"v": 2})
+        assert await batcher.flush() is False
+        assert batcher.pending == 2
+        # La siguiente ventana reenvía primero el lote fallido
+        batcher.add("m1", 3, {"v": 3})
+        publish.failing = False
+        assert await batcher.flush() is True
+        await batcher.close()
+        return publish.batches, batcher
+
+    batches, batcher = asyncio.run(scenario())
+    assert [[s["ts"] for s in b["m1"]] for b in batches] == [[1, 2], [3]]
+    assert batcher.failed_flushes == 1
+    assert batcher.samples_sent == 3
+    assert batcher.pending == 0
+
+
+def test_batcher_drops_samples_beyond_max_pending():
+    async def scenario():
+        publish = FakePublish()
+        publish.failing = True
+        batcher = bridge.TelemetryBatcher(publish, window=10.0, max_pending=2)
+        for ts in range(3):
+            batcher.add("m1", ts, {"v": ts})
+        await batcher.close()
+        return batcher
+
+    batcher = asyncio.run(scenario())
+    assert batcher.pending == 2
+    assert batcher.dropped == 1
+    assert batcher.samples == 2
+
+
+def test_batcher_flushes_on_window_expiry():
+    async def scenario():
+        publish = FakePublish()
+        batcher = bridge.TelemetryBatcher(publish, window=0.05)
+        batcher.add("m1", 1, {"v": 1})
+        batcher.add("m2", 1, {"v": 2})
+        await asyncio.sleep(0.15)
+        await batcher.close()
+        return publish.batches, batcher
+
+    batches, batcher = asyncio.run(scenario())
+    assert batches == [{"m1": [{"ts": 1, "values": {"v": 1}}], "m2": [{"ts": 1, "values": {"v": 2}}]}]
+    assert batcher.window_flushes == 1
+    assert batcher.size_flushes == 0
+
+
+def test_batcher_flushes_on_size_before_window():
+    async def scenario():
+        publish = FakePublish()
+        # Una muestra cabe, dos no: la segunda cierra el lote sin esperar la ventana
+        batcher = bridge.TelemetryBatcher(publish, window=10.0, max_bytes=40)
+        batcher.add("m1", 1, {"v": 1})
+        batcher.add("m1", 2, {"v": 2})
+        await asyncio.sleep(0)
+        flushed = [[s["ts"] for s in b["m1"]] for b in publish.batches]
+        pending = batcher.pending
+        await batcher.close()
+        return flushed, pending, batcher
+
+    flushed, pending, batcher = asyncio.run(scenario())
+    assert flushed == [[1]]
+    assert pending == 1
+    assert batcher.size_flushes == 1
+    assert batcher.window_flushes == 0
+
+
+def test_pipeline_stage_offer_drops_oldest():
+    async def scenario():
+        handled = []
+
+        async def handler(item):
+            handled.append(item)
+
+        stage = bridge.PipelineStage("transform", handler, maxsize=2)
+        for item in (1, 2, 3):
+            stage.offer(item)
+        stage.start()
+        await stage.stop()
+        return handled, stage
+
+    handled, stage = asyncio.run(scenario())
+    assert handled == [2, 3]
+    assert stage.dropped == 1
+    assert stage.processed == 2
+    assert stage.max_depth == 2
+
+
+def make_worker():
+    worker = bridge.MeterWorker(1, {"meter_name": "m1", "measurements": ["voltage", "energy"]})
+    worker.schedule = bridge.AcquisitionSchedule({"voltage": 1.0, "energy": 60.0})
+    worker.schedule.resume(1000.0)
+    return worker
+
+
+def test_release_coalesces_pending_job_as_skipped():
+    async def scenario():
+        worker = make_worker()
+        worker.release(1000.0, 1000.0)
+        assert worker._job == (1000.0, ["voltage", "energy"])
+        # El ciclo anterior aún no ha arrancado: el tick se fusiona y cuenta como saltado
+        worker.release(1001.0, 1001.0)
+        assert worker._job == (1000.0, ["voltage", "energy"])
+        assert await worker._next_job() == ["voltage", "energy"]
+        return worker
+
+    worker = asyncio.run(scenario())
+    assert worker.ticks == 2
+    assert worker.skipped_ticks == 1
+    assert worker.overruns == 0
+
+
+def test_release_counts_overruns_and_late_slots():
+    async def scenario():
+        worker = make_worker()
+        worker.release(1000.0, 1000.0)
+        await worker._next_job()
+        # Ciclo en curso: el siguiente tick es un overrun, y el disparo tardío
+        # de 2.5 s por detrás del deadline cuenta los dos slots perdidos
+        worker.release(1001.0, 1003.5)
+        return worker
+
+    worker = asyncio.run(scenario())
+    assert worker.overruns == 1
+    assert worker.skipped_ticks == 2
+    assert worker._job == (1001.0, ["voltage"])
@@ -0,0 +1,380 @@
+"""Tests for the sans-IO DLMS core and the in-process simulator driver"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import dlms_reader as dr
+
+ln = dr.obis_to_bytes
+
+VOLTAGE = "1-1:32.7.0"
+CURRENT = "1-1:31.7.0"
+MISSING = "1-1:1.8.0"
+BIG = "0-0:99.9.9.255"
+
+OBJECTS = {
+    (3, ln(VOLTAGE), 2): b"\x12\x08\xf9",              # long-unsigned 2297
+    (3, ln(VOLTAGE), 3): b"\x02\x02\x0f\xff\x16\x23",  # scaler -1, unit V
+    (3, ln(CURRENT), 2): b"\x12\x00\x85",              # 133
+    (3, ln(CURRENT), 3): b"\x02\x02\x0f\xfe\x16\x21",  # scaler -2, unit A
+    (1, ln(dr.SERIAL_NUMBER_OBIS), 2): b"\x09\x04ABCD",
+    (1, ln(BIG), 2): b"\x09\x82\x01\x2c" + bytes(range(256)) + bytes(44),  # 300 bytes
+}
+
+WITH_LIST = dr.CONFORMANCE_MULTIPLE_REFERENCES
+
+
+def simulated_client(meter, **kwargs):
+    options = dict(server_logical=1, server_physical=1, client_sap=1, max_info_length=None, password=b"22222222")
+    options.update(kwargs)
+    return dr.SimulatedDLMSClient(meter, **options)
+
+
+class RecordingStore:
+    """ScalerUnitCache store that keeps the calls in memory"""
+
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})
+        self.loads = 0
+        self.saves = []
+
+    def load(self, identity, firmware):
+        self.loads += 1
+        return dict(self.entries)
+
+    def save(self, identity, firmware, entries):
+        self.saves.append((identity, firmware, dict(entries)))
+        self.entries.update(entries)
+
+
+# ---------------------------------------------------------------------------
+# DlmsConnection / WrapperConnection on their own
+# ---------------------------------------------------------------------------
+
+
+def exchange(conn, meter):
+    """Move queued client bytes to the meter and its answer back"""
+    answer = meter.receive_data(conn.data_to_send())
+    conn.receive_data(answer)
+
+
+def test_hdlc_connection_association_and_get():
+    meter = dr.MeterSimulator(OBJECTS, max_info=128)
+    conn = dr.DlmsConnection(dr._combine_server_address(1, 1), 1, max_info_length=128)
+
+    conn.send_snrm()
+    exchange(conn, meter)
+    conn.accept_ua(conn.next_event())
+    assert conn.linked and conn.max_info_rx == 128
+
+    conn.send_aarq(b"22222222")
+    exchange(conn, meter)
+    event = conn.next_event()
+    assert isinstance(event, dr.ApduEvent)
+    assert bytes(event.apdu)[3] == 0x61  # AARE
+
+    invoke_id = conn.next_invoke_id()
+    conn.send_get(3, ln(VOLTAGE), 2, invoke_id)
+    exchange(conn, meter)
+    event = conn.next_event()
+    assert dr._extract_get_response_payload(event.apdu, invoke_id) == b"\x12\x08\xf9"
+    assert conn.outstanding_frames == 0
+    assert conn.next_event() is None
+
+
+def test_hdlc_connection_reassembles_segmented_response():
+    meter = dr.MeterSimulator(OBJECTS, max_info=48)
+    conn = dr.DlmsConnection(dr._combine_server_address(1, 1), 1, max_info_length=48)
+    conn.send_snrm()
+    exchange(conn, meter)
+    conn.accept_ua(conn.next_event())
+    conn.send_aarq(b"22222222")
+    exchange(conn, meter)
+    conn.next_event()
+
+    invoke_id = conn.next_invoke_id()
+    conn.send_get(1, ln(BIG), 2, invoke_id)
+    exchange(conn, meter)
+    segments = 1
+    while True:
+        event = conn.next_event()
+        if event is not None:
+            break
+        # Cada segmento con F=1 se confirma con RR, que pide el siguiente
+        assert conn.pending_output
+        exchange(conn, meter)
+        segments += 1
+    assert segments > 5
+    value, _ = dr.decode_data(dr._extract_get_response_payload(event.apdu, invoke_id))
+    assert value == bytes(range(256)) + bytes(44)
+
+
+def test_hdlc_connection_accepts_bytes_split_anywhere():
+    meter = dr.MeterSimulator(OBJECTS)
+    conn = dr.DlmsConnection(dr._combine_server_address(1, 1), 1)
+    conn.send_snrm()
+    answer = meter.receive_data(conn.data_to_send())
+    for i in range(len(answer) - 1):
+        conn.receive_data(answer[i : i + 1])
+        assert conn.next_event() is None
+    conn.receive_data(answer[-1:])
+    conn.accept_ua(conn.next_event())
+    assert conn.linked
+
+
+def test_hdlc_connection_rejects_corrupt_ua():
+    meter = dr.MeterSimulator(OBJECTS)
+    conn = dr.DlmsConnection(dr._combine_server_address(1, 1), 1)
+    conn.send_snrm()
+    answer = bytearray(meter.receive_data(conn.data_to_send()))
+    answer[-3] ^= 0xFF  # FCS
+    conn.receive_data(bytes(answer))
+    with pytest.raises(RuntimeError):
+        conn.accept_ua(conn.next_event())
+
+
+def test_wrapper_connection_round_trip():
+    meter = dr.MeterSimulator(OBJECTS, transport=dr.TRANSPORT_WRAPPER)
+    conn = dr.WrapperConnection(1, 16)
+    conn.send_aarq(b"22222222")
+    answer = meter.receive_data(conn.data_to_send())
+    # Sin flags: la cabecera se puede partir en cualquier byte
+    conn.receive_data(answer[:5])
+    assert conn.next_event() is None
+    conn.receive_data(answer[5:])
+    # Igual que en HDLC, el APDU llega con la cabecera LLC delante
+    assert bytes(conn.next_event().apdu)[:4] == b"\xE6\xE7\x00\x61"
+
+    invoke_id = conn.next_invoke_id()
+    conn.send_get(3, ln(VOLTAGE), 2, invoke_id)
+    exchange(conn, meter)
+    assert dr._extract_get_response_payload(conn.next_event().apdu, invoke_id) == b"\x12\x08\xf9"
+
+
+# ---------------------------------------------------------------------------
+# Flows through the simulator driver
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("transport", [dr.TRANSPORT_HDLC, dr.TRANSPORT_WRAPPER])
+@pytest.mark.parametrize("conformance", [WITH_LIST, 0])
+def test_read_registers(transport, conformance):
+    meter = dr.MeterSimulator(OBJECTS, conformance=conformance, transport=transport)
+    client = simulated_client(meter, transport=transport)
+    client.connect()
+    results = client.read_registers([VOLTAGE, CURRENT, MISSING])
+    assert results[0] == (dr.ScaledValue(2297, -1), 0x23, 2297)
+    assert float(results[0][0]) == 229.7
+    assert float(results[1][0]) == 1.33
+    assert isinstance(results[2], dr.DlmsAccessError)
+    client.close()
+
+
+def test_get_with_list_falls_back_to_single_gets():
+    with_list = dr.MeterSimulator(OBJECTS, conformance=WITH_LIST)
+    plain = dr.MeterSimulator(OBJECTS, conformance=0)
+    expected = None
+    for meter in (with_list, plain):
+        client = simulated_client(meter)
+        client.connect()
+        results = client.read_registers([VOLTAGE, CURRENT])
+        expected = expected or results
+        assert results == expected
+        client.close()
+    # Una sola petición con lista frente a una por atributo (scaler + valor)
+    assert with_list.requests == 1
+    assert plain.requests == 4
+
+
+@pytest.mark.parametrize("transport", [dr.TRANSPORT_HDLC, dr.TRANSPORT_WRAPPER])
+def test_segmented_response(transport):
+    meter = dr.MeterSimulator(OBJECTS, max_info=48, transport=transport)
+    client = simulated_client(meter, max_info_length=48, transport=transport)
+    client.connect()
+    raw = client.get_attribute(1, ln(BIG), 2)
+    assert dr.decode_data(raw)[0] == bytes(range(256)) + bytes(44)
+    assert client.read_register(VOLTAGE)[0] == dr.ScaledValue(2297, -1)
+    client.close()
+
+
+def test_scaler_cache_uses_the_store_outside_the_flows():
+    store = RecordingStore()
+    client = simulated_client(dr.MeterSimulator(OBJECTS), scaler_cache=dr.ScalerUnitCache(store))
+    client.connect()
+    client.read_registers([VOLTAGE, CURRENT])
+    assert store.loads == 1
+    assert [(identity, sorted(entries)) for identity, _, entries in store.saves] == [
+        ("ABCD", sorted([dr._normalize_obis(VOLTAGE), dr._normalize_obis(CURRENT)]))
+    ]
+    client.read_registers([VOLTAGE])
+    assert store.loads == 1 and len(store.saves) == 1
+
+    # Otro proceso: los scalers salen del store y no se piden al medidor
+    meter = dr.MeterSimulator(OBJECTS, conformance=0)
+    client = simulated_client(meter, scaler_cache=dr.ScalerUnitCache(store))
+    client.connect()
+    client.bind_scaler_cache()
+    requests = meter.requests
+    assert float(client.read_register(VOLTAGE)[0]) == 229.7
+    assert meter.requests - requests == 1
+    assert store.loads == 2
+
+
+def test_scaler_cache_keeps_unsaved_entries_when_the_store_fails():
+    class FailingStore(RecordingStore):
+        fail = True
+
+        def save(self, identity, firmware, entries):
+            if self.fail:
+                raise OSError("database is locked")
+            super().save(identity, firmware, entries)
+
+    store = FailingStore()
+    cache = dr.ScalerUnitCache(store)
+    cache.rekey("ABCD", None)
+    cache.put({VOLTAGE: (-1, 35)})
+    cache.flush()
+    assert cache.store_errors == 1 and cache.dirty
+    store.fail = False
+    cache.flush()
+    assert not cache.dirty
+    assert store.entries == {dr._normalize_obis(VOLTAGE): (-1, 35)}
+
+
+# ---------------------------------------------------------------------------
+# PushReceiver
+# ---------------------------------------------------------------------------
+
+
+PUSH_TIME = datetime(2026, 10, 18, 12, 0)
+PUSH_APDU = (
+    b"\xE6\xE7\x00\x0F\x00\x00\x00\x07\x0c" + dr._encode_date_time(PUSH_TIME)
+    + b"\x02\x02\x12\x08\xf9\x06\x00\x00\xdb\xd9"
+)
+PUSH_SERVER = dr._combine_server_address(1, 17)
+
+
+def feed_bytewise(receiver, stream):
+    out = []
+    for i in range(len(stream)):
+        out += receiver.receive_data(stream[i : i + 1])
+    return out
+
+
+def test_push_receiver_split_hdlc_stream():
+    frame = dr._build_frame(0x13, 16, PUSH_SERVER, PUSH_APDU)
+    first = dr._build_frame(0x13, 16, PUSH_SERVER, PUSH_APDU[:20], segmented=True)
+    second = dr._build_frame(0x13, 16, PUSH_SERVER, PUSH_APDU[20:])
+    receiver = dr.PushReceiver()
+    notifications = feed_bytewise(receiver, frame + first + second)
+    assert receiver.transport == dr.TRANSPORT_HDLC
+    assert len(notifications) == 2
+    for notification in notifications:
+        assert notification.invoke_id == 7
+        assert notification.timestamp == PUSH_TIME
+        assert notification.value == [2297, 56281]
+        assert notification.source == PUSH_SERVER
+    assert receiver.errors == 0
+
+
+def test_push_receiver_skips_corrupt_frames():
+    frame = bytearray(dr._build_frame(0x13, 16, PUSH_SERVER, PUSH_APDU))
+    frame[-3] ^= 0xFF
+    receiver = dr.PushReceiver()
+    good = dr._build_frame(0x13, 16, PUSH_SERVER, PUSH_APDU)
+    notifications = receiver.receive_data(bytes(frame) + good)
+    assert len(notifications) == 1
+    assert receiver.errors == 1
+
+
+def test_parse_data_notification_rejects_truncated_date_time():
+    # Tag 0x09 del date-time sin longitud detrás, y longitud mayor que lo recibido
+    for apdu in (b"\x0f\x00\x00\x00\x01\x09", b"\x0f\x00\x00\x00\x01\x0c\x07\xea"):
+        with pytest.raises(dr.DlmsDataError):
+            dr.parse_data_notification(apdu)
+
+
+def test_push_receiver_skips_malformed_hdlc_frames():
+    receiver = dr.PushReceiver()
+    good = dr._build_frame(0x13, 16, PUSH_SERVER, PUSH_APDU)
+    assert receiver.receive_data(b"\x7e\xa0\x02\x7e") == []
+    assert receiver.errors == 1
+    assert len(receiver.receive_data(good)) == 1
+
+
+def test_push_receiver_skips_truncated_notifications():
+    receiver = dr.PushReceiver()
+    bad = dr._build_frame(0x13, 16, PUSH_SERVER, b"\xE6\xE7\x00\x0f\x00\x00\x00\x01\x09")
+    good = dr._build_frame(0x13, 16, PUSH_SERVER, PUSH_APDU)
+    notifications = receiver.receive_data(bad + good)
+    assert [n.value for n in notifications] == [[2297, 56281]]
+    assert receiver.errors == 1
+
+
+def test_push_server_session_survives_bad_frames():
+    async def scenario():
+        got = []
+
+        async def handler(peer, notification):
+            got.append(notification.value)
+
+        server = dr.DataNotificationServer(handler, host="127.0.0.1", port=0)
+        await server.start()
+        _, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        good = dr._build_frame(0x13, 16, PUSH_SERVER, PUSH_APDU)
+        writer.write(b"\x7e\xa0\x02\x7e" + good)
+        await writer.drain()
+        for _ in range(100):
+            if got:
+                break
+            await asyncio.sleep(0.01)
+        stats = server.stats()
+        writer.close()
+        await server.close()
+        return got, stats
+
+    got, stats = asyncio.run(scenario())
+    assert got == [[2297, 56281]]
+    assert stats["decode_errors"] == 1
+
+
+def test_push_receiver_split_wrapper_stream():
+    frame = dr._build_wrapper_frame(1, 102, PUSH_APDU[3:])
+    receiver = dr.PushReceiver()
+    notifications = feed_bytewise(receiver, frame + frame)
+    assert receiver.transport == dr.TRANSPORT_WRAPPER
+    assert [n.value for n in notifications] == [[2297, 56281]] * 2
+    assert notifications[0].source == 1
+
+
+# ---------------------------------------------------------------------------
+# Values
+# ---------------------------------------------------------------------------
+
+
+def test_scaled_value_hash_matches_equality():
+    value = dr.ScaledValue(2291, -1)
+    assert value == 229.1 and hash(value) == hash(229.1)
+    assert value == dr.ScaledValue(22910, -2) and hash(value) == hash(dr.ScaledValue(22910, -2))
+    assert dr.ScaledValue(5, 2) == 500 and hash(dr.ScaledValue(5, 2)) == hash(500)
+    assert {value: "v"}[229.1] == "v"
+    assert str(value) == "229.1"
+
+
+def test_date_time_column_matches_row_wise_decoding():
+    np = pytest.importorskip("numpy")
+    stamps = [
+        datetime(2026, 10, 18, 12, 0, tzinfo=timezone(timedelta(hours=-5))),
+        datetime(2026, 1, 1, 0, 30, tzinfo=timezone(timedelta(hours=2))),
+        datetime(2026, 3, 3, 3, 3),  # desviación "no especificada"
+    ]
+    raws = [dr._encode_date_time(stamp) for stamp in stamps]
+    column = np.frombuffer(b"".join(raws), dtype=np.uint8).reshape(-1, 12)
+    vectorized = dr._date_time_column(column)
+    for raw, stamp in zip(raws, vectorized):
+        decoded = dr._decode_date_time(raw)
+        if decoded.tzinfo is not None:
+            decoded = decoded.astimezone(timezone.utc).replace(tzinfo=None)
+        assert stamp == np.datetime64(decoded, "s")
@@ -0,0 +1,253 @@
+"""Tests for the on-disk store-and-forward queue and its MQTT forwarder"""
+
+import os
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+import pytest
+
+from telemetry_spool import DiskQueue, SpoolForwarder, _HEADER
+
+
+class FakeInfo:
+    def __init__(self, rc, mid):
+        self.rc = rc
+        self.mid = mid
+
+
+class FakeClient:
+    """Stand-in for paho's client: records publishes, PUBACKs are fed by the test"""
+    
+    def __init__(self, connected=True, start_mid=1):
+        self.connected = connected
+        self.next_mid = start_mid
+        self.published = []
+        self.on_publish_inline = None  # callback(mid) invocado dentro de publish()
+        self._lock = threading.Lock()
+    
+    def is_connected(self):
+        return self.connected
+    
+    def publish(self, topic, payload, qos=0):
+        with self._lock:
+            mid = self.next_mid
+            self.next_mid += 1
+            self.published.append((mid, topic, payload))
+        if self.on_publish_inline:
+            self.on_publish_inline(mid)
+        return FakeInfo(mqtt.MQTT_ERR_SUCCESS, mid)
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def segment_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".seg"))
+
+
+def test_round_trip(tmp_path):
+    queue = DiskQueue(str(tmp_path))
+    queue.append("v1/devices/me/telemetry", '{"a":1}')
+    queue.append("v1/gateway/telemetry", b'{"b":2}')
+    records = queue.read(10)
+    assert [(topic, payload) for _, topic, payload in records] == [
+        ("v1/devices/me/telemetry", b'{"a":1}'),
+        ("v1/gateway/telemetry", b'{"b":2}'),
+    ]
+    assert queue.read(1) == []
+    queue.close()
+
+
+def test_torn_tail_is_truncated_on_open(tmp_path):
+    queue = DiskQueue(str(tmp_path))
+    queue.append("t", "first")
+    queue.append("t", "second")
+    queue.close()
+    path = os.path.join(str(tmp_path), segment_files(str(tmp_path))[-1])
+    intact = os.path.getsize(path)
+    with open(path, "ab") as f:
+        # Cabecera que promete 100 bytes seguida de un registro cortado por el "apagón"
+        f.write(_HEADER.pack(100, 0) + b"t\npartial")
+    
+    queue = DiskQueue(str(tmp_path))
+    assert os.path.getsize(path) == intact
+    assert [payload for _, _, payload in queue.read(10)] == [b"first", b"second"]
+    queue.append("t", "third")
+    assert [payload for _, _, payload in queue.read(10)] == [b"third"]
+    queue.close()
+
+
+def test_corrupt_tail_crc_is_truncated(tmp_path):
+    queue = DiskQueue(str(tmp_path))
+    queue.append("t", "good")
+    queue.append("t", "flipped")
+    queue.close()
+    path = os.path.join(str(tmp_path), segment_files(str(tmp_path))[-1])
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+    
+    queue = DiskQueue(str(tmp_path))
+    assert [payload for _, _, payload in queue.read(10)] == [b"good"]
+    queue.close()
+
+
+def test_commit_persists_offset_across_reopen(tmp_path):
+    queue = DiskQueue(str(tmp_path))
+    for i in range(3):
+        queue.append("t", f"m{i}")
+    records = queue.read(3)
+    queue.ack(records[0][0])
+    queue.commit()
+    queue.ack(records[1][0])  # confirmado pero sin commit: se reenvía tras reabrir
+    # Caída simulada: close() haría commit, así que solo se sincroniza y se suelta el archivo
+    queue.maybe_sync(force=True)
+    queue._writer.close()
+    
+    queue = DiskQueue(str(tmp_path))
+    assert [payload for _, _, payload in queue.read(10)] == [b"m1", b"m2"]
+    queue.close()
+
+
+def test_rewind_resends_unacknowledged(tmp_path):
+    queue = DiskQueue(str(tmp_path))
+    for i in range(3):
+        queue.append("t", f"m{i}")
+    records = queue.read(3)
+    queue.ack(records[0][0])
+    queue.rewind()
+    assert [payload for _, _, payload in queue.read(10)] == [b"m1", b"m2"]
+    queue.close()
+
+
+def test_commit_removes_consumed_segments(tmp_path):
+    queue = DiskQueue(str(tmp_path), max_bytes=64 * 1024, segment_bytes=512)
+    for i in range(40):
+        queue.append("t", "x" * 50 + str(i))
+    assert len(segment_files(str(tmp_path))) > 1
+    records = queue.read(40)
+    queue.ack(records[-1][0])
+    queue.commit()
+    assert len(segment_files(str(tmp_path))) == 1
+    assert queue.pending_bytes == 0
+    queue.close()
+
+
+def test_byte_budget_drops_oldest_segments(tmp_path):
+    queue = DiskQueue(str(tmp_path), max_bytes=4096, segment_bytes=1024)
+    for i in range(200):
+        queue.append("t", f"{i:04d}" + "x" * 60)
+    assert queue.pending_bytes <= 4096
+    assert queue.dropped_segments > 0
+    assert queue.dropped_bytes > 0
+    payloads = [payload for _, _, payload in queue.read(1000)]
+    # Se conserva lo más reciente, en orden y sin huecos
+    assert payloads[-1].startswith(b"0199")
+    numbers = [int(p[:4]) for p in payloads]
+    assert numbers == list(range(numbers[0], 200))
+    assert numbers[0] > 0
+    queue.close()
+    
+    # El offset reescrito al descartar apunta a un segmento existente
+    queue = DiskQueue(str(tmp_path), max_bytes=4096, segment_bytes=1024)
+    assert [int(p[:4]) for _, _, p in queue.read(1000)] == numbers
+    queue.close()
+
+
+def test_max_bytes_is_validated(tmp_path):
+    with pytest.raises(ValueError):
+        DiskQueue(str(tmp_path), max_bytes=100)
+
+
+def test_forwarder_acks_in_order_and_commits(tmp_path):
+    queue = DiskQueue(str(tmp_path))
+    client = FakeClient()
+    forwarder = SpoolForwarder(queue, client, rate=1000.0, max_inflight=5, commit_interval=0.05)
+    try:
+        for i in range(3):
+            queue.append("t", f"m{i}")
+        forwarder.notify()
+        assert wait_for(lambda: len(client.published) == 3)
+        mids = [mid for mid, _, _ in client.published]
+        # PUBACK fuera de orden: solo se confirma el prefijo contiguo
+        forwarder.on_publish(mids[1])
+        time.sleep(0.1)
+        assert forwarder.acked == 0
+        forwarder.on_publish(mids[0])
+        forwarder.on_publish(mids[2])
+        assert wait_for(lambda: forwarder.acked == 3)
+        assert wait_for(lambda: queue.pending_bytes == 0)
+    finally:
+        forwarder.stop(timeout=0)
+        queue.close()
+    with open(os.path.join(str(tmp_path), "offset")) as f:
+        assert f.read().split() == [str(p) for p in queue._committed]
+
+
+def test_forwarder_ignores_foreign_pubacks(tmp_path):
+    queue = DiskQueue(str(tmp_path))
+    client = FakeClient(start_mid=7)
+    forwarder = SpoolForwarder(queue, client, rate=1000.0, max_inflight=5, commit_interval=0.05)
+    try:
+        # PUBACK de una publicación directa (atributos) con el mid que paho reutilizará después
+        forwarder.on_publish(7)
+        queue.append("t", "m0")
+        forwarder.notify()
+        assert wait_for(lambda: len(client.published) == 1)
+        assert client.published[0][0] == 7
+        time.sleep(0.1)
+        assert forwarder.acked == 0
+        assert not forwarder._done
+        forwarder.on_publish(7)
+        assert wait_for(lambda: forwarder.acked == 1)
+    finally:
+        forwarder.stop(timeout=0)
+        queue.close()
+
+
+def test_forwarder_handles_puback_before_publish_returns(tmp_path):
+    queue = DiskQueue(str(tmp_path))
+    client = FakeClient()
+    forwarder = SpoolForwarder(queue, client, rate=1000.0, max_inflight=5, commit_interval=0.05)
+    client.on_publish_inline = forwarder.on_publish
+    try:
+        queue.append("t", "m0")
+        forwarder.notify()
+        assert wait_for(lambda: forwarder.acked == 1)
+        assert not forwarder._done and not forwarder._inflight_mids
+    finally:
+        forwarder.stop(timeout=0)
+        queue.close()
+
+
+def test_forwarder_resends_after_disconnect(tmp_path):
+    queue = DiskQueue(str(tmp_path))
+    client = FakeClient()
+    forwarder = SpoolForwarder(queue, client, rate=1000.0, max_inflight=5, commit_interval=0.05)
+    try:
+        queue.append("t", "m0")
+        queue.append("t", "m1")
+        forwarder.notify()
+        assert wait_for(lambda: len(client.published) == 2)
+        forwarder.on_publish(client.published[0][0])
+        assert wait_for(lambda: forwarder.acked == 1)
+        client.connected = False
+        forwarder.on_disconnect()
+        time.sleep(0.05)
+        client.connected = True
+        forwarder.on_connect()
+        assert wait_for(lambda: len(client.published) == 3)
+        assert client.published[2][2] == b"m1"
+        assert forwarder.resent_rounds == 1
+    finally:
+        forwarder.stop(timeout=0)
+        queue.close()